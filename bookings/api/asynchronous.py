@@ -0,0 +1,47 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import close_old_connections
+
+ASYNC_VIEW_WORKERS = getattr(settings, "ASYNC_VIEW_WORKERS", 8)
+
+_executor = ThreadPoolExecutor(max_workers=ASYNC_VIEW_WORKERS, thread_name_prefix="api-read")
+
+
+def _render_view(view, request, args, kwargs):
+    response = view(request, *args, **kwargs)
+    if callable(getattr(response, "render", None)):
+        response = response.render()
+    return response
+
+
+def _render_view_in_pool(view, request, args, kwargs):
+    # Pool threads see no request_started/finished signals, so connections are managed here.
+    close_old_connections()
+    try:
+        return _render_view(view, request, args, kwargs)
+    finally:
+        close_old_connections()
+
+
+def async_api_view(view):
+    """
+    Expose a sync read-only DRF view as an async Django view. Under ASGI the
+    view runs on a bounded pool of ASYNC_VIEW_WORKERS threads while the event
+    loop keeps serving other requests (this relies on every middleware being
+    async-capable); under WSGI the view runs back in the request thread with
+    its usual connection, so the same URL keeps working.
+    """
+
+    @wraps(view)
+    async def async_view(request, *args, **kwargs):
+        if isinstance(request, ASGIRequest):
+            call = sync_to_async(_render_view_in_pool, thread_sensitive=False, executor=_executor)
+        else:
+            call = sync_to_async(_render_view)
+        return await call(view, request, args, kwargs)
+
+    return async_view
@@ -0,0 +1,73 @@
+from django.contrib.auth.models import User
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from bookings.models import UserProfile
+from bookings.services.security import user_token_state
+from bookings.services.token_revocation import is_token_revoked, note_token_revoked
+
+
+class RevocableRefreshToken(RefreshToken):
+    """Refresh token whose blacklist check goes through the in-process revocation filter."""
+
+    def check_blacklist(self):
+        if is_token_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError("Token is blacklisted")
+
+    def blacklist(self):
+        blacklisted = super().blacklist()
+        note_token_revoked(self.payload[api_settings.JTI_CLAIM])
+        return blacklisted
+
+
+class RevocableTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = RevocableRefreshToken
+
+
+def user_role(user):
+    try:
+        return user.profile.role
+    except UserProfile.DoesNotExist:
+        return None
+
+
+def token_for_user(user):
+    refresh = RevocableRefreshToken.for_user(user)
+    # Copied into every access token minted from this refresh token.
+    refresh["username"] = user.username
+    refresh["email"] = user.email
+    refresh["is_superuser"] = user.is_superuser
+    refresh["role"] = user_role(user)
+    return refresh
+
+
+def user_from_claims(validated_token):
+    user = User(
+        id=validated_token[api_settings.USER_ID_CLAIM],
+        username=validated_token["username"],
+        email=validated_token["email"],
+        is_superuser=validated_token["is_superuser"],
+        is_active=True,
+    )
+    user._state.adding = False
+    user._state.db = "default"
+    if validated_token["role"] is not None:
+        user.profile = UserProfile(role=validated_token["role"])
+    return user
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWT authentication that builds the user from token claims instead of the database."""
+
+    def get_user(self, validated_token):
+        if "role" not in validated_token:
+            return super().get_user(validated_token)
+        state = user_token_state(validated_token[api_settings.USER_ID_CLAIM])
+        if not state["is_active"]:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if state["role"] != validated_token["role"] or state["is_superuser"] != validated_token["is_superuser"]:
+            raise AuthenticationFailed("Token is no longer valid for this user", code="token_not_valid")
+        return user_from_claims(validated_token)
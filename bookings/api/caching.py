@@ -0,0 +1,25 @@
+from django.utils import timezone
+from rest_framework.response import Response
+
+from bookings.services.response_cache import cached_payload
+
+
+class CachedListMixin:
+    """Caches the serialized list response per URL and data version of `cache_groups`."""
+
+    cache_groups = ()
+    cache_time_bound = False
+
+    def cached_response_data(self, request, build):
+        return cached_payload(
+            type(self).__name__,
+            [request.build_absolute_uri(), timezone.localdate()],
+            self.cache_groups,
+            build,
+            time_bound=self.cache_time_bound,
+        )
+
+    def list(self, request, *args, **kwargs):
+        return Response(
+            self.cached_response_data(request, lambda: super(CachedListMixin, self).list(request, *args, **kwargs).data)
+        )
@@ -0,0 +1,32 @@
+from django.utils.cache import parse_etags
+from rest_framework import status
+from rest_framework.response import Response
+
+from bookings.services.content_versions import content_etag
+
+
+class ConditionalGetMixin:
+    """Answers GET with 304 when If-None-Match still matches the content version ETag."""
+
+    etag_groups = ()
+
+    def get_etag(self, request):
+        return content_etag(*self.etag_groups)
+
+    def conditional_response(self, request, build_response):
+        etag = self.get_etag(request)
+        if etag is None:
+            return build_response()
+        if_none_match = request.headers.get("If-None-Match")
+        # Weak comparison: compressed responses carry the same tag as W/"...".
+        if if_none_match and (if_none_match.strip() == "*" or etag in {tag.replace("W/", "", 1) for tag in parse_etags(if_none_match)}):
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = build_response()
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response["ETag"] = etag
+            response["Cache-Control"] = "private, no-cache"
+        return response
+
+    def get(self, request, *args, **kwargs):
+        return self.conditional_response(request, lambda: super(ConditionalGetMixin, self).get(request, *args, **kwargs))
@@ -0,0 +1,58 @@
+from rest_framework import serializers
+
+
+class SparseFieldsMixin:
+    """
+    `?fields=id,start_time` keeps only the listed top-level fields of a GET
+    response and `?include=dishes` keeps only the listed nested relations
+    (`?include=` drops them all). Views consult `wants()` to skip the queries
+    behind pruned fields.
+    """
+
+    fields_query_param = "fields"
+    include_query_param = "include"
+    nested_fields = ()
+
+    def _query_names(self, param):
+        raw = self.request.query_params.get(param)
+        if raw is None:
+            return None
+        return {name.strip() for name in raw.split(",") if name.strip()}
+
+    def sparse_fields(self):
+        if hasattr(self, "_sparse_fields"):
+            return self._sparse_fields
+        self._sparse_fields = None
+        if self.request.method != "GET":
+            return None
+        fields = self._query_names(self.fields_query_param)
+        include = self._query_names(self.include_query_param)
+        if fields is None and include is None:
+            return None
+        available = set(self.get_serializer_class().Meta.fields)
+        errors = {}
+        if fields is not None and fields - available:
+            errors[self.fields_query_param] = [f"Unknown fields: {', '.join(sorted(fields - available))}."]
+        if include is not None and include - set(self.nested_fields):
+            errors[self.include_query_param] = [f"Unknown relations: {', '.join(sorted(include - set(self.nested_fields)))}."]
+        if errors:
+            raise serializers.ValidationError(errors)
+        kept = available if fields is None else fields
+        if include is not None:
+            kept = {name for name in kept if name not in self.nested_fields or name in include}
+        self._sparse_fields = kept
+        return kept
+
+    def wants(self, name):
+        kept = self.sparse_fields()
+        return kept is None or name in kept
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        kept = self.sparse_fields()
+        if kept is not None:
+            target = getattr(serializer, "child", serializer)
+            for name in list(target.fields):
+                if name not in kept:
+                    target.fields.pop(name)
+        return serializer
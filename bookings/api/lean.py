@@ -0,0 +1,178 @@
+from collections import defaultdict
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from bookings.models import Booking, CustomerOrder, Dish, OrderItem
+
+# Unbound fields reused only for their output formatting, so rows match the model serializers byte for byte.
+_datetime = serializers.DateTimeField()
+_money = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+def _format_datetime(value):
+    return None if value is None else _datetime.to_representation(value)
+
+
+def _format_money(value):
+    return None if value is None else _money.to_representation(value)
+
+
+def _in_order(rows_by_pk, ids):
+    return [rows_by_pk[pk] for pk in ids if pk in rows_by_pk]
+
+
+def order_item_rows(order_ids):
+    """Rows shaped like OrderItemSerializer, grouped by order id."""
+    items = defaultdict(list)
+    queryset = (
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .order_by("created_at", "pk")
+        .values_list("order_id", "id", "public_id", "dish_id", "dish_name_snapshot", "quantity", "unit_price_snapshot", "line_total_snapshot")
+    )
+    for order_id, pk, public_id, dish_id, dish_name, quantity, unit_price, line_total in queryset:
+        items[order_id].append(
+            {
+                "id": public_id or pk,
+                "dish_id": dish_id,
+                "dish_name": dish_name,
+                "quantity": quantity,
+                "unit_price": _format_money(unit_price),
+                "line_total": _format_money(line_total),
+            }
+        )
+    return items
+
+
+# Output field -> value columns it is built from, so sparse requests select fewer columns and joins.
+RESERVATION_LIST_COLUMNS = {
+    "id": ("public_id",),
+    "table_id": ("table_id",),
+    "guests_count": ("guests_count",),
+    "start_time": ("start_time",),
+    "end_time": ("end_time",),
+    "order_total": ("order__total_amount",),
+    "dishes": ("order__id",),
+}
+ORDER_LIST_COLUMNS = {
+    "id": ("public_id",),
+    "table_id": ("booking_id", "booking__table_id"),
+    "guests_count": ("booking_id", "booking__guests_count"),
+    "start_time": ("booking_id", "booking__start_time"),
+    "end_time": ("booking_id", "booking__end_time"),
+    "order_total": ("total_amount",),
+    "dishes": (),
+}
+
+
+def _columns(mapping, fields):
+    columns = {"id"}
+    for field, needed in mapping.items():
+        if fields is None or field in fields:
+            columns.update(needed)
+    return sorted(columns)
+
+
+def _pick(row, fields):
+    if fields is None:
+        return row
+    return {key: value for key, value in row.items() if key in fields}
+
+
+def reservation_list_rows(booking_ids, fields=None):
+    """Rows shaped like ReservationListSerializer, in the order of booking_ids, limited to `fields` if given."""
+    rows = list(Booking.objects.filter(pk__in=booking_ids).values(*_columns(RESERVATION_LIST_COLUMNS, fields)))
+    items = {}
+    if fields is None or "dishes" in fields:
+        items = order_item_rows([row["order__id"] for row in rows if row["order__id"] is not None])
+    data = {}
+    for row in rows:
+        order_id = row.get("order__id")
+        data[row["id"]] = _pick(
+            {
+                "id": row.get("public_id") or row["id"],
+                "table_id": row.get("table_id"),
+                "guests_count": row.get("guests_count"),
+                "start_time": _format_datetime(row.get("start_time")),
+                "end_time": _format_datetime(row.get("end_time")),
+                "order_total": _format_money(row.get("order__total_amount")),
+                "dishes": None if order_id is None else items.get(order_id, []),
+            },
+            fields,
+        )
+    return _in_order(data, booking_ids)
+
+
+def order_list_rows(order_ids, fields=None):
+    """Rows shaped like OrderListSerializer, in the order of order_ids, limited to `fields` if given."""
+    rows = list(CustomerOrder.objects.filter(pk__in=order_ids).values(*_columns(ORDER_LIST_COLUMNS, fields)))
+    items = {}
+    if fields is None or "dishes" in fields:
+        items = order_item_rows([row["id"] for row in rows])
+    data = {}
+    for row in rows:
+        item = {"id": row.get("public_id") or row["id"]}
+        # Like the serializer, takeout orders without a booking omit the booking fields entirely.
+        if row.get("booking_id") is not None:
+            item.update(
+                table_id=row.get("booking__table_id"),
+                guests_count=row.get("booking__guests_count"),
+                start_time=_format_datetime(row.get("booking__start_time")),
+                end_time=_format_datetime(row.get("booking__end_time")),
+            )
+        item["order_total"] = _format_money(row.get("total_amount"))
+        item["dishes"] = items.get(row["id"], [])
+        data[row["id"]] = _pick(item, fields)
+    return _in_order(data, order_ids)
+
+
+def dish_rows(dish_ids, stock, request=None):
+    """Rows shaped like DishSerializer with available_quantity taken from a stock snapshot."""
+    storage = Dish._meta.get_field("image").storage
+    data = {}
+    for row in Dish.objects.filter(pk__in=dish_ids).values("id", "name", "description", "price", "image"):
+        image_url = None
+        if row["image"]:
+            image_url = storage.url(row["image"])
+            if request is not None:
+                image_url = request.build_absolute_uri(image_url)
+        data[row["id"]] = {
+            "id": row["id"],
+            "name": row["name"],
+            "description": row["description"],
+            "price": _format_money(row["price"]),
+            "available_quantity": stock.get(row["id"], 0),
+            "image_url": image_url,
+        }
+    return _in_order(data, dish_ids)
+
+
+class LeanListMixin:
+    """Paginates over ids only and renders the page with `lean_row_builder` instead of the model serializer.
+
+    The builder is called as `lean_row_builder(ids, **self.lean_row_options())`; a view without one is
+    rejected when its class is defined.
+    """
+
+    lean_row_builder = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if not callable(cls.lean_row_builder):
+            raise ImproperlyConfigured(f"{cls.__name__} must set lean_row_builder to a row builder function.")
+
+    def lean_row_options(self):
+        return {}
+
+    def lean_rows(self, ids):
+        return self.lean_row_builder(ids, **self.lean_row_options())
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset()).select_related(None).prefetch_related(None)
+        keyset_field = getattr(self, "keyset_field", None)
+        queryset = queryset.only("id", keyset_field) if keyset_field else queryset.only("id")
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(self.lean_rows([obj.pk for obj in queryset]))
+        return self.get_paginated_response(self.lean_rows([obj.pk for obj in page]))
@@ -0,0 +1,43 @@
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from bookings.services.pagination import keyset_page
+
+
+class KeysetOptInPagination(PageNumberPagination):
+    """Page numbers by default; `?pagination=cursor` or `?cursor=...` switches to keyset pages without a count."""
+
+    cursor_query_param = "cursor"
+    mode_query_param = "pagination"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        field = getattr(view, "keyset_field", None)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if field is None or not (cursor or request.query_params.get(self.mode_query_param) == "cursor"):
+            return super().paginate_queryset(queryset, request, view)
+        self.request = request
+        try:
+            self.keyset = keyset_page(queryset, field, cursor, self.get_page_size(request))
+        except ValueError:
+            raise NotFound("Invalid cursor.")
+        return self.keyset.object_list
+
+    def _cursor_link(self, cursor):
+        if cursor is None:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_paginated_response(self, data):
+        if self.keyset is None:
+            return super().get_paginated_response(data)
+        return Response(
+            {
+                "next": self._cursor_link(self.keyset.next_cursor),
+                "previous": self._cursor_link(self.keyset.previous_cursor),
+                "results": data,
+            }
+        )
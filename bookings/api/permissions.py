@@ -15,6 +15,19 @@ class IsClientUser(BasePermission):
             return False
 
 
+class IsOperatorOrAdmin(BasePermission):
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        if user.is_superuser:
+            return True
+        try:
+            return user.profile.role in ("operator", "admin")
+        except Exception:
+            return False
+
+
 class IsOwnerOr404(BasePermission):
     def has_object_permission(self, request, view, obj):
         owner_id = getattr(obj, "user_id", None)
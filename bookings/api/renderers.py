@@ -0,0 +1,40 @@
+import re
+
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used without it
+    orjson = None
+
+# A number orjson spells differently from the stdlib: 1e16 for 1e+16, 2.5e-7 for 2.5e-07, 0.00001 for 1e-05.
+# Matched in the encoded bytes, where a number always follows ":", "," or "["; a string that happens to look
+# like one only costs a fallback.
+_ORJSON_FLOAT_SPELLING = re.compile(rb"[:,\[]-?(?:[0-9.]+e|0\.0000)")
+
+
+class CompactJSONRenderer(JSONRenderer):
+    """
+    Same compact output as JSONRenderer, encoded with orjson when it is
+    installed. Values orjson would format differently (datetimes, Decimals,
+    lazy strings) go through DRF's encoder, and output holding an
+    exponent-notation float is rendered again by JSONRenderer. orjson has no
+    hook for native floats, so NaN and Infinity come out as null where
+    JSONRenderer would raise.
+    """
+
+    if orjson is not None:
+        options = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or data is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=JSONEncoder().default, option=self.options)
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        if _ORJSON_FLOAT_SPELLING.search(ret):
+            return super().render(data, accepted_media_type, renderer_context)
+        # Escaped like JSONRenderer so the output stays valid JavaScript.
+        return ret.replace("\u2028".encode(), b"\\u2028").replace("\u2029".encode(), b"\\u2029")
@@ -4,8 +4,8 @@ from django.core.exceptions import ValidationError as DjangoValidationError
 from django.db.models import Q
 from django.utils import timezone
 from rest_framework import serializers
-from rest_framework_simplejwt.tokens import RefreshToken
 
+from bookings.api.authentication import RevocableRefreshToken, token_for_user
 from bookings.models import (
     Booking,
     CustomerOrder,
@@ -34,8 +34,8 @@ class AuthTokenSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True, trim_whitespace=False)
 
     def validate(self, attrs):
-        locked, attempt = is_login_locked(attrs["username"].strip())
-        if locked and attempt is not None:
+        locked, _ = is_login_locked(attrs["username"].strip(), self.context.get("request"))
+        if locked:
             raise serializers.ValidationError({"detail": ["Account is temporarily locked."]})
         user = authenticate(
             request=self.context.get("request"),
@@ -46,7 +46,7 @@ class AuthTokenSerializer(serializers.Serializer):
             record_failed_login(attrs["username"].strip(), self.context.get("request"))
             raise serializers.ValidationError({"detail": ["Invalid username or password."]})
         clear_login_attempt(attrs["username"].strip())
-        refresh = RefreshToken.for_user(user)
+        refresh = token_for_user(user)
         return {
             "access": str(refresh.access_token),
             "refresh": str(refresh),
@@ -57,7 +57,7 @@ class LogoutSerializer(serializers.Serializer):
     refresh = serializers.CharField()
 
     def save(self, **kwargs):
-        token = RefreshToken(self.validated_data["refresh"])
+        token = RevocableRefreshToken(self.validated_data["refresh"])
         token.blacklist()
 
 
@@ -147,6 +147,9 @@ class DishSerializer(serializers.ModelSerializer):
         return request.build_absolute_uri(url) if request else url
 
     def get_available_quantity(self, obj):
+        stock = self.context.get("stock")
+        if stock is not None:
+            return stock.get(obj.pk, 0)
         return available_quantity_net(obj)
 
 
@@ -354,12 +357,12 @@ class ReservationCreateUpdateSerializer(serializers.Serializer):
             "takeout": attrs.get("takeout", False),
             "date": attrs["date"],
             "promotion_ids": attrs.get("promotion_ids") if "promotion_ids" in attrs else (
-                list(instance.applied_promotion_links.values_list("promotion_id", flat=True))
+                [link.promotion_id for link in instance.applied_promotion_links]
                 if instance is not None
                 else []
             ),
             "dishes": attrs.get("dishes") if "dishes" in attrs else (
-                [{"dish": line.dish_id, "quantity": line.quantity} for line in instance.dishes.all()]
+                [{"dish": line.dish_id, "quantity": line.quantity} for line in instance.dishes]
                 if instance is not None
                 else []
             ),
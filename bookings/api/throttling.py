@@ -0,0 +1,24 @@
+from rest_framework.throttling import BaseThrottle
+
+from bookings.services.rate_limit import (
+    SLOT_POLL_BURST,
+    SLOT_POLL_RATE_PER_SECOND,
+    SLOT_POLL_SCOPE,
+    consume_token,
+    request_identity,
+)
+
+
+class SlotPollingThrottle(BaseThrottle):
+    """Per-client slot polling limit shared with the dashboard's slot polling endpoints."""
+
+    scope = SLOT_POLL_SCOPE
+    rate = SLOT_POLL_RATE_PER_SECOND
+    burst = SLOT_POLL_BURST
+
+    def allow_request(self, request, view):
+        allowed, self.retry_after = consume_token(self.scope, request_identity(request), self.rate, self.burst)
+        return allowed
+
+    def wait(self):
+        return self.retry_after
@@ -1,5 +1,6 @@
 from django.urls import path
 
+from .asynchronous import async_api_view
 from .views import (
     AvailableSlotsView,
     ClientOrderDetailView,
@@ -9,6 +10,7 @@ from .views import (
     ComplaintListCreateView,
     DishListView,
     DishReviewCreateView,
+    ExportView,
     LoginView,
     LogoutView,
     MeView,
@@ -31,10 +33,10 @@ urlpatterns = [
     path("news/<int:pk>/", PublishedNewsDetailView.as_view(), name="api_news_detail"),
     path("promotions/", PromotionListView.as_view(), name="api_promotion_list"),
     path("promotions/<int:pk>/", PromotionDetailView.as_view(), name="api_promotion_detail"),
-    path("menu/", MenuView.as_view(), name="api_menu"),
-    path("dishes/", DishListView.as_view(), name="api_dishes"),
-    path("availability/occupied-slots/", OccupiedSlotsView.as_view(), name="api_occupied_slots"),
-    path("availability/available-slots/", AvailableSlotsView.as_view(), name="api_available_slots"),
+    path("menu/", async_api_view(MenuView.as_view()), name="api_menu"),
+    path("dishes/", async_api_view(DishListView.as_view()), name="api_dishes"),
+    path("availability/occupied-slots/", async_api_view(OccupiedSlotsView.as_view()), name="api_occupied_slots"),
+    path("availability/available-slots/", async_api_view(AvailableSlotsView.as_view()), name="api_available_slots"),
     path("reservations/", ClientReservationListCreateView.as_view(), name="api_reservations"),
     path("reservations/<int:pk>/", ClientReservationDetailView.as_view(), name="api_reservation_detail"),
     path("orders/", ClientOrderListView.as_view(), name="api_orders"),
@@ -45,4 +47,5 @@ urlpatterns = [
         DishReviewCreateView.as_view(),
         name="api_order_reviews",
     ),
+    path("export/<slug:kind>/", ExportView.as_view(), name="api_export"),
 ]
@@ -1,5 +1,5 @@
 from django.db.models import Case, When
-from django.http import Http404
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from rest_framework import generics, permissions, serializers, status
@@ -8,9 +8,16 @@ from rest_framework.views import APIView
 from rest_framework_simplejwt.views import TokenRefreshView
 
 from bookings.models import Booking, CustomerOrder, Dish, News, Table, VenueComplaint
-from bookings.services.availability import available_slots_for_date, occupied_slots_for_table_date, parse_booking_date
+from bookings.services.availability import coalesced_available_slots, coalesced_occupied_slots, parse_booking_date
+from bookings.services.content_versions import CATALOG, NEWS, STOCK
+from bookings.services.export import EXPORT_MODELS, export_queryset, export_rows, stream_ndjson, tombstone_queryset
 from bookings.services.menu import get_menu_dishes_for_date
-from bookings.services.promotions import get_orderable_promotions
+from bookings.services.promotions import (
+    get_active_promotions,
+    get_orderable_promotions,
+    promotion_stock_requirements,
+    stock_satisfies,
+)
 from bookings.services.reservations import (
     booking_detail_queryset,
     cancel_reservation_for_client,
@@ -18,8 +25,15 @@ from bookings.services.reservations import (
     get_order_or_404_for_user,
     order_detail_queryset,
 )
-
-from .permissions import IsClientUser
+from bookings.services.response_cache import cached_payload, overlay_stock, stock_snapshot
+
+from .authentication import RevocableTokenRefreshSerializer
+from .caching import CachedListMixin
+from .conditional import ConditionalGetMixin
+from .fields import SparseFieldsMixin
+from .lean import LeanListMixin, dish_rows, order_list_rows, reservation_list_rows
+from .pagination import KeysetOptInPagination
+from .permissions import IsClientUser, IsOperatorOrAdmin
 from .serializers import (
     AuthTokenSerializer,
     ComplaintSerializer,
@@ -39,6 +53,7 @@ from .serializers import (
     ReservationDetailSerializer,
     ReservationListSerializer,
 )
+from .throttling import SlotPollingThrottle
 
 
 class LoginView(APIView):
@@ -52,6 +67,7 @@ class LoginView(APIView):
 
 class RefreshView(TokenRefreshView):
     permission_classes = [permissions.AllowAny]
+    serializer_class = RevocableTokenRefreshSerializer
 
 
 class LogoutView(APIView):
@@ -71,35 +87,59 @@ class MeView(APIView):
         return Response(CurrentUserSerializer(request.user).data)
 
 
-class PublishedNewsListView(generics.ListAPIView):
+class PublishedNewsListView(ConditionalGetMixin, CachedListMixin, generics.ListAPIView):
     serializer_class = NewsListSerializer
     permission_classes = [permissions.IsAuthenticated, IsClientUser]
+    etag_groups = (NEWS,)
+    cache_groups = (NEWS,)
+    cache_time_bound = True
 
     def get_queryset(self):
         now = timezone.now()
         return News.objects.filter(is_published=True, published_at__lte=now).order_by("-published_at")
 
 
-class PublishedNewsDetailView(generics.RetrieveAPIView):
+class PublishedNewsDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     serializer_class = NewsDetailSerializer
     permission_classes = [permissions.IsAuthenticated, IsClientUser]
+    etag_groups = (NEWS,)
 
     def get_queryset(self):
         now = timezone.now()
         return News.objects.filter(is_published=True, published_at__lte=now).order_by("-published_at")
 
 
-class PromotionListView(generics.ListAPIView):
+class PromotionListView(ConditionalGetMixin, CachedListMixin, generics.ListAPIView):
     serializer_class = PromotionListSerializer
     permission_classes = [permissions.IsAuthenticated, IsClientUser]
+    etag_groups = (CATALOG, STOCK)
+    cache_groups = (CATALOG,)
+    cache_time_bound = True
 
     def get_queryset(self):
         return get_orderable_promotions()
 
+    def list(self, request, *args, **kwargs):
+        # Active promotions are cached with their stock needs; orderability is checked against the stock snapshot.
+        entries = self.cached_response_data(
+            request,
+            lambda: [
+                (promotion_stock_requirements(promotion), self.get_serializer(promotion).data)
+                for promotion in get_active_promotions()
+            ],
+        )
+        stock = stock_snapshot()
+        rows = [data for requirements, data in entries if stock_satisfies(requirements, stock)]
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(page)
+        return Response(rows)
+
 
-class PromotionDetailView(generics.RetrieveAPIView):
+class PromotionDetailView(ConditionalGetMixin, generics.RetrieveAPIView):
     serializer_class = PromotionDetailSerializer
     permission_classes = [permissions.IsAuthenticated, IsClientUser]
+    etag_groups = (CATALOG, STOCK)
 
     def get_object(self):
         promotions = {promotion.pk: promotion for promotion in get_orderable_promotions()}
@@ -109,10 +149,14 @@ class PromotionDetailView(generics.RetrieveAPIView):
         return obj
 
 
-class MenuView(APIView):
+class MenuView(ConditionalGetMixin, APIView):
     permission_classes = [permissions.IsAuthenticated, IsClientUser]
+    etag_groups = (CATALOG, STOCK)
 
     def get(self, request):
+        return self.conditional_response(request, lambda: self.menu_response(request))
+
+    def menu_response(self, request):
         date_raw = request.query_params.get("date")
         if not date_raw:
             raise serializers.ValidationError({"date": ["This query parameter is required."]})
@@ -120,6 +164,16 @@ class MenuView(APIView):
             target_date = parse_booking_date(date_raw)
         except ValueError:
             raise serializers.ValidationError({"date": ["Invalid booking date."]})
+        data = cached_payload(
+            "menu",
+            [request.build_absolute_uri("/"), target_date],
+            (CATALOG,),
+            lambda: self.menu_payload(request, target_date),
+        )
+        overlay_stock(data["dishes"])
+        return Response(data)
+
+    def menu_payload(self, request, target_date):
         dish_ids = get_menu_dishes_for_date(target_date)
         dishes = Dish.objects.filter(pk__in=dish_ids)
         if dish_ids:
@@ -128,14 +182,25 @@ class MenuView(APIView):
         payload = {
             "date": target_date,
             "dish_ids": dish_ids,
-            "dishes": DishSerializer(dishes, many=True, context={"request": request}).data,
+            "dishes": DishSerializer(dishes, many=True, context={"request": request, "stock": stock_snapshot()}).data,
         }
-        return Response(MenuDaySerializer(payload, context={"request": request}).data)
+        return MenuDaySerializer(payload, context={"request": request}).data
 
 
-class DishListView(generics.ListAPIView):
+class DishListView(ConditionalGetMixin, CachedListMixin, LeanListMixin, generics.ListAPIView):
     serializer_class = DishSerializer
     permission_classes = [permissions.IsAuthenticated, IsClientUser]
+    etag_groups = (CATALOG, STOCK)
+    cache_groups = (CATALOG,)
+    lean_row_builder = staticmethod(dish_rows)
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        overlay_stock(response.data["results"] if isinstance(response.data, dict) else response.data)
+        return response
+
+    def lean_row_options(self):
+        return {"stock": stock_snapshot(), "request": self.request}
 
     def get_queryset(self):
         queryset = Dish.objects.filter(available_quantity__gt=0).order_by("name")
@@ -153,6 +218,7 @@ class DishListView(generics.ListAPIView):
 
 class OccupiedSlotsView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsClientUser]
+    throttle_classes = [SlotPollingThrottle]
 
     def get(self, request):
         table_id = request.query_params.get("table_id")
@@ -163,7 +229,7 @@ class OccupiedSlotsView(APIView):
         date_field = MenuDaySerializer().fields["date"]
         target_date = date_field.to_internal_value(date_raw)
         reservation_id = request.query_params.get("reservation_id")
-        occupied = occupied_slots_for_table_date(table, target_date, booking_id=reservation_id)
+        occupied = coalesced_occupied_slots(table, target_date, booking_id=reservation_id)
         return Response(
             {
                 "date": target_date.isoformat(),
@@ -182,6 +248,7 @@ class OccupiedSlotsView(APIView):
 
 class AvailableSlotsView(APIView):
     permission_classes = [permissions.IsAuthenticated, IsClientUser]
+    throttle_classes = [SlotPollingThrottle]
 
     def get(self, request):
         date_raw = request.query_params.get("date")
@@ -194,12 +261,16 @@ class AvailableSlotsView(APIView):
             raise serializers.ValidationError({"date": ["Invalid booking date."]})
         guests_field = serializers.IntegerField(min_value=1)
         guests_count_value = guests_field.to_internal_value(guests_count)
-        slots = available_slots_for_date(target_date, guests_count_value)
+        slots = coalesced_available_slots(target_date, guests_count_value)
         return Response({"date": target_date.isoformat(), "available_slots": slots})
 
 
-class ClientReservationListCreateView(generics.ListCreateAPIView):
+class ClientReservationListCreateView(SparseFieldsMixin, LeanListMixin, generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsClientUser]
+    pagination_class = KeysetOptInPagination
+    keyset_field = "start_time"
+    nested_fields = ("dishes",)
+    lean_row_builder = staticmethod(reservation_list_rows)
 
     def get_queryset(self):
         return booking_detail_queryset().filter(user=self.request.user).order_by("-start_time")
@@ -209,6 +280,9 @@ class ClientReservationListCreateView(generics.ListCreateAPIView):
             return ReservationCreateUpdateSerializer
         return ReservationListSerializer
 
+    def lean_row_options(self):
+        return {"fields": self.sparse_fields()}
+
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -221,11 +295,17 @@ class ClientReservationListCreateView(generics.ListCreateAPIView):
         return Response(output.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
-class ClientReservationDetailView(generics.RetrieveUpdateDestroyAPIView):
+class ClientReservationDetailView(SparseFieldsMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated, IsClientUser]
+    nested_fields = ("applied_promotions", "dishes")
 
     def get_object(self):
-        booking = get_booking_or_404_for_user(self.request.user, int(self.kwargs["pk"]))
+        booking = get_booking_or_404_for_user(
+            self.request.user,
+            int(self.kwargs["pk"]),
+            items=self.wants("dishes"),
+            promotions=self.wants("applied_promotions"),
+        )
         if booking is None:
             raise Http404
         return booking
@@ -249,20 +329,33 @@ class ClientReservationDetailView(generics.RetrieveUpdateDestroyAPIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class ClientOrderListView(generics.ListAPIView):
+class ClientOrderListView(SparseFieldsMixin, LeanListMixin, generics.ListAPIView):
     serializer_class = OrderListSerializer
     permission_classes = [permissions.IsAuthenticated, IsClientUser]
+    pagination_class = KeysetOptInPagination
+    keyset_field = "scheduled_for"
+    nested_fields = ("dishes",)
+    lean_row_builder = staticmethod(order_list_rows)
 
     def get_queryset(self):
         return order_detail_queryset().filter(user=self.request.user).order_by("-scheduled_for")
 
+    def lean_row_options(self):
+        return {"fields": self.sparse_fields()}
 
-class ClientOrderDetailView(generics.RetrieveAPIView):
+
+class ClientOrderDetailView(SparseFieldsMixin, generics.RetrieveAPIView):
     serializer_class = OrderDetailSerializer
     permission_classes = [permissions.IsAuthenticated, IsClientUser]
+    nested_fields = ("applied_promotions", "dishes")
 
     def get_object(self):
-        order = get_order_or_404_for_user(self.request.user, int(self.kwargs["pk"]))
+        order = get_order_or_404_for_user(
+            self.request.user,
+            int(self.kwargs["pk"]),
+            items=self.wants("dishes"),
+            promotions=self.wants("applied_promotions"),
+        )
         if order is None:
             raise Http404
         return order
@@ -296,3 +389,31 @@ class DishReviewCreateView(generics.CreateAPIView):
             DishReviewSerializer(review, context={"request": request}).data,
             status=status.HTTP_201_CREATED,
         )
+
+
+class ExportView(APIView):
+    """
+    NDJSON stream of rows changed since `?since=<cursor>`; resume from the last line's cursor.
+
+    Deleted rows appear in the same stream as tombstones, `{"type", "cursor", "data": {"id"}, "deleted": true}`,
+    taken from the backup change log. Its delete entries are kept for EXPORT_TOMBSTONE_RETENTION_DAYS after
+    a full backup; a consumer that falls further behind should export again from the start.
+
+    Rows saved within the last EXPORT_SAFETY_LAG_SECONDS are left for a later poll, so a row whose
+    transaction commits after a consumer's read is not skipped. Transactions held open longer than
+    the lag can still be missed.
+    """
+
+    permission_classes = [permissions.IsAuthenticated, IsOperatorOrAdmin]
+
+    def get(self, request, kind):
+        model = EXPORT_MODELS.get(kind)
+        if model is None:
+            raise Http404
+        try:
+            since = request.query_params.get("since")
+            queryset, tombstones = export_queryset(model, since), tombstone_queryset(model, since)
+        except ValueError:
+            raise serializers.ValidationError({"since": ["Invalid cursor."]})
+        rows = export_rows(queryset, tombstones)
+        return StreamingHttpResponse(stream_ndjson(kind, rows), content_type="application/x-ndjson")
@@ -5,3 +5,9 @@ class BookingsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "bookings"
     verbose_name = "Restaurant bookings"
+
+    def ready(self):
+        from bookings import signals
+
+        signals.connect_backup_change_log()
+        signals.connect_content_versions()
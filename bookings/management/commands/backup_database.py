@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from bookings.services.backup import create_backup_archive
+
+
+class Command(BaseCommand):
+    help = "Создаёт резервную копию (пользователи и данные приложения) в виде потокового .json.gz архива."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--indent",
+            type=int,
+            default=None,
+            help="Отступ JSON (по умолчанию без форматирования)",
+        )
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Сохранить только изменения с последней копии (если её нет — будет полная копия)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Полная копия в .tar с отдельным архивом на каждую модель, выгружаемым N процессами",
+        )
+
+    def _progress(self, label, count):
+        self.stdout.write(f"  {label}: {count}")
+
+    def handle(self, *args, **options):
+        archive = create_backup_archive(
+            user=None,
+            progress=self._progress if options["verbosity"] > 0 else None,
+            indent=options["indent"],
+            incremental=options["incremental"],
+            workers=options["workers"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Готово. Архив ({archive.get_kind_display().lower()}): {archive.file.name}"))
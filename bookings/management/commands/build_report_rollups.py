@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from bookings.services.rollups import DEFAULT_REBUILD_DAYS, rebuild_days
+
+
+class Command(BaseCommand):
+    help = (
+        "Пересчитывает дневные агрегаты продаж, бронирований и отзывов для отчётов. "
+        f"По умолчанию пересобирает последние {DEFAULT_REBUILD_DAYS} закрытых дней."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date-from", help="Первый день периода (YYYY-MM-DD)")
+        parser.add_argument("--date-to", help="Последний день периода (YYYY-MM-DD)")
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=DEFAULT_REBUILD_DAYS,
+            help="Сколько последних дней пересобрать, если период не задан",
+        )
+        parser.add_argument(
+            "--missing-only",
+            action="store_true",
+            help="Строить только дни, для которых агрегатов ещё нет (дозаполнение)",
+        )
+
+    def _parse_date(self, value):
+        try:
+            return datetime.fromisoformat(value).date()
+        except ValueError as e:
+            raise CommandError(f"Некорректная дата: {value}") from e
+
+    def handle(self, *args, **options):
+        yesterday = timezone.localdate() - timedelta(days=1)
+        date_to = self._parse_date(options["date_to"]) if options["date_to"] else yesterday
+        if options["date_from"]:
+            date_from = self._parse_date(options["date_from"])
+        else:
+            date_from = date_to - timedelta(days=max(options["days"], 1) - 1)
+        if date_from > date_to:
+            raise CommandError("Начало периода позже окончания.")
+        rebuilt = rebuild_days(date_from, date_to, missing_only=options["missing_only"])
+        self.stdout.write(self.style.SUCCESS(f"Готово. Пересчитано дней: {rebuilt}"))
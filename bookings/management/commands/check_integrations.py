@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from bookings.models import ExternalIntegration
+from bookings.services.integrations import (
+    INTEGRATION_CHECK_DEADLINE_SECONDS,
+    INTEGRATION_CHECK_WORKERS,
+    check_integrations,
+)
+
+
+class Command(BaseCommand):
+    help = "Параллельно проверяет доступность всех активных внешних интеграций и сохраняет результаты."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--deadline",
+            type=float,
+            default=INTEGRATION_CHECK_DEADLINE_SECONDS,
+            help="Общий лимит времени на проверку, секунд",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=INTEGRATION_CHECK_WORKERS,
+            help="Сколько хостов проверять одновременно",
+        )
+
+    def handle(self, *args, **options):
+        integrations = list(ExternalIntegration.objects.filter(is_active=True).order_by("name"))
+        results = check_integrations(integrations, deadline_seconds=options["deadline"], max_workers=options["workers"])
+        failed = 0
+        for integration in integrations:
+            success, note = results[integration.pk]
+            failed += 0 if success else 1
+            line = f"  {integration.name}: {note}"
+            self.stdout.write(line if success else self.style.ERROR(line))
+        self.stdout.write(self.style.SUCCESS(f"Готово. Проверено: {len(integrations)}, с ошибкой: {failed}"))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from bookings.services.token_revocation import TOKEN_PRUNE_BATCH_SIZE, prune_tokens
+
+
+class Command(BaseCommand):
+    help = "Удаляет истёкшие выданные и отозванные JWT-токены пакетами и сбрасывает фильтр отозванных токенов."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=TOKEN_PRUNE_BATCH_SIZE,
+            help="Сколько токенов удалять за один запрос",
+        )
+
+    def handle(self, *args, **options):
+        deleted = prune_tokens(
+            batch_size=max(options["batch_size"], 1),
+            progress=lambda count: self.stdout.write(f"  удалено: {count}"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Готово. Удалено токенов: {deleted}"))
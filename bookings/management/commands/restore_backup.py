@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.models import BackupArchive
+from bookings.services.backup import restore_backup_archive
+
+
+class Command(BaseCommand):
+    help = "Восстанавливает данные из архива резервной копии (потоковая загрузка пакетами в одной транзакции)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("archive_id", type=int, help="ID архива резервной копии")
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Параллельная загрузка независимых таблиц .tar-архива (только PostgreSQL, без общей транзакции)",
+        )
+
+    def _progress(self, label, count):
+        self.stdout.write(f"  {label}: {count}")
+
+    def handle(self, *args, **options):
+        try:
+            archive = BackupArchive.objects.get(pk=options["archive_id"])
+        except BackupArchive.DoesNotExist as e:
+            raise CommandError(f"Архив {options['archive_id']} не найден.") from e
+        try:
+            stats = restore_backup_archive(
+                archive=archive,
+                user=None,
+                progress=self._progress if options["verbosity"] > 0 else None,
+                workers=options["workers"],
+            )
+        except Exception as e:
+            raise CommandError(f"Восстановление не завершено, база может быть восстановлена частично: {e}") from e
+        self.stdout.write(
+            self.style.SUCCESS(f"Готово. Восстановлено записей: {stats['objects']} за {stats['seconds']:.2f} с.")
+        )
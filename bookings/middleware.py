@@ -1,18 +1,65 @@
+from django.conf import settings
 from django.contrib import messages
+from django.middleware.gzip import GZipMiddleware
 from django.shortcuts import redirect
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
 
 from bookings.services.security import logout_for_idle_timeout, session_expired, touch_session
 
+try:
+    import brotli
+except ImportError:  # optional; responses fall back to gzip
+    brotli = None
 
-class SessionTimeoutMiddleware:
-    def __init__(self, get_response):
-        self.get_response = get_response
+RESPONSE_COMPRESSION_MIN_BYTES = getattr(settings, "RESPONSE_COMPRESSION_MIN_BYTES", 1024)
+COMPRESSIBLE_CONTENT_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript", "application/xml")
 
-    def __call__(self, request):
+re_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+
+class SessionTimeoutMiddleware(MiddlewareMixin):
+    # MiddlewareMixin makes this async-capable, so ASGI requests to async views are not adapted to a sync thread.
+    def process_request(self, request):
         if request.user.is_authenticated:
             if session_expired(request):
                 logout_for_idle_timeout(request)
                 messages.info(request, "Сессия завершена из-за бездействия.")
                 return redirect("login")
             touch_session(request)
-        return self.get_response(request)
+        return None
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compresses text responses of at least RESPONSE_COMPRESSION_MIN_BYTES with
+    brotli when the package is installed and the client accepts it, otherwise
+    with gzip. Archives, images and small bodies are passed through as is.
+    """
+
+    def process_response(self, request, response):
+        if not response.get("Content-Type", "").startswith(COMPRESSIBLE_CONTENT_TYPES):
+            return response
+        if not response.streaming and len(response.content) < RESPONSE_COMPRESSION_MIN_BYTES:
+            return response
+        accept_encoding = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if (
+            brotli is None
+            or response.streaming
+            or response.has_header("Content-Encoding")
+            or not re_accepts_brotli.search(accept_encoding)
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        compressed_content = brotli.compress(response.content, quality=5)
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response["Content-Length"] = str(len(response.content))
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response["ETag"] = "W/" + etag
+        response["Content-Encoding"] = "br"
+        return response
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.25 on 2026-10-19 09:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0022_booking_status_labels_ru'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['start_time'], name='bookings_bo_start_t_3f3843_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerorder',
+            index=models.Index(fields=['scheduled_for'], name='bookings_cu_schedul_5a83ed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitemreview',
+            index=models.Index(fields=['created_at'], name='bookings_or_created_d9fe52_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='venuecomplaint',
+            index=models.Index(fields=['created_at'], name='bookings_ve_created_13cb3b_idx'),
+        ),
+    ]
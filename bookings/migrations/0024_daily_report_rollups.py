@@ -0,0 +1,85 @@
+# Generated by Django 3.2.25 on 2026-10-19 09:05
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0023_period_range_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyDishSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('dish_name_snapshot', models.CharField(max_length=255)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Daily dish sales',
+                'verbose_name_plural': 'Daily dish sales',
+                'ordering': ['-day', 'dish_name_snapshot'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyFeedbackSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('complaints_count', models.PositiveIntegerField(default=0)),
+                ('reviews_count', models.PositiveIntegerField(default=0)),
+                ('rating_total', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Daily feedback summary',
+                'verbose_name_plural': 'Daily feedback summaries',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReportRollupDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('built_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Report rollup day',
+                'verbose_name_plural': 'Report rollup days',
+                'ordering': ['-day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyTableBookings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('bookings_count', models.PositiveIntegerField(default=0)),
+                ('completed_count', models.PositiveIntegerField(default=0)),
+                ('cancelled_count', models.PositiveIntegerField(default=0)),
+                ('guests_total', models.PositiveIntegerField(default=0)),
+                ('guest_minutes', models.PositiveIntegerField(default=0)),
+                ('table', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_bookings', to='bookings.table')),
+            ],
+            options={
+                'verbose_name': 'Daily table bookings',
+                'verbose_name_plural': 'Daily table bookings',
+                'ordering': ['-day', 'table'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='dailydishsales',
+            constraint=models.UniqueConstraint(fields=('day', 'dish_name_snapshot'), name='daily_dish_sales_unique_day_dish'),
+        ),
+        migrations.AddConstraint(
+            model_name='dailytablebookings',
+            constraint=models.UniqueConstraint(fields=('day', 'table'), name='daily_table_bookings_unique_day_table'),
+        ),
+    ]
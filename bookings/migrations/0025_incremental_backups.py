@@ -0,0 +1,46 @@
+# Generated by Django 3.2.25 on 2026-10-19 09:12
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0024_daily_report_rollups'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackupChangeLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model_label', models.CharField(max_length=100)),
+                ('object_pk', models.CharField(max_length=64)),
+                ('natural_key', models.TextField(blank=True)),
+                ('action', models.CharField(choices=[('save', 'Save'), ('delete', 'Delete')], max_length=10)),
+                ('changed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Backup change log entry',
+                'verbose_name_plural': 'Backup change log',
+                'ordering': ['changed_at', 'pk'],
+            },
+        ),
+        migrations.AddField(
+            model_name='backuparchive',
+            name='base_archive',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='increments', to='bookings.backuparchive'),
+        ),
+        migrations.AddField(
+            model_name='backuparchive',
+            name='kind',
+            field=models.CharField(choices=[('full', 'Полная'), ('incremental', 'Инкрементальная')], default='full', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='backuparchive',
+            name='snapshot_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
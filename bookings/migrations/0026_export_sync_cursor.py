@@ -0,0 +1,40 @@
+# Generated by Django 3.2.25 on 2026-10-19 09:43
+
+from django.db import migrations, models
+
+
+def backfill_review_updated_at(apps, schema_editor):
+    OrderItemReview = apps.get_model("bookings", "OrderItemReview")
+    OrderItemReview.objects.update(updated_at=models.F("created_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0025_incremental_backups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitemreview',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.RunPython(backfill_review_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['updated_at', 'id'], name='bookings_bo_updated_4ca4a8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customerorder',
+            index=models.Index(fields=['updated_at', 'id'], name='bookings_cu_updated_dd35ee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['updated_at', 'id'], name='bookings_or_updated_af6f75_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='orderitemreview',
+            index=models.Index(fields=['updated_at', 'id'], name='bookings_or_updated_d697ed_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-19 10:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0026_export_sync_cursor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='backuparchive',
+            name='last_restore_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='backuparchive',
+            name='last_restore_failed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -9,6 +9,14 @@ from django.db.models import Max, Q
 from django.utils import timezone
 
 
+def _prefetched_rows(instance, related_name, queryset):
+    """Rows of a relation, taken from prefetch_related() when loaded instead of running `queryset`."""
+    prefetched = getattr(instance, "_prefetched_objects_cache", {})
+    if related_name in prefetched:
+        return list(prefetched[related_name])
+    return list(queryset)
+
+
 class UserProfile(models.Model):
     ROLE_CLIENT = "client"
     ROLE_OPERATOR = "operator"
@@ -346,6 +354,8 @@ class Booking(models.Model):
         indexes = [
             models.Index(fields=["table", "start_time", "end_time"]),
             models.Index(fields=["user", "start_time"]),
+            models.Index(fields=["start_time"]),
+            models.Index(fields=["updated_at", "id"]),
         ]
         constraints = [
             models.CheckConstraint(
@@ -429,20 +439,20 @@ class Booking(models.Model):
     @property
     def applied_promotion(self):
         if hasattr(self, "order"):
-            return self.order.applied_promotions.select_related("promotion").first()
+            return self.order.applied_promotion
         return None
 
     @property
     def applied_promotion_links(self):
         if hasattr(self, "order"):
-            return self.order.applied_promotions.select_related("promotion")
-        return OrderAppliedPromotion.objects.none()
+            return self.order.applied_promotion_links
+        return []
 
     @property
     def dishes(self):
         if hasattr(self, "order"):
-            return self.order.items.select_related("dish")
-        return OrderItem.objects.none()
+            return self.order.dishes
+        return []
 
     def save(self, *args, **kwargs):
         self.full_clean()
@@ -512,6 +522,8 @@ class CustomerOrder(models.Model):
         indexes = [
             models.Index(fields=["user", "scheduled_for"]),
             models.Index(fields=["status", "scheduled_for"]),
+            models.Index(fields=["scheduled_for"]),
+            models.Index(fields=["updated_at", "id"]),
         ]
         constraints = [
             models.CheckConstraint(
@@ -565,15 +577,16 @@ class CustomerOrder(models.Model):
 
     @property
     def applied_promotion(self):
-        return self.applied_promotions.select_related("promotion").first()
+        links = self.applied_promotion_links
+        return links[0] if links else None
 
     @property
     def applied_promotion_links(self):
-        return self.applied_promotions.select_related("promotion")
+        return _prefetched_rows(self, "applied_promotions", self.applied_promotions.select_related("promotion"))
 
     @property
     def dishes(self):
-        return self.items.select_related("dish")
+        return _prefetched_rows(self, "items", self.items.select_related("dish"))
 
     def can_modify_or_cancel(self):
         boundary = self.start_time
@@ -628,7 +641,10 @@ class VenueComplaint(models.Model):
         verbose_name = "Venue complaint"
         verbose_name_plural = "Venue complaints"
         ordering = ["-created_at"]
-        indexes = [models.Index(fields=["user", "-created_at"])]
+        indexes = [
+            models.Index(fields=["user", "-created_at"]),
+            models.Index(fields=["created_at"]),
+        ]
 
     def __str__(self):
         return f"{self.subject} ({self.user.username})"
@@ -850,6 +866,7 @@ class OrderItem(models.Model):
         verbose_name = "Order item"
         verbose_name_plural = "Order items"
         ordering = ["created_at", "pk"]
+        indexes = [models.Index(fields=["updated_at", "id"])]
         constraints = [
             models.UniqueConstraint(
                 fields=["order", "dish"],
@@ -892,11 +909,16 @@ class OrderItemReview(models.Model):
     rating = models.PositiveSmallIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     comment = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name = "Order item review"
         verbose_name_plural = "Order item reviews"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_at"]),
+            models.Index(fields=["updated_at", "id"]),
+        ]
 
     def __str__(self):
         return f"{self.order_item}: {self.rating}"
@@ -1110,8 +1132,24 @@ class LoginAttempt(models.Model):
 
 
 class BackupArchive(models.Model):
+    KIND_FULL = "full"
+    KIND_INCREMENTAL = "incremental"
+    KIND_CHOICES = [
+        (KIND_FULL, "Полная"),
+        (KIND_INCREMENTAL, "Инкрементальная"),
+    ]
+
     file = models.FileField(upload_to="backups/")
     original_name = models.CharField(max_length=255, blank=True)
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, default=KIND_FULL)
+    base_archive = models.ForeignKey(
+        "self",
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="increments",
+    )
+    snapshot_at = models.DateTimeField(null=True, blank=True)
     created_by = models.ForeignKey(
         User,
         on_delete=models.SET_NULL,
@@ -1129,6 +1167,8 @@ class BackupArchive(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     last_restored_at = models.DateTimeField(null=True, blank=True)
     restore_count = models.PositiveIntegerField(default=0)
+    last_restore_failed_at = models.DateTimeField(null=True, blank=True)
+    last_restore_error = models.TextField(blank=True)
 
     class Meta:
         verbose_name = "Backup archive"
@@ -1137,3 +1177,118 @@ class BackupArchive(models.Model):
 
     def __str__(self):
         return self.original_name or self.file.name
+
+    @property
+    def last_restore_failed(self):
+        if self.last_restore_failed_at is None:
+            return False
+        return self.last_restored_at is None or self.last_restore_failed_at > self.last_restored_at
+
+    def chain(self):
+        archives = [self]
+        while archives[-1].base_archive_id:
+            archives.append(archives[-1].base_archive)
+        return archives[::-1]
+
+
+class BackupChangeLog(models.Model):
+    ACTION_SAVE = "save"
+    ACTION_DELETE = "delete"
+    ACTION_CHOICES = [
+        (ACTION_SAVE, "Save"),
+        (ACTION_DELETE, "Delete"),
+    ]
+
+    model_label = models.CharField(max_length=100)
+    object_pk = models.CharField(max_length=64)
+    natural_key = models.TextField(blank=True)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    changed_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        verbose_name = "Backup change log entry"
+        verbose_name_plural = "Backup change log"
+        ordering = ["changed_at", "pk"]
+
+    def __str__(self):
+        return f"{self.action} {self.model_label}#{self.object_pk}"
+
+
+class ReportRollupDay(models.Model):
+    day = models.DateField(unique=True)
+    built_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Report rollup day"
+        verbose_name_plural = "Report rollup days"
+        ordering = ["-day"]
+
+    def __str__(self):
+        return str(self.day)
+
+
+class DailyDishSales(models.Model):
+    day = models.DateField()
+    dish_name_snapshot = models.CharField(max_length=255)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    order_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Daily dish sales"
+        verbose_name_plural = "Daily dish sales"
+        ordering = ["-day", "dish_name_snapshot"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "dish_name_snapshot"],
+                name="daily_dish_sales_unique_day_dish",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day}: {self.dish_name_snapshot}"
+
+
+class DailyTableBookings(models.Model):
+    day = models.DateField()
+    table = models.ForeignKey(Table, on_delete=models.CASCADE, related_name="daily_bookings")
+    bookings_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    cancelled_count = models.PositiveIntegerField(default=0)
+    guests_total = models.PositiveIntegerField(default=0)
+    guest_minutes = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Daily table bookings"
+        verbose_name_plural = "Daily table bookings"
+        ordering = ["-day", "table"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["day", "table"],
+                name="daily_table_bookings_unique_day_table",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.day}: {self.table}"
+
+
+class DailyFeedbackSummary(models.Model):
+    day = models.DateField(unique=True)
+    complaints_count = models.PositiveIntegerField(default=0)
+    reviews_count = models.PositiveIntegerField(default=0)
+    rating_total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Daily feedback summary"
+        verbose_name_plural = "Daily feedback summaries"
+        ordering = ["-day"]
+
+    def __str__(self):
+        return str(self.day)
+
+    @property
+    def rating_avg(self):
+        if not self.reviews_count:
+            return None
+        return self.rating_total / self.reviews_count
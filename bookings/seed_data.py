@@ -27,6 +27,7 @@ from bookings.models import (
     WeeklyMenuDaySettings,
     WeeklyMenuItem,
 )
+from bookings.services.rollups import clear_rollups
 
 User = get_user_model()
 
@@ -35,6 +36,7 @@ MIN_ROWS = 10
 
 def clear_all_except_table_dish() -> None:
     Session.objects.all().delete()
+    clear_rollups()
     OrderItemReview.objects.all().delete()
     OrderAppliedPromotion.objects.all().delete()
     OrderItem.objects.all().delete()
@@ -11,6 +11,7 @@ from bookings.models import (
     ServiceWeekdayWindow,
     Table,
 )
+from bookings.services.singleflight import get_flight
 
 MOSCOW_TZ = pytz.timezone("Europe/Moscow")
 
@@ -198,3 +199,16 @@ def available_slots_for_date(target_date, guests_count, durations=None):
             if is_available:
                 available_slots[duration].append(time_str)
     return available_slots
+
+
+def coalesced_occupied_slots(table, target_date, booking_id=None):
+    """occupied_slots_for_table_date shared between concurrent identical polls."""
+    key = (table.pk, target_date, str(booking_id or ""))
+    return get_flight("occupied-slots").do(key, lambda: occupied_slots_for_table_date(table, target_date, booking_id=booking_id))
+
+
+def coalesced_available_slots(target_date, guests_count):
+    """available_slots_for_date shared between concurrent identical polls."""
+    return get_flight("available-slots").do(
+        (target_date, guests_count), lambda: available_slots_for_date(target_date, guests_count)
+    )
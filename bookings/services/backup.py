@@ -1,57 +1,601 @@
 import gzip
 import io
+import json
+import multiprocessing
 import os
-from datetime import datetime
+import tarfile
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
 
-from django.core.files.base import ContentFile
-from django.core.management import call_command
+from django.apps import apps
+from django.conf import settings
+from django.core import serializers
+from django.core.files import File
+from django.core.management.color import no_style
+from django.core.serializers.json import Serializer as JSONSerializer
+from django.core.serializers.python import Deserializer as PythonDeserializer
+from django.db import DEFAULT_DB_ALIAS, connection, connections, transaction
+from django.db.models import Q
 from django.utils import timezone
 
-from bookings.models import BackupArchive
+from bookings.models import BackupArchive, BackupChangeLog, ReportRollupDay
+from bookings.services import backup_worker
+from bookings.services.content_versions import CONTENT_GROUPS, bump_content_version
+from bookings.services.export import EXPORT_TOMBSTONE_LABELS, EXPORT_TOMBSTONE_RETENTION_DAYS
 
 
 BACKUP_APP_LABELS = [
     "auth.user",
     "bookings",
 ]
+BACKUP_CHUNK_SIZE = 2000
+BACKUP_PROGRESS_EVERY = 5000
+RESTORE_BATCH_SIZE = 1000
+RESTORE_READ_SIZE = 64 * 1024
+JSON_SEPARATORS = " \t\r\n,"
+GZIP_MAGIC = b"\x1f\x8b"
+# Rows are stamped at save time but committed later, so an increment also re-reads this much before its base
+# snapshot; a row committed after the base dump read its table is otherwise in neither archive. Replays are idempotent.
+BACKUP_INCREMENTAL_OVERLAP_SECONDS = getattr(settings, "BACKUP_INCREMENTAL_OVERLAP_SECONDS", 60)
+PARALLEL_BACKUP_FORMAT = "bookings-parallel-backup/1"
+PARALLEL_BACKUP_MANIFEST = "manifest.json"
+# Derived or bookkeeping tables: rebuilt on demand instead of being archived.
+BACKUP_EXCLUDED_MODELS = {
+    "bookings.BackupChangeLog",
+    "bookings.DailyDishSales",
+    "bookings.DailyFeedbackSummary",
+    "bookings.DailyTableBookings",
+    "bookings.ReportRollupDay",
+}
 
+# Bookkeeping tables written on logins and backup runs: kept in full backups but not change-logged.
+BACKUP_CHANGE_LOG_EXCLUDED_MODELS = {
+    "bookings.BackupArchive",
+    "bookings.LoginAttempt",
+}
 
-def create_backup_archive(*, user):
-    buffer = io.StringIO()
-    call_command(
-        "dumpdata",
-        *BACKUP_APP_LABELS,
-        indent=2,
+
+def backup_models():
+    app_list = {}
+    for label in BACKUP_APP_LABELS:
+        app_label, _, model_name = label.partition(".")
+        app_config = apps.get_app_config(app_label)
+        if model_name:
+            app_list.setdefault(app_config, []).append(app_config.get_model(model_name))
+        else:
+            app_list[app_config] = None
+    return [
+        model
+        for model in serializers.sort_dependencies(app_list.items())
+        if not model._meta.proxy and model._meta.managed and model._meta.label not in BACKUP_EXCLUDED_MODELS
+    ]
+
+
+def change_logged_models():
+    return [model for model in backup_models() if model._meta.label not in BACKUP_CHANGE_LOG_EXCLUDED_MODELS]
+
+
+def has_updated_at(model):
+    return any(field.name == "updated_at" for field in model._meta.concrete_fields)
+
+
+def _natural_key(instance):
+    if hasattr(instance, "natural_key") and hasattr(type(instance)._default_manager, "get_by_natural_key"):
+        return json.dumps(list(instance.natural_key()), ensure_ascii=False)
+    return ""
+
+
+def _get_by_natural_key(model, natural_key, using=DEFAULT_DB_ALIAS):
+    try:
+        return model._default_manager.db_manager(using).get_by_natural_key(*natural_key)
+    except model.DoesNotExist:
+        return None
+
+
+def record_backup_change(instance, action):
+    BackupChangeLog.objects.create(
+        model_label=instance._meta.label_lower,
+        object_pk=str(instance.pk),
+        natural_key=_natural_key(instance) if action == BackupChangeLog.ACTION_DELETE else "",
+        action=action,
+    )
+
+
+def record_backup_changes(queryset):
+    # For queryset.update() calls on models without updated_at, which send no signals.
+    label = queryset.model._meta.label_lower
+    BackupChangeLog.objects.bulk_create(
+        [
+            BackupChangeLog(model_label=label, object_pk=str(pk), action=BackupChangeLog.ACTION_SAVE)
+            for pk in queryset.values_list("pk", flat=True)
+        ]
+    )
+
+
+def _backup_queryset(model):
+    # Natural foreign keys are rendered from the related row, so fetch it in the same query.
+    natural_relations = [
+        field.name
+        for field in model._meta.concrete_fields
+        if field.is_relation and hasattr(field.related_model, "natural_key")
+    ]
+    queryset = model._default_manager.order_by(model._meta.pk.name)
+    return queryset.select_related(*natural_relations) if natural_relations else queryset
+
+
+def _full_querysets(models):
+    for model in models:
+        yield model, _backup_queryset(model)
+
+
+def _changed_querysets(models, since):
+    changed_pks = {}
+    saved = BackupChangeLog.objects.filter(changed_at__gte=since, action=BackupChangeLog.ACTION_SAVE)
+    for label, pk in saved.values_list("model_label", "object_pk").iterator(chunk_size=BACKUP_CHUNK_SIZE):
+        changed_pks.setdefault(label, set()).add(pk)
+    for model in models:
+        queryset = _backup_queryset(model)
+        if has_updated_at(model):
+            yield model, queryset.filter(updated_at__gte=since)
+            continue
+        pks = sorted(changed_pks.get(model._meta.label_lower, ()))
+        for offset in range(0, len(pks), BACKUP_CHUNK_SIZE):
+            yield model, queryset.filter(pk__in=pks[offset:offset + BACKUP_CHUNK_SIZE])
+
+
+def _deleted_records(models, since):
+    order = {model._meta.label_lower: index for index, model in enumerate(models)}
+    deleted = {}
+    entries = BackupChangeLog.objects.filter(changed_at__gte=since, action=BackupChangeLog.ACTION_DELETE)
+    for label, pk, natural_key in entries.values_list("model_label", "object_pk", "natural_key").iterator(
+        chunk_size=BACKUP_CHUNK_SIZE
+    ):
+        if label in order:
+            deleted[(label, pk)] = natural_key
+    # Dependents are removed before the rows they point to.
+    for (label, pk), natural_key in sorted(deleted.items(), key=lambda item: -order[item[0][0]]):
+        model = apps.get_model(label)
+        record = {"model": label, "deleted": True}
+        if natural_key:
+            record["natural_key"] = json.loads(natural_key)
+            current = _get_by_natural_key(model, record["natural_key"])
+        else:
+            record["pk"] = model._meta.pk.to_python(pk)
+            current = model._default_manager.filter(pk=pk).first()
+        if current is None:
+            yield record
+
+
+def _iter_backup_objects(querysets, progress=None):
+    counts = {}
+    label = None
+    for model, queryset in querysets:
+        if progress and label and label != model._meta.label:
+            progress(label, counts[label])
+        label = model._meta.label
+        counts.setdefault(label, 0)
+        for obj in queryset.iterator(chunk_size=BACKUP_CHUNK_SIZE):
+            yield obj
+            counts[label] += 1
+            if progress and counts[label] % BACKUP_PROGRESS_EVERY == 0:
+                progress(label, counts[label])
+    if progress and label:
+        progress(label, counts[label])
+
+
+class BackupJSONSerializer(JSONSerializer):
+    """JSON serializer that appends plain records (deletion markers) after the objects."""
+
+    def __init__(self, extra_records=()):
+        self.extra_records = extra_records
+
+    def end_serialization(self):
+        indent = self.options.get("indent")
+        for record in self.extra_records:
+            if not self.first:
+                self.stream.write("," if indent else ", ")
+            if indent:
+                self.stream.write("\n")
+            json.dump(record, self.stream, **self.json_kwargs)
+            self.first = False
+        super().end_serialization()
+
+
+def write_backup_stream(stream, *, progress=None, indent=None, since=None):
+    if since is None:
+        querysets, extra_records = _full_querysets(backup_models()), ()
+    else:
+        models = change_logged_models()
+        since -= timedelta(seconds=BACKUP_INCREMENTAL_OVERLAP_SECONDS)
+        querysets, extra_records = _changed_querysets(models, since), _deleted_records(models, since)
+    BackupJSONSerializer(extra_records).serialize(
+        _iter_backup_objects(querysets, progress=progress),
+        stream=stream,
+        indent=indent,
         use_natural_foreign_keys=True,
         use_natural_primary_keys=True,
-        stdout=buffer,
     )
-    json_bytes = buffer.getvalue().encode("utf-8")
-    gz_bytes = gzip.compress(json_bytes)
-    stamp = timezone.localtime(timezone.now()).strftime("%Y%m%d_%H%M%S")
-    filename = f"backup_{stamp}.json.gz"
-    archive = BackupArchive(created_by=user, original_name=filename)
-    archive.file.save(filename, ContentFile(gz_bytes), save=False)
+
+
+def latest_backup_base():
+    latest = BackupArchive.objects.filter(snapshot_at__isnull=False).order_by("-snapshot_at").first()
+    if latest is None:
+        return None
+    # After a restore (or a failed, possibly partial one) the database no longer matches the chain,
+    # so the next backup must be full.
+    restored = Q(last_restored_at__gte=latest.snapshot_at) | Q(last_restore_failed_at__gte=latest.snapshot_at)
+    if BackupArchive.objects.filter(restored).exists():
+        return None
+    return latest
+
+
+def model_levels(models):
+    """
+    Group models by foreign-key depth: level 0 references no other archived
+    model, level N only references models of lower levels. Members of one
+    level are independent of each other and can be loaded side by side.
+    """
+    by_label = {model._meta.label_lower: model for model in models}
+    levels = {}
+
+    def level_of(label, visiting=()):
+        if label in levels:
+            return levels[label]
+        if label in visiting:
+            return 0
+        dependencies = {
+            field.related_model._meta.label_lower
+            for field in by_label[label]._meta.concrete_fields
+            if field.is_relation and field.related_model._meta.label_lower in by_label
+        } - {label}
+        levels[label] = 1 + max((level_of(dep, visiting + (label,)) for dep in dependencies), default=-1)
+        return levels[label]
+
+    for label in by_label:
+        level_of(label)
+    return levels
+
+
+@contextmanager
+def _snapshot_transaction(snapshot_id):
+    if not snapshot_id:
+        yield
+        return
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cursor.execute("SET TRANSACTION SNAPSHOT %s", [snapshot_id])
+        yield
+
+
+@contextmanager
+def _exported_snapshot(workers):
+    # On PostgreSQL every worker reads the same exported snapshot, so the
+    # per-model members stay consistent with each other.
+    if workers <= 1 or connection.vendor != "postgresql":
+        yield None
+        return
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cursor.execute("SELECT pg_export_snapshot()")
+            yield cursor.fetchone()[0]
+
+
+def dump_model_member(label, path, indent=None, snapshot_id=None):
+    model = apps.get_model(label)
+    counts = {}
+    try:
+        with _snapshot_transaction(snapshot_id), gzip.open(path, "wt", encoding="utf-8") as stream:
+            serializers.serialize(
+                "json",
+                _iter_backup_objects(_full_querysets([model]), progress=counts.__setitem__),
+                stream=stream,
+                indent=indent,
+                use_natural_foreign_keys=True,
+                use_natural_primary_keys=True,
+            )
+    finally:
+        if snapshot_id:
+            connection.close()
+    return label, counts.get(model._meta.label, 0)
+
+
+def write_parallel_backup(raw_file, *, workers, progress=None, indent=None):
+    models = backup_models()
+    levels = model_levels(models)
+    members = [
+        (model._meta.label_lower, f"{index:02d}_{model._meta.label_lower}.json.gz")
+        for index, model in enumerate(models)
+    ]
+    counts = {}
+    with tempfile.TemporaryDirectory() as work_dir, _exported_snapshot(workers) as snapshot_id:
+        tasks = [(label, os.path.join(work_dir, name), indent, snapshot_id) for label, name in members]
+        if workers <= 1:
+            results = (dump_model_member(*task) for task in tasks)
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=backup_worker.init_worker,
+            )
+            futures = [executor.submit(backup_worker.dump_model_member, *task) for task in tasks]
+            results = (future.result() for future in as_completed(futures))
+        try:
+            for label, count in results:
+                counts[label] = count
+                if progress:
+                    progress(apps.get_model(label)._meta.label, count)
+        finally:
+            if workers > 1:
+                executor.shutdown(cancel_futures=True)
+        manifest = {
+            "format": PARALLEL_BACKUP_FORMAT,
+            "members": [
+                {"name": name, "model": label, "level": levels[label], "count": counts[label]}
+                for label, name in members
+            ],
+        }
+        with tarfile.open(fileobj=raw_file, mode="w") as archive_tar:
+            manifest_bytes = json.dumps(manifest, ensure_ascii=False, indent=2).encode("utf-8")
+            manifest_info = tarfile.TarInfo(PARALLEL_BACKUP_MANIFEST)
+            manifest_info.size = len(manifest_bytes)
+            archive_tar.addfile(manifest_info, io.BytesIO(manifest_bytes))
+            for _, name in members:
+                archive_tar.add(os.path.join(work_dir, name), arcname=name)
+
+
+def create_backup_archive(*, user, progress=None, indent=None, incremental=False, workers=None):
+    snapshot_at = timezone.now()
+    base_archive = latest_backup_base() if incremental else None
+    kind = BackupArchive.KIND_INCREMENTAL if base_archive else BackupArchive.KIND_FULL
+    stamp = timezone.localtime(snapshot_at).strftime("%Y%m%d_%H%M%S")
+    if kind == BackupArchive.KIND_INCREMENTAL:
+        filename = f"backup_{stamp}_incremental.json.gz"
+    elif workers:
+        filename = f"backup_{stamp}.tar"
+    else:
+        filename = f"backup_{stamp}.json.gz"
+    with tempfile.TemporaryFile() as raw_file:
+        if filename.endswith(".tar"):
+            write_parallel_backup(raw_file, workers=workers, progress=progress, indent=indent)
+        else:
+            with gzip.GzipFile(filename=filename[:-3], mode="wb", fileobj=raw_file) as gz_file:
+                with io.TextIOWrapper(gz_file, encoding="utf-8") as text_file:
+                    write_backup_stream(
+                        text_file,
+                        progress=progress,
+                        indent=indent,
+                        since=base_archive.snapshot_at if base_archive else None,
+                    )
+        raw_file.seek(0)
+        archive = BackupArchive(
+            created_by=user,
+            original_name=filename,
+            kind=kind,
+            base_archive=base_archive,
+            snapshot_at=snapshot_at,
+        )
+        archive.file.save(filename, File(raw_file), save=False)
     archive.save()
+    if kind == BackupArchive.KIND_FULL:
+        # Delete entries of exported models double as export tombstones, so they outlive the snapshot for a while.
+        tombstones = Q(
+            action=BackupChangeLog.ACTION_DELETE,
+            model_label__in=EXPORT_TOMBSTONE_LABELS,
+            changed_at__gte=snapshot_at - timedelta(days=EXPORT_TOMBSTONE_RETENTION_DAYS),
+        )
+        BackupChangeLog.objects.filter(changed_at__lt=snapshot_at).exclude(tombstones).delete()
     return archive
 
 
-def restore_backup_archive(*, archive, user):
-    archive.file.open("rb")
-    raw_bytes = archive.file.read()
-    archive.file.close()
-    json_bytes = gzip.decompress(raw_bytes)
-    temp_name = f"restore_{timezone.now().timestamp():.0f}.json"
-    temp_path = os.path.join(os.path.dirname(archive.file.path), temp_name)
-    with open(temp_path, "wb") as temp_file:
-        temp_file.write(json_bytes)
+def _iter_json_array(stream, read_size=RESTORE_READ_SIZE):
+    decoder = json.JSONDecoder()
+    buffer = ""
+    position = 0
+    opened = False
+    eof = False
+    while True:
+        while position < len(buffer) and buffer[position] in JSON_SEPARATORS:
+            position += 1
+        if position < len(buffer):
+            if not opened:
+                if buffer[position] != "[":
+                    raise ValueError("Архив резервной копии не содержит JSON-массив.")
+                opened = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                record, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield record
+                continue
+        if eof:
+            raise ValueError("Архив резервной копии обрывается до конца JSON-массива.")
+        chunk = stream.read(read_size)
+        eof = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def _insert_batch(model, batch, using):
+    manager = model._base_manager.db_manager(using)
+    with_pk = [item for item in batch if item.object.pk is not None]
+    existing = set(manager.filter(pk__in=[item.object.pk for item in with_pk]).values_list("pk", flat=True))
+    created = [item.object for item in with_pk if item.object.pk not in existing]
+    updated = [item.object for item in with_pk if item.object.pk in existing]
+    fields = model._meta.local_concrete_fields
+    if created:
+        # raw=True keeps auto_now/auto_now_add values from the archive, like loaddata does; bulk_create
+        # has no such switch. QuerySet._insert is private Django API (same signature 3.2 through 5.x,
+        # requirements pin Django<4.0); the restore tests check archived timestamps survive.
+        batch_size = max(connections[using].ops.bulk_batch_size(fields, created), 1)
+        for offset in range(0, len(created), batch_size):
+            manager._insert(created[offset:offset + batch_size], fields=fields, using=using, raw=True)
+    if updated:
+        manager.bulk_update(updated, [field.name for field in fields if not field.primary_key], batch_size=RESTORE_BATCH_SIZE)
+    for item in batch:
+        if item.object.pk is None:
+            item.save(using=using)
+            continue
+        for name, values in (item.m2m_data or {}).items():
+            if values or item.object.pk in existing:
+                getattr(item.object, name).set(values)
+
+
+def _record_kind(record):
+    return record.get("model"), bool(record.get("deleted"))
+
+
+def _iter_record_batches(records):
+    # Records are deserialized one batch at a time, after the previous model's
+    # rows are written, so natural-key lookups see the freshly restored rows.
+    batch = []
+    for record in records:
+        if batch and (_record_kind(record) != _record_kind(batch[0]) or len(batch) >= RESTORE_BATCH_SIZE):
+            yield batch
+            batch = []
+        batch.append(record)
+    if batch:
+        yield batch
+
+
+def _delete_batch(records, using):
+    model = apps.get_model(records[0]["model"])
+    manager = model._base_manager.db_manager(using)
+    pks = [record["pk"] for record in records if "pk" in record]
+    for record in records:
+        if "natural_key" in record:
+            obj = _get_by_natural_key(model, record["natural_key"], using=using)
+            if obj is not None:
+                pks.append(obj.pk)
+    if pks:
+        manager.filter(pk__in=pks).delete()
+    return model
+
+
+def load_backup_stream(stream, *, using=DEFAULT_DB_ALIAS, progress=None):
+    connection = connections[using]
+    counts = {}
+    loaded_models = set()
+    deferred = []
+    with transaction.atomic(using=using):
+        with connection.constraint_checks_disabled():
+            for records in _iter_record_batches(_iter_json_array(stream)):
+                if records[0].get("deleted"):
+                    loaded_models.add(_delete_batch(records, using))
+                    continue
+                batch = list(
+                    PythonDeserializer(records, using=using, ignorenonexistent=True, handle_forward_references=True)
+                )
+                if not batch:
+                    continue
+                model = type(batch[0].object)
+                _insert_batch(model, batch, using)
+                deferred.extend(item for item in batch if item.deferred_fields)
+                loaded_models.add(model)
+                label = model._meta.label
+                counts[label] = counts.get(label, 0) + len(batch)
+                if progress:
+                    progress(label, counts[label])
+            for item in deferred:
+                item.save_deferred_fields(using=using)
+        connection.check_constraints(table_names=[model._meta.db_table for model in loaded_models])
+        sequence_sql = connection.ops.sequence_reset_sql(no_style(), loaded_models)
+        if sequence_sql:
+            with connection.cursor() as cursor:
+                for line in sequence_sql:
+                    cursor.execute(line)
+        ReportRollupDay.objects.using(using).all().delete()
+    return counts
+
+
+def _merge_counts(total, counts):
+    for label, count in counts.items():
+        total[label] = total.get(label, 0) + count
+    return total
+
+
+def _load_tar_member(open_file, name, progress=None, close_connection=False):
     try:
-        call_command("loaddata", temp_path, verbosity=0)
+        with open_file() as raw_file, tarfile.open(fileobj=raw_file, mode="r") as archive_tar:
+            with gzip.open(archive_tar.extractfile(name), "rt", encoding="utf-8") as stream:
+                return load_backup_stream(stream, progress=progress)
     finally:
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        if close_connection:
+            connection.close()
+
+
+def load_parallel_backup(open_file, *, progress=None, workers=1):
+    with open_file() as raw_file, tarfile.open(fileobj=raw_file, mode="r") as archive_tar:
+        manifest = json.load(archive_tar.extractfile(PARALLEL_BACKUP_MANIFEST))
+    if manifest.get("format") != PARALLEL_BACKUP_FORMAT:
+        raise ValueError("Неизвестный формат архива резервной копии.")
+    levels = {}
+    for member in manifest["members"]:
+        levels.setdefault(member["level"], []).append(member["name"])
+    counts = {}
+    for level in sorted(levels):
+        names = levels[level]
+        if workers <= 1 or len(names) == 1:
+            for name in names:
+                _merge_counts(counts, _load_tar_member(open_file, name, progress))
+            continue
+        # Each member of a level commits in its own worker connection.
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_load_tar_member, open_file, name, progress, True) for name in names]
+            for future in as_completed(futures):
+                _merge_counts(counts, future.result())
+    return counts
+
+
+def _load_archive(archive, *, progress=None, workers=1):
+    def open_file():
+        return archive.file.storage.open(archive.file.name, "rb")
+
+    with open_file() as raw_file:
+        is_gzip = raw_file.read(2) == GZIP_MAGIC
+    if not is_gzip:
+        return load_parallel_backup(open_file, progress=progress, workers=workers)
+    with open_file() as raw_file, gzip.open(raw_file, "rt", encoding="utf-8") as text_file:
+        return load_backup_stream(text_file, progress=progress)
+
+
+def restore_backup_archive(*, archive, user, progress=None, workers=1):
+    started = time.monotonic()
+    counts = {}
+    chain = archive.chain()
+    # Parallel loading gives up the single transaction, so it is only used where
+    # concurrent writers are supported; SQLite always restores serially.
+    parallel = workers > 1 and connection.vendor == "postgresql"
+    try:
+        with nullcontext() if parallel else transaction.atomic():
+            # An incremental archive is replayed on top of its full base and every earlier increment.
+            for chain_archive in chain:
+                _merge_counts(counts, _load_archive(chain_archive, progress=progress, workers=workers if parallel else 1))
+    except Exception as exc:
+        # A parallel restore commits member by member, so a failure can leave the database partly restored.
+        archive.last_restore_failed_at = timezone.now()
+        archive.last_restore_error = f"{type(exc).__name__}: {exc}"
+        archive.save(update_fields=["last_restore_failed_at", "last_restore_error"])
+        raise
+    # Restored rows are inserted without signals, so cached responses and ETags are dropped explicitly.
+    bump_content_version(*CONTENT_GROUPS)
     archive.last_restored_at = timezone.now()
     archive.restored_by = user
     archive.restore_count += 1
     archive.save(update_fields=["last_restored_at", "restored_by", "restore_count"])
-    return archive
+    return {
+        "objects": sum(counts.values()),
+        "models": counts,
+        "archives": len(chain),
+        "seconds": time.monotonic() - started,
+    }
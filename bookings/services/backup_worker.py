@@ -0,0 +1,16 @@
+"""
+Entry points for backup worker processes. Workers are spawned, so this module
+must be importable before Django is set up: models are imported only after
+init_worker() has run.
+"""
+import django
+
+
+def init_worker():
+    django.setup()
+
+
+def dump_model_member(*args):
+    from bookings.services.backup import dump_model_member
+
+    return dump_model_member(*args)
@@ -0,0 +1,56 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from bookings.services.shared_cache import default_cache_is_shared
+
+CATALOG = "catalog"
+STOCK = "stock"
+NEWS = "news"
+CONTENT_GROUPS = (CATALOG, STOCK, NEWS)
+
+# Time-dependent data (stock freed by finished bookings, promotion and news windows) is re-validated per bucket.
+CONTENT_ETAG_BUCKET_SECONDS = getattr(settings, "CONTENT_ETAG_BUCKET_SECONDS", 60)
+# None: only when the default cache is shared, since a bump in one worker must reach every other one.
+CONTENT_VERSIONS_ENABLED = getattr(settings, "CONTENT_VERSIONS_ENABLED", None)
+
+
+def content_versions_enabled():
+    if CONTENT_VERSIONS_ENABLED is not None:
+        return CONTENT_VERSIONS_ENABLED
+    return default_cache_is_shared()
+
+
+def _version_key(group):
+    return f"content-version:{group}"
+
+
+def content_versions(*groups):
+    keys = [_version_key(group) for group in groups]
+    versions = cache.get_many(keys)
+    missing = [key for key in keys if key not in versions]
+    if missing:
+        # A fresh, time-based start value keeps ETags from repeating after a cache flush.
+        for key in missing:
+            cache.add(key, time.time_ns(), None)
+        versions.update(cache.get_many(missing))
+    return [versions.get(key, 0) for key in keys]
+
+
+def bump_content_version(*groups):
+    for group in groups:
+        key = _version_key(group)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def content_etag(*groups, extra=""):
+    if not content_versions_enabled():
+        return None
+    bucket = int(time.time() // CONTENT_ETAG_BUCKET_SECONDS)
+    parts = [*groups, *map(str, content_versions(*groups)), str(bucket), str(extra)]
+    return '"%s"' % hashlib.md5(":".join(parts).encode()).hexdigest()
@@ -0,0 +1,104 @@
+import heapq
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+
+from bookings.models import BackupChangeLog, Booking, CustomerOrder, OrderItem, OrderItemReview
+from bookings.services.pagination import decode_cursor, encode_cursor_value
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_LINES_PER_CHUNK = 500
+# updated_at is stamped at save time but the row only becomes visible at commit, so the newest rows are held
+# back until transactions that saved them have committed; otherwise a cursor could move past them for good.
+EXPORT_SAFETY_LAG_SECONDS = getattr(settings, "EXPORT_SAFETY_LAG_SECONDS", 60)
+# Delete entries of exported models survive the change log pruning after full backups for this long.
+EXPORT_TOMBSTONE_RETENTION_DAYS = getattr(settings, "EXPORT_TOMBSTONE_RETENTION_DAYS", 7)
+
+EXPORT_MODELS = {
+    "bookings": Booking,
+    "orders": CustomerOrder,
+    "order-items": OrderItem,
+    "reviews": OrderItemReview,
+}
+
+
+EXPORT_TOMBSTONE_LABELS = frozenset(model._meta.label_lower for model in EXPORT_MODELS.values())
+
+
+def export_fields(model):
+    return [field.attname for field in model._meta.concrete_fields]
+
+
+def _decode_export_cursor(model, cursor):
+    # Export cursors reuse the pagination format; its last slot marks a position in the tombstone stream.
+    if not cursor:
+        return None
+    return decode_cursor(cursor, model, "updated_at")
+
+
+def export_queryset(model, cursor=None):
+    """
+    Rows changed after `cursor` and at least EXPORT_SAFETY_LAG_SECONDS ago, in (updated_at, id) order;
+    raises ValueError for a malformed cursor.
+    """
+    settled = timezone.now() - timedelta(seconds=EXPORT_SAFETY_LAG_SECONDS)
+    queryset = model._default_manager.filter(updated_at__lte=settled)
+    position = _decode_export_cursor(model, cursor)
+    if position:
+        updated_at, pk, deleted = position
+        after = Q(updated_at__gt=updated_at)
+        if not deleted:
+            after |= Q(updated_at=updated_at, id__gt=pk)
+        queryset = queryset.filter(after)
+    return queryset.order_by("updated_at", "id").values(*export_fields(model))
+
+
+def tombstone_queryset(model, cursor=None):
+    """
+    Change log delete entries for `model` after `cursor`, with the same lag as export_queryset, in
+    (changed_at, id) order; at equal timestamps tombstones sort after rows.
+    """
+    settled = timezone.now() - timedelta(seconds=EXPORT_SAFETY_LAG_SECONDS)
+    queryset = BackupChangeLog.objects.filter(
+        model_label=model._meta.label_lower,
+        action=BackupChangeLog.ACTION_DELETE,
+        changed_at__lte=settled,
+    )
+    position = _decode_export_cursor(model, cursor)
+    if position:
+        changed_at, pk, deleted = position
+        after = Q(changed_at__gt=changed_at)
+        after |= Q(changed_at=changed_at, id__gt=pk) if deleted else Q(changed_at=changed_at)
+        queryset = queryset.filter(after)
+    return queryset.order_by("changed_at", "id").values_list("changed_at", "id", "object_pk")
+
+
+def export_rows(queryset, tombstones=None, chunk_size=EXPORT_CHUNK_SIZE):
+    # Server-side chunks keep memory flat; each row carries the cursor to resume after it.
+    rows = (((row["updated_at"], 0, row["id"]), row) for row in queryset.iterator(chunk_size=chunk_size))
+    deleted = ()
+    if tombstones is not None:
+        deleted = (
+            ((changed_at, 1, pk), {"id": int(object_pk)})
+            for changed_at, pk, object_pk in tombstones.iterator(chunk_size=chunk_size)
+        )
+    for (changed_at, is_tombstone, pk), row in heapq.merge(rows, deleted, key=lambda item: item[0]):
+        yield encode_cursor_value(changed_at, pk, is_tombstone), row, bool(is_tombstone)
+
+
+def stream_ndjson(kind, rows, lines_per_chunk=EXPORT_LINES_PER_CHUNK):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    lines = []
+    for cursor, row, deleted in rows:
+        record = {"type": kind, "cursor": cursor, "data": row}
+        if deleted:
+            record["deleted"] = True
+        lines.append(encoder.encode(record))
+        if len(lines) >= lines_per_chunk:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
@@ -0,0 +1,220 @@
+import http.client
+import ssl
+import threading
+import time
+from collections import namedtuple
+from queue import Empty, Full, LifoQueue
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+OUTBOUND_POOL_SIZE = getattr(settings, "OUTBOUND_HTTP_POOL_SIZE", 4)
+OUTBOUND_MAX_CONCURRENCY = getattr(settings, "OUTBOUND_HTTP_MAX_CONCURRENCY", 4)
+CIRCUIT_FAILURE_THRESHOLD = getattr(settings, "OUTBOUND_HTTP_CIRCUIT_FAILURES", 3)
+CIRCUIT_RESET_SECONDS = getattr(settings, "OUTBOUND_HTTP_CIRCUIT_RESET_SECONDS", 60)
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+OutboundResponse = namedtuple("OutboundResponse", ["status", "reason", "headers", "body", "seconds"])
+
+_ssl_context = None
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, retry_at):
+        self.retry_at = retry_at
+        super().__init__(f"Circuit open, retry in {max(retry_at - time.monotonic(), 0):.0f}s")
+
+
+class ConcurrencyLimitError(Exception):
+    pass
+
+
+def _default_ssl_context():
+    global _ssl_context
+    if _ssl_context is None:
+        _ssl_context = ssl.create_default_context()
+    return _ssl_context
+
+
+def request_path(url):
+    parts = urlsplit(url)
+    path = parts.path or "/"
+    return f"{path}?{parts.query}" if parts.query else path
+
+
+class OutboundClient:
+    def __init__(
+        self,
+        base_url,
+        *,
+        pool_size=OUTBOUND_POOL_SIZE,
+        max_concurrency=OUTBOUND_MAX_CONCURRENCY,
+        failure_threshold=CIRCUIT_FAILURE_THRESHOLD,
+        reset_seconds=CIRCUIT_RESET_SECONDS,
+    ):
+        parts = urlsplit(base_url)
+        self.origin = (parts.scheme, parts.hostname, parts.port)
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._pool = LifoQueue(maxsize=pool_size)
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self._consecutive_failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+        self._metrics = {
+            "requests": 0,
+            "errors": 0,
+            "skipped": 0,
+            "connections_opened": 0,
+            "total_seconds": 0.0,
+            "max_seconds": 0.0,
+            "last_seconds": None,
+            "last_error": "",
+        }
+
+    def _new_connection(self, timeout):
+        scheme, host, port = self.origin
+        with self._lock:
+            self._metrics["connections_opened"] += 1
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=timeout, context=_default_ssl_context())
+        return http.client.HTTPConnection(host, port, timeout=timeout)
+
+    def _checkout(self, timeout):
+        try:
+            connection = self._pool.get_nowait()
+        except Empty:
+            return self._new_connection(timeout), False
+        connection.timeout = timeout
+        if connection.sock is not None:
+            connection.sock.settimeout(timeout)
+        return connection, True
+
+    def _checkin(self, connection):
+        try:
+            self._pool.put_nowait(connection)
+        except Full:
+            connection.close()
+
+    def _allow_request(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            retry_at = self._opened_at + self.reset_seconds
+            # After the cooldown one trial request is let through (half-open).
+            if time.monotonic() < retry_at or self._trial_in_flight:
+                self._metrics["skipped"] += 1
+                raise CircuitOpenError(retry_at)
+            self._trial_in_flight = True
+
+    def _record(self, seconds, error=""):
+        with self._lock:
+            metrics = self._metrics
+            metrics["requests"] += 1
+            metrics["total_seconds"] += seconds
+            metrics["max_seconds"] = max(metrics["max_seconds"], seconds)
+            metrics["last_seconds"] = seconds
+            self._trial_in_flight = False
+            if not error:
+                self._consecutive_failures = 0
+                self._opened_at = None
+                return
+            metrics["errors"] += 1
+            metrics["last_error"] = error
+            self._consecutive_failures += 1
+            if self._consecutive_failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+    def _exchange(self, connection, method, path, headers, body):
+        try:
+            connection.request(method, path, body=body, headers=headers or {})
+            response = connection.getresponse()
+            payload = response.read()
+        except BaseException:
+            connection.close()
+            raise
+        if response.will_close:
+            connection.close()
+        else:
+            self._checkin(connection)
+        return response, payload
+
+    def _send(self, method, path, headers, body, timeout):
+        connection, reused = self._checkout(timeout)
+        try:
+            return self._exchange(connection, method, path, headers, body)
+        except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+            # The server may have dropped an idle keep-alive connection; retry once on a fresh one,
+            # but only when repeating the request cannot apply it twice.
+            if not reused or method.upper() not in IDEMPOTENT_METHODS:
+                raise
+            return self._exchange(self._new_connection(timeout), method, path, headers, body)
+
+    def request(self, method, path, *, headers=None, body=None, timeout=10):
+        self._allow_request()
+        if not self._slots.acquire(timeout=timeout):
+            with self._lock:
+                self._trial_in_flight = False
+            raise ConcurrencyLimitError("Too many concurrent requests")
+        started = time.monotonic()
+        try:
+            response, payload = self._send(method, path, headers, body, timeout)
+        except Exception as exc:
+            self._record(time.monotonic() - started, error=str(exc) or exc.__class__.__name__)
+            raise
+        finally:
+            self._slots.release()
+        seconds = time.monotonic() - started
+        self._record(seconds, error=f"HTTP {response.status}" if response.status >= 500 else "")
+        return OutboundResponse(response.status, response.reason, dict(response.getheaders()), payload, seconds)
+
+    @property
+    def circuit_open(self):
+        with self._lock:
+            return self._opened_at is not None
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["circuit_open"] = self._opened_at is not None
+            metrics["consecutive_failures"] = self._consecutive_failures
+            metrics["idle_connections"] = self._pool.qsize()
+        metrics["avg_seconds"] = metrics["total_seconds"] / metrics["requests"] if metrics["requests"] else None
+        return metrics
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except Empty:
+                return
+
+
+def get_client(key, base_url, **options):
+    origin = urlsplit(base_url)
+    origin = (origin.scheme, origin.hostname, origin.port)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is not None and client.origin == origin:
+            return client
+        if client is not None:
+            client.close()
+        client = _clients[key] = OutboundClient(base_url, **options)
+        return client
+
+
+def client_metrics():
+    with _clients_lock:
+        clients = dict(_clients)
+    return {key: client.stats() for key, client in clients.items()}
+
+
+def close_clients():
+    with _clients_lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
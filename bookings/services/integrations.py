@@ -1,8 +1,21 @@
-from urllib.error import URLError, HTTPError
-from urllib.request import Request, urlopen
+import http.client
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
 
 from django.utils import timezone
 
+from bookings.models import ExternalIntegration
+from bookings.services.http_client import (
+    CircuitOpenError,
+    ConcurrencyLimitError,
+    client_metrics,
+    get_client,
+    request_path,
+)
+
+INTEGRATION_CHECK_WORKERS = 8
+INTEGRATION_CHECK_DEADLINE_SECONDS = 30
+
 
 def build_integration_headers(integration):
     headers = {"User-Agent": "restaurant-booking/1.0"}
@@ -13,25 +26,71 @@ def build_integration_headers(integration):
     return headers
 
 
-def check_external_integration(integration):
-    request = Request(integration.base_url, headers=build_integration_headers(integration), method="GET")
+def integration_client(integration):
+    return get_client(("integration", integration.pk), integration.base_url)
+
+
+def integration_metrics():
+    return {key[1]: stats for key, stats in client_metrics().items() if key[0] == "integration"}
+
+
+def _check_one(integration, deadline):
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return False, "Deadline exceeded"
     try:
-        with urlopen(request, timeout=integration.timeout_seconds) as response:
-            status_code = getattr(response, "status", 200)
-            success = 200 <= status_code < 400
-            note = f"HTTP {status_code}"
-    except HTTPError as exc:
-        success = False
-        note = f"HTTP {exc.code}: {exc.reason}"
-    except URLError as exc:
-        success = False
-        note = f"Connection error: {exc.reason}"
+        response = integration_client(integration).request(
+            "GET",
+            request_path(integration.base_url),
+            headers=build_integration_headers(integration),
+            timeout=min(integration.timeout_seconds, remaining),
+        )
+    except (CircuitOpenError, ConcurrencyLimitError) as exc:
+        return False, f"Skipped: {exc}"
+    except (OSError, http.client.HTTPException) as exc:
+        return False, f"Connection error: {exc}"
     except Exception as exc:
-        success = False
-        note = f"Unexpected error: {exc}"
-
-    integration.last_check_success = success
-    integration.last_checked_at = timezone.now()
-    integration.last_check_note = note
-    integration.save(update_fields=["last_check_success", "last_checked_at", "last_check_note", "updated_at"])
-    return success, note
+        return False, f"Unexpected error: {exc}"
+    if 200 <= response.status < 400:
+        return True, f"HTTP {response.status}"
+    return False, f"HTTP {response.status}: {response.reason}"
+
+
+def check_integrations(
+    integrations=None,
+    *,
+    deadline_seconds=INTEGRATION_CHECK_DEADLINE_SECONDS,
+    max_workers=INTEGRATION_CHECK_WORKERS,
+):
+    if integrations is None:
+        integrations = ExternalIntegration.objects.filter(is_active=True).order_by("name")
+    integrations = list(integrations)
+    if not integrations:
+        return {}
+    deadline = time.monotonic() + deadline_seconds
+    results = {}
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(integrations))))
+    try:
+        futures = {executor.submit(_check_one, integration, deadline): integration.pk for integration in integrations}
+        done, _ = wait(futures, timeout=max(deadline - time.monotonic(), 0) + 1)
+        for future in done:
+            results[futures[future]] = future.result()
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    checked_at = timezone.now()
+    for integration in integrations:
+        success, note = results.get(integration.pk, (False, "Deadline exceeded"))
+        integration.last_check_success = success
+        integration.last_checked_at = checked_at
+        integration.last_check_note = note
+        integration.updated_at = checked_at
+    ExternalIntegration.objects.bulk_update(
+        integrations, ["last_check_success", "last_checked_at", "last_check_note", "updated_at"]
+    )
+    return {integration.pk: (integration.last_check_success, integration.last_check_note) for integration in integrations}
+
+
+def check_external_integration(integration):
+    deadline_seconds = max(integration.timeout_seconds, INTEGRATION_CHECK_DEADLINE_SECONDS)
+    return check_integrations([integration], deadline_seconds=deadline_seconds)[integration.pk]
@@ -0,0 +1,44 @@
+from decimal import Decimal
+
+CENTS_PER_UNIT = 100
+PERCENT_SCALE = 100 * 100
+ZERO_AMOUNT = Decimal("0.00")
+
+
+def to_cents(amount):
+    """
+    Convert a model/serializer amount (Decimal, int or numeric string) into
+    integer minor units. Amounts are stored with two decimal places, so the
+    conversion is exact for every value that comes out of the database.
+    """
+    if amount is None:
+        return 0
+    if isinstance(amount, int):
+        return amount * CENTS_PER_UNIT
+    return round_half_even(Decimal(amount).scaleb(2))
+
+
+def from_cents(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def round_half_even(value):
+    return int(value.to_integral_value())
+
+
+def divide_half_even(numerator, denominator):
+    quotient, remainder = divmod(numerator, denominator)
+    doubled = remainder * 2
+    if doubled > denominator or (doubled == denominator and quotient % 2):
+        quotient += 1
+    return quotient
+
+
+def percent_of_cents(cents, percent):
+    # percent is stored with two decimal places, so it is scaled to hundredths
+    # of a percent and the product is rounded once, like Decimal.quantize.
+    return divide_half_even(cents * to_cents(percent), PERCENT_SCALE)
+
+
+def line_total_cents(unit_price, quantity):
+    return to_cents(unit_price) * int(quantity)
@@ -0,0 +1,78 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class KeysetPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    @property
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+
+def encode_cursor_value(value, pk, reverse=False):
+    payload = [value.isoformat() if hasattr(value, "isoformat") else value, pk, int(reverse)]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def encode_cursor(obj, field, reverse=False):
+    return encode_cursor_value(getattr(obj, field), obj.pk, reverse)
+
+
+def decode_cursor(cursor, model, field):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        value, pk, reverse = json.loads(raw)
+        value = model._meta.get_field(field).to_python(value)
+        pk = int(pk)
+    except (binascii.Error, TypeError, ValueError, ValidationError) as exc:
+        raise ValueError("Invalid cursor") from exc
+    if value is None:
+        raise ValueError("Invalid cursor")
+    return value, pk, bool(reverse)
+
+
+def keyset_page(queryset, field, cursor=None, page_size=10):
+    # Newest first by (field, id); uses the (user, field) / (field) indexes instead of OFFSET and COUNT(*).
+    if not cursor:
+        rows = list(queryset.order_by(f"-{field}", "-id")[: page_size + 1])
+        has_after, has_before = len(rows) > page_size, False
+        rows = rows[:page_size]
+    else:
+        value, pk, reverse = decode_cursor(cursor, queryset.model, field)
+        if reverse:
+            newer = Q(**{f"{field}__gt": value}) | Q(**{field: value, "id__gt": pk})
+            rows = list(queryset.filter(newer).order_by(field, "id")[: page_size + 1])
+            has_after, has_before = True, len(rows) > page_size
+            rows = rows[:page_size][::-1]
+        else:
+            older = Q(**{f"{field}__lt": value}) | Q(**{field: value, "id__lt": pk})
+            rows = list(queryset.filter(older).order_by(f"-{field}", "-id")[: page_size + 1])
+            has_after, has_before = len(rows) > page_size, True
+            rows = rows[:page_size]
+    return KeysetPage(
+        rows,
+        next_cursor=encode_cursor(rows[-1], field) if rows and has_after else None,
+        previous_cursor=encode_cursor(rows[0], field, reverse=True) if rows and has_before else None,
+    )
@@ -6,22 +6,43 @@ from django.db.models import Sum
 from django.utils import timezone
 
 from bookings.models import CustomerOrder, Dish, OrderItem, Promotion
+from bookings.services.availability import day_range_for_date
+from bookings.services.money import from_cents, line_total_cents, percent_of_cents, to_cents
+
+
+def _reserved_items():
+    today_start, _ = day_range_for_date(timezone.localdate())
+    return OrderItem.objects.exclude(order__status=CustomerOrder.STATUS_CANCELLED).filter(
+        (models.Q(order__booking__isnull=False) & models.Q(order__booking__end_time__gte=timezone.now()))
+        | (models.Q(order__booking__isnull=True) & models.Q(order__scheduled_for__gte=today_start))
+    )
 
 
 def available_quantity_net(dish, exclude_order=None):
     if not dish or dish.available_quantity <= 0:
         return 0
-    today = timezone.localdate()
-    qs = OrderItem.objects.filter(dish=dish).exclude(order__status=CustomerOrder.STATUS_CANCELLED).filter(
-        (models.Q(order__booking__isnull=False) & models.Q(order__booking__end_time__gte=timezone.now()))
-        | (models.Q(order__booking__isnull=True) & models.Q(order__scheduled_for__date__gte=today))
-    )
+    qs = _reserved_items().filter(dish=dish)
     if exclude_order is not None:
         qs = qs.exclude(order=exclude_order)
     reserved = qs.aggregate(total=Sum("quantity"))["total"] or 0
     return max(0, dish.available_quantity - reserved)
 
 
+def available_quantities_net():
+    stock = dict(Dish.objects.filter(available_quantity__gt=0).values_list("id", "available_quantity"))
+    reserved = (
+        _reserved_items()
+        .filter(dish_id__in=list(stock))
+        .values("dish_id")
+        .annotate(total=Sum("quantity"))
+        .order_by()
+        .values_list("dish_id", "total")
+    )
+    for dish_id, total in reserved:
+        stock[dish_id] = max(0, stock[dish_id] - (total or 0))
+    return stock
+
+
 def get_active_promotions():
     now = timezone.now()
     return (
@@ -32,37 +53,47 @@ def get_active_promotions():
     )
 
 
-def promotion_base_price(promotion):
+def promotion_base_price_cents(promotion):
     if promotion.kind == Promotion.KIND_SINGLE and promotion.target_dish_id:
-        return Decimal(promotion.target_dish.price)
+        return to_cents(promotion.target_dish.price)
     if promotion.kind == Promotion.KIND_COMBO:
-        total = Decimal("0.00")
-        for item in promotion.combo_items.all():
-            total += Decimal(item.dish.price) * item.min_quantity
-        return total
-    return Decimal("0.00")
+        return sum(line_total_cents(item.dish.price, item.min_quantity) for item in promotion.combo_items.all())
+    return 0
 
 
-def discount_from_eligible(promotion, eligible_amount):
-    if eligible_amount <= 0:
-        return Decimal("0.00")
+def promotion_base_price(promotion):
+    return from_cents(promotion_base_price_cents(promotion))
+
+
+def discount_cents_from_eligible(promotion, eligible_cents):
+    if eligible_cents <= 0:
+        return 0
     if promotion.discount_type == Promotion.DISCOUNT_PERCENT:
-        discount = eligible_amount * (Decimal(promotion.discount_value) / Decimal("100"))
+        discount = percent_of_cents(eligible_cents, promotion.discount_value)
     else:
-        discount = Decimal(promotion.discount_value)
-    return min(discount, eligible_amount).quantize(Decimal("0.01"))
+        discount = to_cents(promotion.discount_value)
+    return min(discount, eligible_cents)
 
 
-def promotion_price_preview(promotion, quantity=1):
-    original = (promotion_base_price(promotion) * quantity).quantize(Decimal("0.01"))
+def discount_from_eligible(promotion, eligible_amount):
+    return from_cents(discount_cents_from_eligible(promotion, to_cents(eligible_amount)))
+
+
+def promotion_price_preview_cents(promotion, quantity=1):
+    original = promotion_base_price_cents(promotion) * quantity
     if promotion.discount_type == Promotion.DISCOUNT_PERCENT:
-        discount = discount_from_eligible(promotion, original)
+        discount = discount_cents_from_eligible(promotion, original)
     else:
-        discount = min(Decimal(promotion.discount_value) * quantity, original).quantize(Decimal("0.01"))
+        discount = min(to_cents(promotion.discount_value) * quantity, original)
+    return original, discount
+
+
+def promotion_price_preview(promotion, quantity=1):
+    original, discount = promotion_price_preview_cents(promotion, quantity=quantity)
     return {
-        "original_price": original,
-        "new_price": (original - discount).quantize(Decimal("0.01")),
-        "discount_amount": discount,
+        "original_price": from_cents(original),
+        "new_price": from_cents(original - discount),
+        "discount_amount": from_cents(discount),
     }
 
 
@@ -98,6 +129,22 @@ def promotion_is_orderable(promotion, quantity=1):
     return False
 
 
+def promotion_stock_requirements(promotion, quantity=1):
+    """Dish quantities a promotion needs in stock, or None if it can never be ordered."""
+    if promotion.kind == Promotion.KIND_COMBO:
+        items = list(promotion.combo_items.all())
+        if not items:
+            return None
+        return [(item.dish_id, item.min_quantity * quantity) for item in items]
+    if promotion.kind == Promotion.KIND_SINGLE and promotion.target_dish_id:
+        return [(promotion.target_dish_id, quantity)]
+    return None
+
+
+def stock_satisfies(requirements, stock):
+    return requirements is not None and all(stock.get(dish_id, 0) >= needed for dish_id, needed in requirements)
+
+
 def get_orderable_promotions():
     return [promotion for promotion in get_active_promotions() if promotion_is_orderable(promotion, quantity=1)]
 
@@ -244,21 +291,22 @@ def validate_merged_cart_stock(dish_qty_map, exclude_order=None):
 
 def compute_per_promotion_discounts(promotions_with_qty):
     rows = []
-    total_discount = Decimal("0.00")
+    total_discount = 0
     for promotion, quantity in promotions_with_qty:
         if quantity <= 0:
             continue
-        preview = promotion_price_preview(promotion, quantity=quantity)
-        row = {
-            "promotion": promotion,
-            "quantity": quantity,
-            "original_amount": preview["original_price"],
-            "discount_amount": preview["discount_amount"],
-            "discounted_amount": preview["new_price"],
-        }
-        rows.append(row)
-        total_discount += row["discount_amount"]
-    return rows, total_discount.quantize(Decimal("0.01"))
+        original, discount = promotion_price_preview_cents(promotion, quantity=quantity)
+        rows.append(
+            {
+                "promotion": promotion,
+                "quantity": quantity,
+                "original_amount": from_cents(original),
+                "discount_amount": from_cents(discount),
+                "discounted_amount": from_cents(original - discount),
+            }
+        )
+        total_discount += discount
+    return rows, from_cents(total_discount)
 
 
 def resolve_promotions_for_checkout_input(promotion_quantities, regular_qty_map, menu_dish_ids=None, exclude_order=None):
@@ -320,19 +368,20 @@ def resolve_promotions_for_checkout(post, regular_qty_map, menu_dish_ids=None):
     )
 
 
-def order_subtotal(dish_qty_map, dishes_by_id):
-    total = Decimal("0.00")
+def order_subtotal_cents(dish_qty_map, dishes_by_id):
+    total = 0
     for dish_id, quantity in dish_qty_map.items():
         dish = dishes_by_id.get(dish_id)
         if dish and quantity:
-            total += Decimal(dish.price) * quantity
-    return total.quantize(Decimal("0.01"))
+            total += line_total_cents(dish.price, quantity)
+    return total
+
+
+def order_subtotal(dish_qty_map, dishes_by_id):
+    return from_cents(order_subtotal_cents(dish_qty_map, dishes_by_id))
 
 
 def compute_order_totals(dish_qty_map, dishes_by_id, discount_amount):
-    subtotal = order_subtotal(dish_qty_map, dishes_by_id)
-    discount = discount_amount if discount_amount is not None else Decimal("0.00")
-    total = (subtotal - discount).quantize(Decimal("0.01"))
-    if total < 0:
-        total = Decimal("0.00")
-    return subtotal, total
+    subtotal = order_subtotal_cents(dish_qty_map, dishes_by_id)
+    total = max(0, subtotal - to_cents(discount_amount))
+    return from_cents(subtotal), from_cents(total)
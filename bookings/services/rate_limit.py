@@ -0,0 +1,104 @@
+import hashlib
+import math
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+from bookings.services.security import get_client_ip
+
+SLOT_POLL_RATE_PER_SECOND = getattr(settings, "SLOT_POLL_RATE_PER_SECOND", 2.0)
+SLOT_POLL_BURST = getattr(settings, "SLOT_POLL_BURST", 20)
+SLOT_POLL_SCOPE = "slot-polling"
+
+_metrics = {}
+_metrics_lock = threading.Lock()
+
+
+def request_identity(request):
+    # Anonymous callers are keyed by the connection address (X-Forwarded-For only from TRUSTED_PROXY_IPS).
+    user = getattr(request, "user", None)
+    if user is not None and user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{get_client_ip(request)}"
+
+
+def _record(scope, allowed):
+    with _metrics_lock:
+        counters = _metrics.setdefault(scope, {"allowed": 0, "limited": 0})
+        counters["allowed" if allowed else "limited"] += 1
+
+
+def _window_keys(scope, identity, window, now):
+    bucket = int(now // window)
+    key = f"rate-limit:{scope}:{hashlib.sha1(identity.encode()).hexdigest()}"
+    return f"{key}:{bucket}", f"{key}:{bucket - 1}"
+
+
+def consume_token(scope, identity, rate=SLOT_POLL_RATE_PER_SECOND, burst=SLOT_POLL_BURST):
+    """
+    Allow `burst` calls per burst / rate seconds for the identity. Returns
+    (allowed, seconds until a call may be allowed). A falsy rate disables
+    the limit.
+    """
+    if not rate:
+        return True, 0
+    # Sliding window of two atomic counters, like the login throttle: concurrent calls each get their own count.
+    window = burst / rate
+    now = time.time()
+    current_key, previous_key = _window_keys(scope, identity, window, now)
+    timeout = math.ceil(window * 2) + 1
+    cache.add(current_key, 0, timeout)
+    try:
+        current = cache.incr(current_key)
+    except ValueError:
+        current = 1
+        cache.set(current_key, current, timeout)
+    elapsed = (now % window) / window
+    previous = cache.get(previous_key, 0)
+    allowed = current + previous * (1 - elapsed) <= burst
+    retry_after = 0
+    if not allowed:
+        # Rejected calls give their count back, so a client that keeps polling is not locked out for good.
+        try:
+            current = cache.decr(current_key)
+        except ValueError:
+            current -= 1
+        if current >= burst or not previous:
+            retry_after = (1 - elapsed) * window
+        else:
+            retry_after = ((1 - elapsed) - (burst - current - 1) / previous) * window
+        retry_after = max(retry_after, 1 / rate)
+    _record(scope, allowed)
+    return allowed, retry_after
+
+
+def rate_limit_metrics():
+    with _metrics_lock:
+        return {scope: dict(counters) for scope, counters in _metrics.items()}
+
+
+def rate_limit(scope=SLOT_POLL_SCOPE, rate=None, burst=None):
+    """Answer 429 with Retry-After once the caller is over the limit; defaults to the slot polling settings."""
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            allowed, retry_after = consume_token(
+                scope,
+                request_identity(request),
+                SLOT_POLL_RATE_PER_SECOND if rate is None else rate,
+                SLOT_POLL_BURST if burst is None else burst,
+            )
+            if not allowed:
+                response = JsonResponse({"error": "too many requests"}, status=429)
+                response["Retry-After"] = str(math.ceil(retry_after))
+                return response
+            return view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -1,8 +1,7 @@
 import csv
 from datetime import datetime, timedelta
 
-from django.db.models import Avg, Count, Sum
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 
 from bookings.models import (
@@ -10,11 +9,15 @@ from bookings.models import (
     Booking,
     CustomerOrder,
     ExternalIntegration,
-    OrderItem,
     OrderItemReview,
     UserProfile,
     VenueComplaint,
 )
+from bookings.services.availability import day_range_for_date
+from bookings.services.rollups import dish_sales_rows
+
+REPORT_CHUNK_SIZE = 2000
+CSV_ROWS_PER_CHUNK = 500
 
 
 def parse_report_period(request, default_days=30):
@@ -34,68 +37,145 @@ def parse_report_period(request, default_days=30):
     return date_from, date_to
 
 
-def csv_response(filename, headers, rows):
-    response = HttpResponse(content_type="text/csv; charset=utf-8")
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-    response.write("\ufeff")
-    writer = csv.writer(response)
+def report_period_range(date_from, date_to):
+    """
+    Half-open [start, end) datetime range covering the whole local days from
+    date_from to date_to, so period filters compare the raw column and can use
+    its index instead of casting every row to a date.
+    """
+    period_start, _ = day_range_for_date(date_from)
+    _, period_end = day_range_for_date(date_to)
+    return period_start, period_end
+
+
+def period_filter(field_name, date_from, date_to):
+    period_start, period_end = report_period_range(date_from, date_to)
+    return {f"{field_name}__gte": period_start, f"{field_name}__lt": period_end}
+
+
+class _EchoBuffer:
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, value):
+        self.chunks.append(value)
+
+    def drain(self):
+        data = "".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _stream_csv(headers, rows, rows_per_chunk):
+    buffer = _EchoBuffer()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
     writer.writerow(headers)
+    pending = 0
     for row in rows:
         writer.writerow(row)
+        pending += 1
+        if pending >= rows_per_chunk:
+            yield buffer.drain()
+            pending = 0
+    yield buffer.drain()
+
+
+def csv_response(filename, headers, rows):
+    response = StreamingHttpResponse(
+        _stream_csv(headers, rows, CSV_ROWS_PER_CHUNK),
+        content_type="text/csv; charset=utf-8",
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
     return response
 
 
+def _display(choices):
+    labels = dict(choices)
+    return lambda value: labels.get(value, value)
+
+
+def _format_dt(value):
+    return value.strftime("%d.%m.%Y %H:%M") if value else ""
+
+
 def operator_report_rows(report_type, date_from, date_to):
     if report_type == "bookings":
-        queryset = Booking.objects.select_related("user", "table").filter(start_time__date__gte=date_from, start_time__date__lte=date_to).order_by("-start_time")
-        rows = [
-            [
-                item.public_id or item.pk,
-                item.start_time.strftime("%d.%m.%Y %H:%M"),
-                item.end_time.strftime("%d.%m.%Y %H:%M"),
-                item.user.username,
-                item.table.table_number,
-                item.guests_count,
-                item.get_status_display(),
-            ]
-            for item in queryset
-        ]
+        status_label = _display(Booking.STATUS_CHOICES)
+        queryset = (
+            Booking.objects.filter(**period_filter("start_time", date_from, date_to))
+            .order_by("-start_time")
+            .values_list("public_id", "pk", "start_time", "end_time", "user__username", "table__table_number", "guests_count", "status")
+        )
+        rows = (
+            [public_id or pk, _format_dt(start_time), _format_dt(end_time), username, table_number, guests_count, status_label(status)]
+            for public_id, pk, start_time, end_time, username, table_number, guests_count, status in queryset.iterator(chunk_size=REPORT_CHUNK_SIZE)
+        )
         return ["ID", "Начало", "Окончание", "Клиент", "Столик", "Гостей", "Статус"], rows
     if report_type == "sales":
-        queryset = (
-            OrderItem.objects.filter(order__scheduled_for__date__gte=date_from, order__scheduled_for__date__lte=date_to)
-            .values("dish_name_snapshot")
-            .annotate(total_quantity=Sum("quantity"), total_revenue=Sum("line_total_snapshot"), order_count=Count("order_id", distinct=True))
-            .order_by("-total_quantity", "dish_name_snapshot")
+        rows = (
+            [item["dish_name_snapshot"], item["total_quantity"], item["order_count"], item["total_revenue"]]
+            for item in dish_sales_rows(date_from, date_to)
         )
-        rows = [[item["dish_name_snapshot"], item["total_quantity"], item["order_count"], item["total_revenue"]] for item in queryset]
         return ["Блюдо", "Количество", "Заказов", "Выручка"], rows
     if report_type == "complaints":
-        queryset = VenueComplaint.objects.select_related("user").filter(created_at__date__gte=date_from, created_at__date__lte=date_to).order_by("-created_at")
-        rows = [[item.created_at.strftime("%d.%m.%Y %H:%M"), item.user.username, item.subject, item.get_status_display(), item.message] for item in queryset]
+        status_label = _display(VenueComplaint.STATUS_CHOICES)
+        queryset = (
+            VenueComplaint.objects.filter(**period_filter("created_at", date_from, date_to))
+            .order_by("-created_at")
+            .values_list("created_at", "user__username", "subject", "status", "message")
+        )
+        rows = (
+            [_format_dt(created_at), username, subject, status_label(status), message]
+            for created_at, username, subject, status, message in queryset.iterator(chunk_size=REPORT_CHUNK_SIZE)
+        )
         return ["Дата", "Клиент", "Тема", "Статус", "Текст"], rows
-    queryset = OrderItemReview.objects.select_related("order_item__dish", "order_item__order__user").filter(created_at__date__gte=date_from, created_at__date__lte=date_to).order_by("-created_at")
-    rows = [[item.created_at.strftime("%d.%m.%Y %H:%M"), item.order_item.dish_name_snapshot, item.rating, item.order_item.order.user.username, item.comment] for item in queryset]
+    queryset = (
+        OrderItemReview.objects.filter(**period_filter("created_at", date_from, date_to))
+        .order_by("-created_at")
+        .values_list("created_at", "order_item__dish_name_snapshot", "rating", "order_item__order__user__username", "comment")
+    )
+    rows = ([_format_dt(created_at), *rest] for created_at, *rest in queryset.iterator(chunk_size=REPORT_CHUNK_SIZE))
     return ["Дата", "Блюдо", "Оценка", "Клиент", "Комментарий"], rows
 
 
 def admin_report_rows(report_type, date_from, date_to):
     if report_type == "users":
-        queryset = UserProfile.objects.select_related("user").order_by("role", "user__username")
-        rows = [[item.user.username, item.user.email, item.get_role_display(), "Да" if item.user.is_active else "Нет"] for item in queryset]
+        role_label = _display(UserProfile.ROLE_CHOICES)
+        queryset = UserProfile.objects.order_by("role", "user__username").values_list(
+            "user__username", "user__email", "role", "user__is_active"
+        )
+        rows = (
+            [username, email, role_label(role), "Да" if is_active else "Нет"]
+            for username, email, role, is_active in queryset.iterator(chunk_size=REPORT_CHUNK_SIZE)
+        )
         return ["Логин", "Email", "Роль", "Активен"], rows
     if report_type == "integrations":
-        queryset = ExternalIntegration.objects.order_by("name")
-        rows = [[item.name, item.base_url, item.get_auth_type_display(), "Да" if item.is_active else "Нет", item.last_check_success, item.last_checked_at, item.last_check_note] for item in queryset]
+        auth_label = _display(ExternalIntegration.AUTH_CHOICES)
+        queryset = ExternalIntegration.objects.order_by("name").values_list(
+            "name", "base_url", "auth_type", "is_active", "last_check_success", "last_checked_at", "last_check_note"
+        )
+        rows = (
+            [name, base_url, auth_label(auth_type), "Да" if is_active else "Нет", success, checked_at, note]
+            for name, base_url, auth_type, is_active, success, checked_at, note in queryset.iterator(chunk_size=REPORT_CHUNK_SIZE)
+        )
         return ["Название", "URL", "Авторизация", "Активна", "Успех проверки", "Проверена", "Примечание"], rows
     if report_type == "backups":
-        queryset = BackupArchive.objects.select_related("created_by", "restored_by").order_by("-created_at")
-        rows = [[item.original_name, item.created_at.strftime("%d.%m.%Y %H:%M"), getattr(item.created_by, "username", ""), item.last_restored_at.strftime("%d.%m.%Y %H:%M") if item.last_restored_at else "", getattr(item.restored_by, "username", ""), item.restore_count] for item in queryset]
+        queryset = BackupArchive.objects.order_by("-created_at").values_list(
+            "original_name", "created_at", "created_by__username", "last_restored_at", "restored_by__username", "restore_count"
+        )
+        rows = (
+            [name, _format_dt(created_at), created_by or "", _format_dt(restored_at), restored_by or "", restore_count]
+            for name, created_at, created_by, restored_at, restored_by, restore_count in queryset.iterator(chunk_size=REPORT_CHUNK_SIZE)
+        )
         return ["Архив", "Создан", "Создал", "Последнее восстановление", "Восстановил", "Кол-во восстановлений"], rows
     queryset = (
-        CustomerOrder.objects.select_related("user", "booking__table")
-        .filter(scheduled_for__date__gte=date_from, scheduled_for__date__lte=date_to)
+        CustomerOrder.objects.filter(**period_filter("scheduled_for", date_from, date_to))
         .order_by("-scheduled_for")
+        .values_list("public_id", "pk", "scheduled_for", "user__username", "order_type", "status", "total_amount")
+    )
+    rows = (
+        [public_id or pk, _format_dt(scheduled_for), username, order_type, status, total_amount]
+        for public_id, pk, scheduled_for, username, order_type, status, total_amount in queryset.iterator(chunk_size=REPORT_CHUNK_SIZE)
     )
-    rows = [[item.public_id or item.pk, item.scheduled_for.strftime("%d.%m.%Y %H:%M"), item.user.username, item.order_type, item.status, item.total_amount] for item in queryset]
     return ["Заказ", "Дата", "Пользователь", "Тип", "Статус", "Сумма"], rows
@@ -16,6 +16,7 @@ from bookings.models import (
 )
 from bookings.services.availability import build_reservation_datetimes, find_available_table, is_booking_time_allowed
 from bookings.services.menu import get_menu_dishes_for_date
+from bookings.services.money import from_cents, line_total_cents
 from bookings.services.promotions import (
     available_quantity_net,
     compute_order_totals,
@@ -27,26 +28,29 @@ from bookings.services.promotions import (
 MAX_SAME_DISHES_PER_GUEST = 5
 
 
-def booking_detail_queryset():
+def _order_prefetches(prefix, items, promotions):
+    lookups = []
+    if promotions:
+        lookups.append(f"{prefix}applied_promotions__promotion")
+    if items:
+        lookups.append(f"{prefix}items__dish")
+    return lookups
+
+
+def booking_detail_queryset(*, items=True, promotions=True):
     return Booking.objects.select_related(
         "table",
         "user",
         "order",
-    ).prefetch_related(
-        "order__applied_promotions__promotion",
-        "order__items__dish",
-    )
+    ).prefetch_related(*_order_prefetches("order__", items, promotions))
 
 
-def order_detail_queryset():
+def order_detail_queryset(*, items=True, promotions=True):
     return CustomerOrder.objects.select_related(
         "booking",
         "booking__table",
         "user",
-    ).prefetch_related(
-        "applied_promotions__promotion",
-        "items__dish",
-    )
+    ).prefetch_related(*_order_prefetches("", items, promotions))
 
 
 def ensure_client_profile(user):
@@ -201,7 +205,7 @@ def _replace_order_items(order, dish_qty_map):
     for dish_id, quantity in dish_qty_map.items():
         dish = dishes_by_id[dish_id]
         unit_price = dish.price if dish else Decimal("0.00")
-        line_total = unit_price * quantity
+        line_total = from_cents(line_total_cents(unit_price, quantity))
         item = existing_items.get(dish_id)
         if item is None:
             item = OrderItem(
@@ -260,13 +264,13 @@ def _replace_applied_promotions(order, promotions, per_promo):
     order.applied_promotions.exclude(pk__in=active_ids).delete()
 
 
-def get_booking_or_404_for_user(user, public_id):
-    queryset = booking_detail_queryset().filter(user=user)
+def get_booking_or_404_for_user(user, public_id, **queryset_options):
+    queryset = booking_detail_queryset(**queryset_options).filter(user=user)
     return queryset.filter(public_id=public_id).first() or queryset.filter(pk=public_id).first()
 
 
-def get_order_or_404_for_user(user, public_id):
-    queryset = order_detail_queryset().filter(user=user)
+def get_order_or_404_for_user(user, public_id, **queryset_options):
+    queryset = order_detail_queryset(**queryset_options).filter(user=user)
     return queryset.filter(public_id=public_id).first() or queryset.filter(pk=public_id).first()
 
 
@@ -0,0 +1,47 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from bookings.services.content_versions import (
+    CATALOG,
+    CONTENT_ETAG_BUCKET_SECONDS,
+    STOCK,
+    content_versions,
+    content_versions_enabled,
+)
+from bookings.services.promotions import available_quantities_net
+
+API_RESPONSE_CACHE_SECONDS = getattr(settings, "API_RESPONSE_CACHE_SECONDS", 300)
+
+
+def _time_bucket():
+    return int(time.time() // CONTENT_ETAG_BUCKET_SECONDS)
+
+
+def cached_payload(name, parts, groups, build, time_bound=False):
+    """Return build() from the cache, keyed by name, parts and the data versions of the given groups."""
+    if not content_versions_enabled():
+        return build()
+    key_parts = [name, *map(str, parts), *map(str, content_versions(*groups))]
+    if time_bound:
+        key_parts.append(str(_time_bucket()))
+    key = "api-response:%s" % hashlib.md5(":".join(key_parts).encode()).hexdigest()
+    payload = cache.get(key)
+    if payload is None:
+        payload = build()
+        cache.set(key, payload, API_RESPONSE_CACHE_SECONDS)
+    return payload
+
+
+def stock_snapshot():
+    # Net quantities change with orders and as bookings finish, hence the time bucket.
+    return cached_payload("stock", [], (CATALOG, STOCK), available_quantities_net, time_bound=True)
+
+
+def overlay_stock(dishes, stock=None):
+    stock = stock_snapshot() if stock is None else stock
+    for dish in dishes:
+        dish["available_quantity"] = stock.get(dish["id"], 0)
+    return dishes
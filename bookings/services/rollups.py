@@ -0,0 +1,211 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from bookings.models import (
+    Booking,
+    DailyDishSales,
+    DailyFeedbackSummary,
+    DailyTableBookings,
+    OrderItem,
+    OrderItemReview,
+    ReportRollupDay,
+    VenueComplaint,
+)
+from bookings.services.availability import day_range_for_date
+from bookings.services.money import ZERO_AMOUNT
+
+DEFAULT_REBUILD_DAYS = 7
+
+
+def _period_bounds(date_from, date_to):
+    start, _ = day_range_for_date(date_from)
+    _, end = day_range_for_date(date_to)
+    return start, end
+
+
+def split_closed_period(date_from, date_to):
+    # Days before today are closed and served from rollups; today and later stay live.
+    today = timezone.localdate()
+    closed_to = min(date_to, today - timedelta(days=1))
+    live_from = max(date_from, today)
+    closed = (date_from, closed_to) if date_from <= closed_to else None
+    live = (live_from, date_to) if live_from <= date_to else None
+    return closed, live
+
+
+def _days(date_from, date_to):
+    current = date_from
+    while current <= date_to:
+        yield current
+        current += timedelta(days=1)
+
+
+def _dish_sales(start, end):
+    return (
+        OrderItem.objects.filter(order__scheduled_for__gte=start, order__scheduled_for__lt=end)
+        .values("dish_name_snapshot")
+        .annotate(quantity=Sum("quantity"), revenue=Sum("line_total_snapshot"), order_count=Count("order_id", distinct=True))
+        .order_by()
+    )
+
+
+def _table_bookings(start, end):
+    totals = {}
+    bookings = Booking.objects.filter(start_time__gte=start, start_time__lt=end).values_list(
+        "table_id", "status", "guests_count", "start_time", "end_time"
+    )
+    for table_id, status, guests_count, start_time, end_time in bookings.iterator():
+        row = totals.setdefault(
+            table_id,
+            {"bookings_count": 0, "completed_count": 0, "cancelled_count": 0, "guests_total": 0, "guest_minutes": 0},
+        )
+        row["bookings_count"] += 1
+        if status == Booking.STATUS_CANCELLED:
+            row["cancelled_count"] += 1
+            continue
+        if status == Booking.STATUS_COMPLETED:
+            row["completed_count"] += 1
+        row["guests_total"] += guests_count
+        row["guest_minutes"] += guests_count * int((end_time - start_time).total_seconds() // 60)
+    return totals
+
+
+def _feedback(start, end):
+    reviews = OrderItemReview.objects.filter(created_at__gte=start, created_at__lt=end).aggregate(
+        reviews_count=Count("id"), rating_total=Sum("rating")
+    )
+    return {
+        "complaints_count": VenueComplaint.objects.filter(created_at__gte=start, created_at__lt=end).count(),
+        "reviews_count": reviews["reviews_count"],
+        "rating_total": reviews["rating_total"] or 0,
+    }
+
+
+def rebuild_day(day):
+    start, end = day_range_for_date(day)
+    with transaction.atomic():
+        # Concurrent first reads of the same day queue on its marker row instead of racing on the unique day rows.
+        ReportRollupDay.objects.get_or_create(day=day)
+        list(ReportRollupDay.objects.select_for_update().filter(day=day))
+        DailyDishSales.objects.filter(day=day).delete()
+        DailyTableBookings.objects.filter(day=day).delete()
+        DailyFeedbackSummary.objects.filter(day=day).delete()
+        DailyDishSales.objects.bulk_create(
+            [
+                DailyDishSales(
+                    day=day,
+                    dish_name_snapshot=row["dish_name_snapshot"],
+                    quantity=row["quantity"] or 0,
+                    revenue=row["revenue"] or ZERO_AMOUNT,
+                    order_count=row["order_count"],
+                )
+                for row in _dish_sales(start, end)
+            ]
+        )
+        DailyTableBookings.objects.bulk_create(
+            [DailyTableBookings(day=day, table_id=table_id, **row) for table_id, row in _table_bookings(start, end).items()]
+        )
+        DailyFeedbackSummary.objects.create(day=day, **_feedback(start, end))
+        ReportRollupDay.objects.update_or_create(day=day)
+
+
+def rebuild_days(date_from, date_to, missing_only=False):
+    closed, _ = split_closed_period(date_from, date_to)
+    if closed is None:
+        return 0
+    built = set()
+    if missing_only:
+        built = set(ReportRollupDay.objects.filter(day__gte=closed[0], day__lte=closed[1]).values_list("day", flat=True))
+    rebuilt = 0
+    for day in _days(*closed):
+        if day in built:
+            continue
+        rebuild_day(day)
+        rebuilt += 1
+    return rebuilt
+
+
+def ensure_rollups(date_from, date_to):
+    return rebuild_days(date_from, date_to, missing_only=True)
+
+
+def invalidate_rollup_day(value):
+    if value is None:
+        return
+    day = timezone.localdate(value)
+    if day < timezone.localdate():
+        ReportRollupDay.objects.filter(day=day).delete()
+
+
+def clear_rollups():
+    ReportRollupDay.objects.all().delete()
+    DailyDishSales.objects.all().delete()
+    DailyTableBookings.objects.all().delete()
+    DailyFeedbackSummary.objects.all().delete()
+
+
+def dish_sales_rows(date_from, date_to, ensure=True):
+    closed, live = split_closed_period(date_from, date_to)
+    totals = {}
+    sources = []
+    if closed:
+        if ensure:
+            ensure_rollups(*closed)
+        sources.append(
+            DailyDishSales.objects.filter(day__gte=closed[0], day__lte=closed[1])
+            .values("dish_name_snapshot")
+            .annotate(quantity=Sum("quantity"), revenue=Sum("revenue"), order_count=Sum("order_count"))
+            .order_by()
+        )
+    if live:
+        sources.append(_dish_sales(*_period_bounds(*live)))
+    for source in sources:
+        for row in source:
+            name = row["dish_name_snapshot"]
+            total = totals.setdefault(
+                name,
+                {"dish_name_snapshot": name, "total_quantity": 0, "total_revenue": ZERO_AMOUNT, "order_count": 0},
+            )
+            total["total_quantity"] += row["quantity"] or 0
+            total["total_revenue"] += row["revenue"] or ZERO_AMOUNT
+            total["order_count"] += row["order_count"] or 0
+    return sorted(totals.values(), key=lambda row: (-row["total_quantity"], row["dish_name_snapshot"]))
+
+
+def booking_totals(date_from, date_to, ensure=True):
+    closed, live = split_closed_period(date_from, date_to)
+    totals = {"bookings_count": 0, "completed_count": 0, "cancelled_count": 0, "guests_total": 0, "guest_minutes": 0}
+    if closed:
+        if ensure:
+            ensure_rollups(*closed)
+        rollup = DailyTableBookings.objects.filter(day__gte=closed[0], day__lte=closed[1]).aggregate(
+            **{field: Sum(field) for field in totals}
+        )
+        for field in totals:
+            totals[field] += rollup[field] or 0
+    if live:
+        for row in _table_bookings(*_period_bounds(*live)).values():
+            for field in totals:
+                totals[field] += row[field]
+    return totals
+
+
+def feedback_totals(date_from, date_to, ensure=True):
+    closed, live = split_closed_period(date_from, date_to)
+    totals = {"complaints_count": 0, "reviews_count": 0, "rating_total": 0}
+    if closed:
+        if ensure:
+            ensure_rollups(*closed)
+        rollup = DailyFeedbackSummary.objects.filter(day__gte=closed[0], day__lte=closed[1]).aggregate(
+            **{field: Sum(field) for field in totals}
+        )
+        for field in totals:
+            totals[field] += rollup[field] or 0
+    if live:
+        for field, value in _feedback(*_period_bounds(*live)).items():
+            totals[field] += value
+    totals["rating_avg"] = totals["rating_total"] / totals["reviews_count"] if totals["reviews_count"] else None
+    return totals
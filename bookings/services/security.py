@@ -1,86 +1,245 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
 
+from django.conf import settings as django_settings
 from django.contrib.auth import logout
+from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.utils import timezone
 
 from bookings.models import LoginAttempt, SecuritySettings
+from bookings.services.shared_cache import default_cache_is_shared
 
 
 SESSION_ACTIVITY_KEY = "last_activity_ts"
+SECURITY_SETTINGS_CACHE_KEY = "security-settings"
+SECURITY_SETTINGS_CACHE_SECONDS = getattr(django_settings, "SECURITY_SETTINGS_CACHE_SECONDS", 60)
+LOGIN_THROTTLE_WINDOW_SECONDS = getattr(django_settings, "LOGIN_THROTTLE_WINDOW_SECONDS", 15 * 60)
+LOGIN_THROTTLE_IP_FAILURES = getattr(django_settings, "LOGIN_THROTTLE_IP_FAILURES", 50)
+LOGIN_STATE_CACHE_SECONDS = getattr(django_settings, "LOGIN_STATE_CACHE_SECONDS", 5 * 60)
+LOGIN_STATE_CACHE_ENABLED = getattr(django_settings, "LOGIN_STATE_CACHE_ENABLED", None)
+SESSION_ACTIVITY_WRITE_SECONDS = getattr(django_settings, "SESSION_ACTIVITY_WRITE_SECONDS", 60)
+JWT_USER_STATE_CACHE_SECONDS = getattr(django_settings, "JWT_USER_STATE_CACHE_SECONDS", 60)
+# Addresses of reverse proxies whose X-Forwarded-For header is trusted.
+TRUSTED_PROXY_IPS = frozenset(getattr(django_settings, "TRUSTED_PROXY_IPS", ()))
 
 
 def get_security_settings():
     return SecuritySettings.get_solo()
 
 
+def get_cached_security_settings():
+    security = cache.get(SECURITY_SETTINGS_CACHE_KEY)
+    if security is None:
+        security = get_security_settings()
+        cache.set(SECURITY_SETTINGS_CACHE_KEY, security, SECURITY_SETTINGS_CACHE_SECONDS)
+    return security
+
+
+def invalidate_security_settings():
+    cache.delete(SECURITY_SETTINGS_CACHE_KEY)
+
+
 def get_client_ip(request):
+    # X-Forwarded-For is client-controlled, so it is only read when the direct peer is a trusted proxy,
+    # and then from the right: the first address not added by one of our proxies is the client.
+    remote_addr = request.META.get("REMOTE_ADDR", "")
     forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
-    if forwarded:
-        return forwarded.split(",")[0].strip()
-    return request.META.get("REMOTE_ADDR", "")
+    if not forwarded or remote_addr not in TRUSTED_PROXY_IPS:
+        return remote_addr
+    for address in reversed(forwarded.split(",")):
+        address = address.strip()
+        if address and address not in TRUSTED_PROXY_IPS:
+            return address
+    return remote_addr
+
+
+def _throttle_key(kind, value):
+    return f"login-throttle:{kind}:{hashlib.sha1(value.encode()).hexdigest()}"
+
+
+def _window_keys(kind, value, now):
+    bucket = int(now // LOGIN_THROTTLE_WINDOW_SECONDS)
+    key = _throttle_key(kind, value)
+    return f"{key}:{bucket}", f"{key}:{bucket - 1}"
+
+
+def _window_hit(kind, value):
+    # Sliding window approximated by the current bucket plus a weighted previous bucket.
+    now = time.time()
+    current_key, previous_key = _window_keys(kind, value, now)
+    cache.add(current_key, 0, LOGIN_THROTTLE_WINDOW_SECONDS * 2)
+    try:
+        current = cache.incr(current_key)
+    except ValueError:
+        current = 1
+        cache.set(current_key, current, LOGIN_THROTTLE_WINDOW_SECONDS * 2)
+    elapsed = (now % LOGIN_THROTTLE_WINDOW_SECONDS) / LOGIN_THROTTLE_WINDOW_SECONDS
+    return current + cache.get(previous_key, 0) * (1 - elapsed)
+
+
+def _window_reset(kind, value):
+    cache.delete_many(_window_keys(kind, value, time.time()))
+
+
+def _lock_key(kind, value):
+    return f"login-lock:{kind}:{hashlib.sha1(value.encode()).hexdigest()}"
+
+
+def login_state_cache_enabled():
+    # A lockout or an admin unlock must be seen by every worker, so a process-local cache is not used.
+    if LOGIN_STATE_CACHE_ENABLED is not None:
+        return LOGIN_STATE_CACHE_ENABLED
+    return default_cache_is_shared()
+
 
+def _set_login_state(username, state):
+    if login_state_cache_enabled():
+        cache.set(_lock_key("user", username), state, LOGIN_STATE_CACHE_SECONDS)
 
-def get_or_create_login_attempt(username):
-    return LoginAttempt.objects.get_or_create(username=username or "", defaults={"failed_attempts": 0})[0]
 
+def _login_state(username):
+    # Cached view of the persisted LoginAttempt row, so logins do not read it every time.
+    cached = login_state_cache_enabled()
+    state = cache.get(_lock_key("user", username)) if cached else None
+    if state is None:
+        attempt = LoginAttempt.objects.filter(username=username).values("failed_attempts", "locked_until").first()
+        state = {
+            "locked_until": attempt["locked_until"] if attempt else None,
+            "dirty": bool(attempt and (attempt["failed_attempts"] or attempt["locked_until"])),
+        }
+        if cached:
+            _set_login_state(username, state)
+    return state
 
-def is_login_locked(username):
-    settings = get_security_settings()
-    if not settings.lockout_enabled or not username:
+
+def is_login_locked(username, request=None):
+    security = get_cached_security_settings()
+    if not security.lockout_enabled or not username:
         return False, None
-    attempt = LoginAttempt.objects.filter(username=username).first()
-    if attempt and attempt.is_locked:
-        return True, attempt
-    return False, attempt
+    now = timezone.now()
+    ip = get_client_ip(request) if request is not None else ""
+    address_locked_until = cache.get(_lock_key("ip", ip)) if ip else None
+    if address_locked_until and address_locked_until > now:
+        return True, address_locked_until
+    locked_until = _login_state(username)["locked_until"]
+    if locked_until and locked_until > now:
+        return True, locked_until
+    return False, None
 
 
 def record_failed_login(username, request=None):
     if not username:
         return None
-    settings = get_security_settings()
-    attempt = get_or_create_login_attempt(username)
-    attempt.failed_attempts += 1
-    attempt.last_failed_at = timezone.now()
-    if request is not None:
-        attempt.last_ip = get_client_ip(request)
-    if settings.lockout_enabled and attempt.failed_attempts >= settings.max_failed_login_attempts:
-        attempt.locked_until = timezone.now() + timedelta(minutes=settings.login_lockout_minutes)
-    attempt.save(update_fields=["failed_attempts", "last_failed_at", "last_ip", "locked_until"])
-    return attempt
+    security = get_cached_security_settings()
+    ip = get_client_ip(request) if request is not None else ""
+    failures = _window_hit("user", username)
+    ip_failures = _window_hit("ip", ip) if ip else 0
+    if not security.lockout_enabled:
+        return None
+    now = timezone.now()
+    if ip_failures >= LOGIN_THROTTLE_IP_FAILURES:
+        # An address spraying many accounts is throttled itself; the accounts it guessed at stay usable.
+        address_locked_until = now + timedelta(seconds=LOGIN_THROTTLE_WINDOW_SECONDS)
+        cache.set(_lock_key("ip", ip), address_locked_until, LOGIN_THROTTLE_WINDOW_SECONDS)
+        _window_reset("ip", ip)
+    if failures < security.max_failed_login_attempts:
+        return None
+    locked_until = now + timedelta(minutes=security.login_lockout_minutes)
+    state = _login_state(username)
+    if state["locked_until"] and state["locked_until"] > now:
+        return state["locked_until"]
+    # Only the transition into a lockout is written to the database.
+    LoginAttempt.objects.update_or_create(
+        username=username,
+        defaults={
+            "failed_attempts": int(failures),
+            "locked_until": locked_until,
+            "last_failed_at": now,
+            "last_ip": ip,
+        },
+    )
+    _set_login_state(username, {"locked_until": locked_until, "dirty": True})
+    _window_reset("user", username)
+    return locked_until
 
 
 def clear_login_attempt(username):
     if not username:
         return
+    _window_reset("user", username)
+    if not _login_state(username)["dirty"]:
+        return
     LoginAttempt.objects.filter(username=username).update(
         failed_attempts=0,
         locked_until=None,
         last_failed_at=None,
     )
+    _set_login_state(username, {"locked_until": None, "dirty": False})
 
 
 def unlock_login_attempt(attempt):
     attempt.failed_attempts = 0
     attempt.locked_until = None
     attempt.save(update_fields=["failed_attempts", "locked_until"])
+    _window_reset("user", attempt.username)
+    cache.delete(_lock_key("user", attempt.username))
 
 
-def session_expired(request):
-    settings = get_security_settings()
-    last_activity_raw = request.session.get(SESSION_ACTIVITY_KEY)
-    if not last_activity_raw:
-        return False
+def _user_token_state_key(user_id):
+    return f"jwt-user-state:{user_id}"
+
+
+def user_token_state(user_id):
+    # Short-lived snapshot used to revoke claim-based API tokens of deactivated or re-roled users.
+    key = _user_token_state_key(user_id)
+    state = cache.get(key)
+    if state is None:
+        row = User.objects.filter(pk=user_id).values("is_active", "is_superuser", "profile__role").first()
+        state = {
+            "is_active": bool(row and row["is_active"]),
+            "is_superuser": bool(row and row["is_superuser"]),
+            "role": row["profile__role"] if row else None,
+        }
+        cache.set(key, state, JWT_USER_STATE_CACHE_SECONDS)
+    return state
+
+
+def invalidate_user_token_state(user_id):
+    cache.delete(_user_token_state_key(user_id))
+
+
+def _last_activity(request):
+    value = request.session.get(SESSION_ACTIVITY_KEY)
+    if not value:
+        return None
+    if isinstance(value, (int, float)):
+        return value
+    # Older sessions stored an ISO timestamp.
     try:
-        last_activity = datetime.fromisoformat(last_activity_raw)
+        last_activity = datetime.fromisoformat(value)
         if timezone.is_naive(last_activity):
             last_activity = timezone.make_aware(last_activity, timezone.get_current_timezone())
     except Exception:
+        return None
+    return last_activity.timestamp()
+
+
+def session_expired(request):
+    last_activity = _last_activity(request)
+    if last_activity is None:
         return False
-    return timezone.now() > last_activity + timedelta(minutes=settings.session_timeout_minutes)
+    settings = get_cached_security_settings()
+    return time.time() > last_activity + settings.session_timeout_minutes * 60
 
 
 def touch_session(request):
-    request.session[SESSION_ACTIVITY_KEY] = timezone.now().isoformat()
+    # Coarse timestamps: the session is only modified (and saved) once per interval.
+    now = int(time.time())
+    last_activity = _last_activity(request)
+    if last_activity is None or now - last_activity >= SESSION_ACTIVITY_WRITE_SECONDS:
+        request.session[SESSION_ACTIVITY_KEY] = now
 
 
 def logout_for_idle_timeout(request):
@@ -0,0 +1,74 @@
+import threading
+
+from django.conf import settings
+
+REQUEST_COALESCING_ENABLED = getattr(settings, "REQUEST_COALESCING_ENABLED", True)
+
+_groups = {}
+_groups_lock = threading.Lock()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Concurrent calls with the same key share one execution; later callers get the leader's result."""
+
+    def __init__(self, enabled=REQUEST_COALESCING_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._metrics = {"executed": 0, "shared": 0}
+
+    def do(self, key, fn):
+        if not self.enabled:
+            with self._lock:
+                self._metrics["executed"] += 1
+            return fn()
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._metrics["executed"] += 1
+            else:
+                self._metrics["shared"] += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        try:
+            call.result = fn()
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result
+
+    def stats(self):
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics["in_flight"] = len(self._calls)
+        return metrics
+
+
+def get_flight(name):
+    with _groups_lock:
+        flight = _groups.get(name)
+        if flight is None:
+            flight = _groups[name] = SingleFlight()
+        return flight
+
+
+def flight_metrics():
+    with _groups_lock:
+        groups = dict(_groups)
+    return {name: flight.stats() for name, flight in groups.items()}
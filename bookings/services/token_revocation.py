@@ -0,0 +1,127 @@
+import hashlib
+import threading
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+from bookings.services.shared_cache import default_cache_is_shared
+
+TOKEN_REVOCATION_BLOOM_BITS = getattr(settings, "TOKEN_REVOCATION_BLOOM_BITS", 1 << 20)
+TOKEN_REVOCATION_BLOOM_HASHES = getattr(settings, "TOKEN_REVOCATION_BLOOM_HASHES", 7)
+TOKEN_PRUNE_BATCH_SIZE = getattr(settings, "TOKEN_PRUNE_BATCH_SIZE", 1000)
+# None: use the filter only when the default cache is shared between processes.
+TOKEN_REVOCATION_FILTER_ENABLED = getattr(settings, "TOKEN_REVOCATION_FILTER_ENABLED", None)
+# Re-read a few recent ids on every sync so rows committed out of id order are not missed.
+REVOCATION_SYNC_OVERLAP = 100
+
+REVOCATION_GENERATION_KEY = "token-revocation:generation"
+REVOCATION_EPOCH_KEY = "token-revocation:epoch"
+
+
+class BloomFilter:
+    def __init__(self, bits=TOKEN_REVOCATION_BLOOM_BITS, hashes=TOKEN_REVOCATION_BLOOM_HASHES):
+        self.bits = bits
+        self.hashes = hashes
+        self.array = bytearray((bits + 7) // 8)
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + index * second) % self.bits for index in range(self.hashes))
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.array[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, value):
+        return all(self.array[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class _LocalRevocations:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.epoch = None
+        self.generation = None
+        self.last_id = 0
+        self.filter = BloomFilter()
+
+
+_local = _LocalRevocations()
+
+
+def _shared_state():
+    values = cache.get_many([REVOCATION_EPOCH_KEY, REVOCATION_GENERATION_KEY])
+    if REVOCATION_EPOCH_KEY not in values:
+        cache.add(REVOCATION_GENERATION_KEY, 0, None)
+        cache.add(REVOCATION_EPOCH_KEY, uuid.uuid4().hex, None)
+        values = cache.get_many([REVOCATION_EPOCH_KEY, REVOCATION_GENERATION_KEY])
+    return values.get(REVOCATION_EPOCH_KEY), values.get(REVOCATION_GENERATION_KEY, 0)
+
+
+def _sync():
+    epoch, generation = _shared_state()
+    with _local.lock:
+        if epoch == _local.epoch and generation == _local.generation:
+            return
+        blacklisted = BlacklistedToken.objects.order_by("id")
+        if epoch != _local.epoch:
+            _local.filter = BloomFilter()
+            _local.last_id = 0
+            blacklisted = blacklisted.filter(token__expires_at__gt=timezone.now())
+        else:
+            blacklisted = blacklisted.filter(id__gt=_local.last_id - REVOCATION_SYNC_OVERLAP)
+        for pk, jti in blacklisted.values_list("id", "token__jti").iterator():
+            _local.filter.add(jti)
+            _local.last_id = max(_local.last_id, pk)
+        _local.epoch = epoch
+        _local.generation = generation
+
+
+def revocation_filter_enabled():
+    # Revocations reach other workers only through the cache generation; a per-process cache never
+    # carries them, so there the filter could miss a revoked token and the database stays authoritative.
+    if TOKEN_REVOCATION_FILTER_ENABLED is not None:
+        return TOKEN_REVOCATION_FILTER_ENABLED
+    return default_cache_is_shared()
+
+
+def is_token_revoked(jti):
+    if revocation_filter_enabled():
+        _sync()
+        if jti not in _local.filter:
+            return False
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+def note_token_revoked(jti):
+    with _local.lock:
+        _local.filter.add(jti)
+    try:
+        cache.incr(REVOCATION_GENERATION_KEY)
+    except ValueError:
+        cache.delete(REVOCATION_EPOCH_KEY)
+
+
+def reset_revocation_filter():
+    cache.set(REVOCATION_EPOCH_KEY, uuid.uuid4().hex, None)
+
+
+def prune_tokens(batch_size=TOKEN_PRUNE_BATCH_SIZE, progress=None):
+    expired = OutstandingToken.objects.filter(expires_at__lte=timezone.now()).order_by("pk")
+    deleted = 0
+    while True:
+        ids = list(expired.values_list("pk", flat=True)[:batch_size])
+        if not ids:
+            break
+        BlacklistedToken.objects.filter(token_id__in=ids).delete()
+        OutstandingToken.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
+        if progress is not None:
+            progress(deleted)
+    if deleted:
+        reset_revocation_filter()
+    return deleted
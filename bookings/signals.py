@@ -0,0 +1,155 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from bookings.models import (
+    BackupChangeLog,
+    Booking,
+    CustomerOrder,
+    Dish,
+    MenuOverride,
+    MenuOverrideItem,
+    News,
+    OrderItem,
+    OrderItemReview,
+    Promotion,
+    PromotionComboItem,
+    PromotionDishRule,
+    SecuritySettings,
+    UserProfile,
+    VenueComplaint,
+    WeeklyMenu,
+    WeeklyMenuDay,
+    WeeklyMenuDayItem,
+    WeeklyMenuDaySettings,
+    WeeklyMenuItem,
+)
+from bookings.services.backup import change_logged_models, has_updated_at, record_backup_change
+from bookings.services.content_versions import CATALOG, NEWS, STOCK, bump_content_version
+from bookings.services.rollups import invalidate_rollup_day
+from bookings.services.security import invalidate_security_settings, invalidate_user_token_state
+
+
+def _order_day(item):
+    if OrderItem.order.is_cached(item):
+        return item.order.scheduled_for
+    return CustomerOrder.objects.filter(pk=item.order_id).values_list("scheduled_for", flat=True).first()
+
+
+ROLLUP_DATE_FIELDS = {Booking: "start_time", CustomerOrder: "scheduled_for"}
+
+
+@receiver(pre_save, sender=Booking)
+@receiver(pre_save, sender=CustomerOrder)
+def remember_rollup_day(sender, instance, raw=False, update_fields=None, **kwargs):
+    # A moved booking or order also changes the day it was moved away from.
+    field = ROLLUP_DATE_FIELDS[sender]
+    instance._rollup_previous_value = None
+    if raw or instance.pk is None or (update_fields is not None and field not in update_fields):
+        return
+    instance._rollup_previous_value = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+
+
+def _invalidate_rollup_days(sender, instance):
+    value = getattr(instance, ROLLUP_DATE_FIELDS[sender])
+    previous = instance.__dict__.pop("_rollup_previous_value", None)
+    invalidate_rollup_day(value)
+    if previous is not None and previous != value:
+        invalidate_rollup_day(previous)
+
+
+@receiver([post_save, post_delete], sender=Booking)
+def booking_rollup_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _invalidate_rollup_days(sender, instance)
+
+
+@receiver([post_save, post_delete], sender=CustomerOrder)
+def order_rollup_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        _invalidate_rollup_days(sender, instance)
+
+
+@receiver([post_save, post_delete], sender=OrderItem)
+def order_item_rollup_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_rollup_day(_order_day(instance))
+
+
+@receiver([post_save, post_delete], sender=VenueComplaint)
+@receiver([post_save, post_delete], sender=OrderItemReview)
+def feedback_rollup_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        invalidate_rollup_day(instance.created_at)
+
+
+CATALOG_MODELS = (
+    Dish,
+    WeeklyMenuDaySettings,
+    WeeklyMenuItem,
+    WeeklyMenu,
+    WeeklyMenuDay,
+    WeeklyMenuDayItem,
+    MenuOverride,
+    MenuOverrideItem,
+    Promotion,
+    PromotionComboItem,
+    PromotionDishRule,
+)
+
+
+def catalog_changed(sender, **kwargs):
+    bump_content_version(CATALOG)
+
+
+def connect_content_versions():
+    for model in CATALOG_MODELS:
+        post_save.connect(catalog_changed, sender=model, dispatch_uid=f"catalog_save_{model._meta.label_lower}")
+        post_delete.connect(catalog_changed, sender=model, dispatch_uid=f"catalog_delete_{model._meta.label_lower}")
+
+
+@receiver([post_save, post_delete], sender=Booking)
+@receiver([post_save, post_delete], sender=CustomerOrder)
+@receiver([post_save, post_delete], sender=OrderItem)
+def stock_changed(sender, **kwargs):
+    bump_content_version(STOCK)
+
+
+@receiver([post_save, post_delete], sender=News)
+def news_changed(sender, **kwargs):
+    bump_content_version(NEWS)
+
+
+@receiver([post_save, post_delete], sender=SecuritySettings)
+def security_settings_changed(sender, **kwargs):
+    invalidate_security_settings()
+
+
+@receiver([post_save, post_delete], sender=User)
+def user_token_state_changed(sender, instance, **kwargs):
+    invalidate_user_token_state(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=UserProfile)
+def profile_token_state_changed(sender, instance, **kwargs):
+    invalidate_user_token_state(instance.user_id)
+
+
+def backup_change_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    # update_last_login() touches only last_login on every login; that alone is not worth an incremental row.
+    if raw or (update_fields is not None and set(update_fields) == {"last_login"}):
+        return
+    record_backup_change(instance, BackupChangeLog.ACTION_SAVE)
+
+
+def backup_change_deleted(sender, instance, **kwargs):
+    record_backup_change(instance, BackupChangeLog.ACTION_DELETE)
+
+
+def connect_backup_change_log():
+    # Connected per model so other tables keep Django's fast bulk delete path.
+    # Models with updated_at are picked up by incremental backups directly.
+    for model in change_logged_models():
+        if not has_updated_at(model):
+            post_save.connect(backup_change_saved, sender=model, dispatch_uid=f"backup_save_{model._meta.label_lower}")
+        post_delete.connect(backup_change_deleted, sender=model, dispatch_uid=f"backup_delete_{model._meta.label_lower}")
@@ -1,23 +1,46 @@
+import gzip
+import http.client
+import json
+import os
+import random
+import tarfile
+import tempfile
+import threading
+import time
+from concurrent.futures import Future
 from datetime import datetime, timedelta
 from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO, StringIO
 from unittest.mock import patch
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
-from django.test import Client, TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 from bookings.models import (
     BackupArchive,
+    BackupChangeLog,
     Booking,
     CustomerOrder,
+    DailyDishSales,
+    DailyFeedbackSummary,
+    DailyTableBookings,
     Dish,
     ExternalIntegration,
     LoginAttempt,
+    News,
     OrderAppliedPromotion,
     OrderItem,
     OrderItemReview,
     Promotion,
+    PromotionComboItem,
+    ReportRollupDay,
     ServiceDurationOption,
     ServiceSlotSettings,
     ServiceWeekdayWindow,
@@ -28,7 +51,25 @@ from bookings.models import (
     WeeklyMenuItem,
 )
 from bookings.services.availability import get_bookable_dates
+from bookings.services.backup import (
+    _iter_json_array,
+    create_backup_archive,
+    latest_backup_base,
+    load_parallel_backup,
+    restore_backup_archive,
+    write_parallel_backup,
+)
+from bookings.services.content_versions import CONTENT_GROUPS, content_versions
+from bookings.services.http_client import CIRCUIT_FAILURE_THRESHOLD, OutboundClient, close_clients
+from bookings.services.integrations import check_integrations, integration_metrics
+from bookings.services.reports import admin_report_rows, operator_report_rows
+from bookings.services.promotions import compute_order_totals, compute_per_promotion_discounts, promotion_price_preview
+from bookings.services.rate_limit import consume_token
 from bookings.services.reservations import create_or_update_reservation_for_client
+from bookings.services.rollups import ensure_rollups
+from bookings.services.security import SESSION_ACTIVITY_KEY, clear_login_attempt, get_cached_security_settings
+from bookings.services.singleflight import SingleFlight
+from bookings.views_booking import _operator_dashboard_context
 
 
 def previous_weekday(start_date):
@@ -70,6 +111,42 @@ class AdminCabinetAccessTests(TestCase):
         self.assertContains(response, "Операторы")
         self.assertContains(response, "Логин")
 
+    def test_admin_cabinet_query_count_does_not_grow_with_users_or_bookings(self):
+        cache.clear()
+        self.client.login(username="admintest", password="testpass123")
+        dish = Dish.objects.create(name="Суп", price=Decimal("150.00"), available_quantity=50)
+
+        def add_rows(prefix, count):
+            for index in range(count):
+                user = User.objects.create_user(f"{prefix}{index}", password="testpass123")
+                UserProfile.objects.create(user=user, role=UserProfile.ROLE_CLIENT)
+                table = Table.objects.create(table_number=f"Q-{prefix}{index}", seats=4)
+                start_time = timezone.make_aware(datetime.combine(timezone.localdate(), datetime.min.time().replace(hour=12)))
+                booking = Booking.objects.create(
+                    user=user, table=table, guests_count=2, start_time=start_time, end_time=start_time + timedelta(minutes=60)
+                )
+                order = CustomerOrder.objects.create(
+                    user=user, booking=booking, order_type=CustomerOrder.TYPE_DINE_IN, scheduled_for=start_time
+                )
+                OrderItem.objects.create(
+                    order=order,
+                    dish=dish,
+                    dish_name_snapshot=dish.name,
+                    unit_price_snapshot=dish.price,
+                    quantity=1,
+                    line_total_snapshot=dish.price,
+                )
+
+        add_rows("few", 1)
+        get_cached_security_settings()
+        self.client.get("/dashboard/admin/cabinet/")
+        with CaptureQueriesContext(connection) as baseline:
+            self.client.get("/dashboard/admin/cabinet/")
+        add_rows("many", 6)
+        with self.assertNumQueries(len(baseline.captured_queries)):
+            response = self.client.get("/dashboard/admin/cabinet/")
+        self.assertEqual(len(response.context["recent_reservations"]), 7)
+
     def test_admin_can_update_username_and_role(self):
         self.client.login(username="admintest", password="testpass123")
         response = self.client.post(
@@ -251,6 +328,57 @@ class ClientOrderAndReviewTests(TestCase):
         self.assertContains(response, f"Заказ №{self.order.public_id}")
 
 
+    def test_order_pages_do_not_query_per_line(self):
+        operator = User.objects.create_user("operatorreview", password="testpass123")
+        UserProfile.objects.create(user=operator, role=UserProfile.ROLE_OPERATOR)
+        operator_client = Client()
+        operator_client.login(username="operatorreview", password="testpass123")
+        self.client.login(username="clientreview", password="testpass123")
+        pages = [
+            (self.client, f"/dashboard/client/reservations/{self.booking.public_id}/"),
+            (self.client, f"/dashboard/client/orders/{self.order.public_id}/"),
+            (self.client, "/dashboard/client/orders/"),
+            (operator_client, f"/dashboard/operator/reservations/{self.booking.public_id}/"),
+        ]
+
+        def query_counts():
+            counts = []
+            for client, path in pages:
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertEqual(client.get(path).status_code, 200, path)
+                counts.append(len(queries))
+            return counts
+
+        query_counts()
+        baseline = query_counts()
+        for index in range(3):
+            dish = Dish.objects.create(name=f"Суп {index}", price=Decimal("100.00"), available_quantity=20)
+            OrderItem.objects.create(
+                order=self.order,
+                dish=dish,
+                dish_name_snapshot=dish.name,
+                unit_price_snapshot=dish.price,
+                quantity=1,
+                line_total_snapshot=dish.price,
+            )
+            promotion = Promotion.objects.create(
+                name=f"Акция {index}",
+                kind=Promotion.KIND_SINGLE,
+                discount_type=Promotion.DISCOUNT_FIXED_OFF,
+                discount_value=Decimal("10.00"),
+                valid_from=timezone.now() - timedelta(days=1),
+                valid_to=timezone.now() + timedelta(days=1),
+                is_active=True,
+                target_dish=dish,
+            )
+            OrderAppliedPromotion.objects.create(order=self.order, promotion=promotion, promotion_name_snapshot=promotion.name)
+        self.assertEqual(query_counts(), baseline)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(pages[0][1])
+        for table in ("bookings_orderitem", "bookings_orderappliedpromotion"):
+            self.assertEqual(sum(f'FROM "{table}"' in query["sql"] for query in queries), 1, table)
+
+
 class OperatorComplaintTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -333,6 +461,23 @@ class RoleBoundaryAndFeatureTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.redirect_chain[-1][0], "/dashboard/admin/cabinet/")
 
+    def test_session_activity_is_written_at_most_once_per_interval(self):
+        cache.clear()
+        self.client.login(username="roleclient", password="testpass123")
+        self.client.get("/")
+        self.client.get("/")
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/")
+            self.client.get("/")
+        self.assertFalse([query for query in queries if "django_session" in query["sql"] and not query["sql"].startswith("SELECT")])
+        self.assertFalse([query for query in queries if "bookings_securitysettings" in query["sql"]])
+
+        session = self.client.session
+        session[SESSION_ACTIVITY_KEY] = int(time.time()) - 31 * 60
+        session.save()
+        response = self.client.get("/")
+        self.assertRedirects(response, "/accounts/login/", fetch_redirect_response=False)
+
     def test_operator_cannot_open_admin_pages(self):
         self.client.login(username="roleoperator", password="testpass123")
         response = self.client.get("/dashboard/admin/integrations/", follow=True)
@@ -396,6 +541,51 @@ class RoleBoundaryAndFeatureTests(TestCase):
         self.assertEqual(csv.status_code, 200)
         self.assertIn("text/csv", csv["Content-Type"])
 
+    def test_operator_bookings_csv_is_streamed(self):
+        table = Table.objects.create(table_number="S1", seats=2)
+        start_time = timezone.make_aware(
+            datetime.combine(previous_weekday(timezone.localdate()), datetime.min.time().replace(hour=12))
+        )
+        booking = Booking.objects.create(
+            user=self.client_user,
+            table=table,
+            guests_count=2,
+            start_time=start_time,
+            end_time=start_time + timedelta(hours=1),
+        )
+        self.client.login(username="roleoperator", password="testpass123")
+        response = self.client.get("/dashboard/operator/reports/?report=bookings&export=csv")
+        self.assertTrue(response.streaming)
+        content = b"".join(response.streaming_content).decode("utf-8")
+        self.assertTrue(content.startswith("\ufeffID,"))
+        self.assertIn(f"{booking.public_id},", content)
+        self.assertIn("roleclient,S1,2,Запланировано", content)
+
+    def test_operator_reservations_keyset_mode(self):
+        table = Table.objects.create(table_number="K1", seats=2)
+        bookings = []
+        day = timezone.localdate()
+        for _ in range(12):
+            day = previous_weekday(day)
+            start_time = timezone.make_aware(datetime.combine(day, datetime.min.time().replace(hour=12)))
+            bookings.append(
+                Booking.objects.create(
+                    user=self.client_user,
+                    table=table,
+                    guests_count=2,
+                    start_time=start_time,
+                    end_time=start_time + timedelta(hours=1),
+                )
+            )
+        self.client.login(username="roleoperator", password="testpass123")
+        first = self.client.get(f"/dashboard/operator/reservations/?mode=keyset&table={table.pk}")
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual([booking.pk for booking in first.context["reservations"]], [booking.pk for booking in bookings[:10]])
+        second = self.client.get(f"/dashboard/operator/reservations/?cursor={first.context['page_obj'].next_cursor}&table={table.pk}")
+        self.assertEqual([booking.pk for booking in second.context["reservations"]], [booking.pk for booking in bookings[10:]])
+        self.assertFalse(second.context["page_obj"].has_next)
+        self.assertContains(second, f"table={table.pk}")
+
     def test_operator_can_change_slot_settings(self):
         self.client.login(username="roleoperator", password="testpass123")
         monday = ServiceWeekdayWindow.objects.get(weekday=0)
@@ -418,3 +608,577 @@ class RoleBoundaryAndFeatureTests(TestCase):
             list(ServiceDurationOption.objects.filter(is_active=True).values_list("duration_minutes", flat=True)),
             [40, 70],
         )
+
+
+def decimal_promotion_preview(promotion, quantity=1):
+    if promotion.kind == Promotion.KIND_SINGLE:
+        base = Decimal(promotion.target_dish.price)
+    else:
+        base = sum((Decimal(item.dish.price) * item.min_quantity for item in promotion.combo_items.all()), Decimal("0.00"))
+    original = (base * quantity).quantize(Decimal("0.01"))
+    if promotion.discount_type == Promotion.DISCOUNT_PERCENT:
+        discount = Decimal("0.00")
+        if original > 0:
+            discount = min(original * (Decimal(promotion.discount_value) / Decimal("100")), original).quantize(Decimal("0.01"))
+    else:
+        discount = min(Decimal(promotion.discount_value) * quantity, original).quantize(Decimal("0.01"))
+    return original, discount, (original - discount).quantize(Decimal("0.01"))
+
+
+class MoneyParityTests(TestCase):
+    def setUp(self):
+        self.dishes = [
+            Dish.objects.create(name=f"Dish {idx}", price=Decimal("100.00"), available_quantity=100)
+            for idx in range(4)
+        ]
+        now = timezone.now()
+        single = Promotion.objects.create(
+            name="Single",
+            kind=Promotion.KIND_SINGLE,
+            discount_type=Promotion.DISCOUNT_PERCENT,
+            discount_value=Decimal("10.00"),
+            valid_from=now - timedelta(days=1),
+            valid_to=now + timedelta(days=1),
+            target_dish=self.dishes[0],
+        )
+        combo = Promotion.objects.create(
+            name="Combo",
+            kind=Promotion.KIND_COMBO,
+            discount_type=Promotion.DISCOUNT_FIXED_OFF,
+            discount_value=Decimal("50.00"),
+            valid_from=now - timedelta(days=1),
+            valid_to=now + timedelta(days=1),
+        )
+        for idx, dish in enumerate(self.dishes[1:], start=1):
+            PromotionComboItem.objects.create(promotion=combo, dish=dish, min_quantity=idx)
+        self.promotions = list(
+            Promotion.objects.filter(pk__in=[single.pk, combo.pk]).select_related("target_dish").prefetch_related("combo_items__dish")
+        )
+
+    def _random_price(self, rng):
+        return Decimal(rng.randint(0, 500000)).scaleb(-2)
+
+    def test_promotion_pricing_matches_decimal_arithmetic_on_random_carts(self):
+        rng = random.Random(20260422)
+        for _ in range(300):
+            promotions_with_qty = []
+            for promotion in self.promotions:
+                promotion.discount_type = rng.choice([Promotion.DISCOUNT_PERCENT, Promotion.DISCOUNT_FIXED_OFF])
+                promotion.discount_value = Decimal(rng.randint(0, 10000 if promotion.discount_type == Promotion.DISCOUNT_PERCENT else 900000)).scaleb(-2)
+                if promotion.target_dish_id:
+                    promotion.target_dish.price = self._random_price(rng)
+                for item in promotion.combo_items.all():
+                    item.dish.price = self._random_price(rng)
+                promotions_with_qty.append((promotion, rng.randint(0, 7)))
+
+            expected_total_discount = Decimal("0.00")
+            for promotion, quantity in promotions_with_qty:
+                original, discount, new_price = decimal_promotion_preview(promotion, quantity)
+                preview = promotion_price_preview(promotion, quantity=quantity)
+                self.assertEqual(preview["original_price"], original)
+                self.assertEqual(preview["discount_amount"], discount)
+                self.assertEqual(preview["new_price"], new_price)
+                if quantity > 0:
+                    expected_total_discount += discount
+            _, total_discount = compute_per_promotion_discounts(promotions_with_qty)
+            self.assertEqual(total_discount, expected_total_discount.quantize(Decimal("0.01")))
+
+            for dish in self.dishes:
+                dish.price = self._random_price(rng)
+            dishes_by_id = {dish.pk: dish for dish in self.dishes}
+            cart = {dish.pk: rng.randint(0, 12) for dish in self.dishes}
+            expected_subtotal = sum((Decimal(dish.price) * cart[dish.pk] for dish in self.dishes), Decimal("0.00")).quantize(Decimal("0.01"))
+            expected_total = max((expected_subtotal - total_discount).quantize(Decimal("0.01")), Decimal("0.00"))
+            subtotal, total = compute_order_totals(cart, dishes_by_id, total_discount)
+            self.assertEqual(subtotal, expected_subtotal)
+            self.assertEqual(total, expected_total)
+
+
+class ReportPeriodQueryPlanTests(TestCase):
+    def _report_queries(self, build_rows, report_type):
+        today = timezone.localdate()
+        with CaptureQueriesContext(connection) as captured:
+            _, rows = build_rows(report_type, today - timedelta(days=365), today)
+            list(rows)
+        return [query["sql"] for query in captured.captured_queries]
+
+    def _query_plan(self, sql):
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                return " ".join(str(row[-1]) for row in cursor.fetchall())
+            cursor.execute(f"EXPLAIN {sql}")
+            return " ".join(str(row[0]) for row in cursor.fetchall())
+
+    def test_period_reports_compare_raw_columns(self):
+        for build_rows, report_type in (
+            (operator_report_rows, "bookings"),
+            (operator_report_rows, "sales"),
+            (operator_report_rows, "complaints"),
+            (operator_report_rows, "reviews"),
+            (admin_report_rows, "orders"),
+        ):
+            queries = self._report_queries(build_rows, report_type)
+            self.assertTrue(queries, report_type)
+            for sql in queries:
+                self.assertNotIn("django_datetime_cast_date", sql, report_type)
+                self.assertNotIn("::date", sql, report_type)
+
+    def test_period_reports_use_datetime_indexes(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("Index usage on small PostgreSQL tables depends on planner statistics.")
+        for build_rows, report_type, table in (
+            (operator_report_rows, "bookings", "bookings_booking"),
+            (operator_report_rows, "complaints", "bookings_venuecomplaint"),
+            (operator_report_rows, "reviews", "bookings_orderitemreview"),
+            (admin_report_rows, "orders", "bookings_customerorder"),
+        ):
+            plan = self._query_plan(self._report_queries(build_rows, report_type)[0])
+            self.assertRegex(plan, rf"SEARCH {table} USING (COVERING )?INDEX", report_type)
+
+
+class ReportRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("rollupclient", password="testpass123")
+        self.table = Table.objects.create(table_number="R1", seats=4)
+        self.soup = Dish.objects.create(name="Суп", price=Decimal("150.00"), available_quantity=50)
+        self.salad = Dish.objects.create(name="Салат", price=Decimal("200.00"), available_quantity=50)
+        self.today = timezone.localdate()
+        self.closed_day = self.today - timedelta(days=3)
+        self.closed_order = self._order(self.closed_day, [(self.soup, 2), (self.salad, 1)], status=Booking.STATUS_COMPLETED)
+        self._order(self.today, [(self.soup, 1)])
+
+    def _order(self, day, lines, status=Booking.STATUS_SCHEDULED):
+        start_time = timezone.make_aware(datetime.combine(day, datetime.min.time().replace(hour=12)))
+        booking = Booking.objects.create(
+            user=self.user,
+            table=self.table,
+            guests_count=3,
+            start_time=start_time,
+            end_time=start_time + timedelta(minutes=90),
+            status=status,
+        )
+        order = CustomerOrder.objects.create(
+            user=self.user,
+            booking=booking,
+            order_type=CustomerOrder.TYPE_DINE_IN,
+            scheduled_for=start_time,
+        )
+        for dish, quantity in lines:
+            OrderItem.objects.create(
+                order=order,
+                dish=dish,
+                dish_name_snapshot=dish.name,
+                unit_price_snapshot=dish.price,
+                quantity=quantity,
+                line_total_snapshot=dish.price * quantity,
+            )
+        return order
+
+    def _sales(self):
+        _, rows = operator_report_rows("sales", self.today - timedelta(days=7), self.today)
+        return [list(row) for row in rows]
+
+    def test_sales_report_combines_rollups_and_live_day(self):
+        self.assertEqual(
+            self._sales(),
+            [["Суп", 3, 2, Decimal("450.00")], ["Салат", 1, 1, Decimal("200.00")]],
+        )
+        self.assertEqual(ReportRollupDay.objects.count(), 7)
+        self.assertEqual(DailyDishSales.objects.filter(day=self.closed_day).count(), 2)
+        rollup = DailyTableBookings.objects.get(day=self.closed_day, table=self.table)
+        self.assertEqual((rollup.completed_count, rollup.guests_total, rollup.guest_minutes), (1, 3, 270))
+
+        with self.assertNumQueries(3):
+            self._sales()
+
+    def test_changes_to_closed_day_rebuild_its_rollup(self):
+        self._sales()
+        item = self.closed_order.items.get(dish=self.salad)
+        item.quantity = 4
+        item.line_total_snapshot = Decimal("800.00")
+        item.save()
+        self.assertFalse(ReportRollupDay.objects.filter(day=self.closed_day).exists())
+        self.assertEqual(self._sales()[0], ["Салат", 4, 1, Decimal("800.00")])
+
+    def test_moving_order_to_another_day_invalidates_both_days(self):
+        self._sales()
+        other_day = self.today - timedelta(days=5)
+        moved_to = self.closed_order.scheduled_for - timedelta(days=2)
+        self.closed_order.scheduled_for = moved_to
+        self.closed_order.save()
+        booking = self.closed_order.booking
+        booking.start_time, booking.end_time = moved_to, moved_to + timedelta(minutes=90)
+        booking.save()
+        self.assertFalse(ReportRollupDay.objects.filter(day__in=[self.closed_day, other_day]).exists())
+        self._sales()
+        self.assertFalse(DailyDishSales.objects.filter(day=self.closed_day).exists())
+        self.assertEqual(DailyDishSales.objects.filter(day=other_day).count(), 2)
+        self.assertEqual(DailyTableBookings.objects.get(day=other_day, table=self.table).completed_count, 1)
+
+    def test_build_command_backfills_closed_days(self):
+        call_command("build_report_rollups", days=5, stdout=StringIO())
+        self.assertEqual(
+            set(ReportRollupDay.objects.values_list("day", flat=True)),
+            {self.today - timedelta(days=offset) for offset in range(1, 6)},
+        )
+        self.assertEqual(DailyFeedbackSummary.objects.count(), 5)
+
+    def test_operator_dashboard_metrics_are_aggregated_and_cached(self):
+        cache.clear()
+        ensure_rollups(self.today - timedelta(days=30), self.today)
+        with self.assertNumQueries(11):
+            context = _operator_dashboard_context()
+        self.assertEqual(context["sales_total_revenue"], Decimal("650.00"))
+        self.assertEqual(context["reservations_today"], 1)
+        self.assertEqual(context["reservations_completed_period"], 1)
+        self.assertEqual([row["dish_name_snapshot"] for row in context["top_dishes"]], ["Суп", "Салат"])
+        with self.assertNumQueries(0):
+            _operator_dashboard_context()
+
+
+class InlineExecutor:
+    """Stands in for the backup process and thread pools; runs every task in the calling thread."""
+
+    def __init__(self, max_workers=None, **kwargs):
+        self.max_workers = max_workers
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.shutdown()
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(prefix="backup-tests-"))
+class BackupArchiveTests(TestCase):
+    def setUp(self):
+        self.admin_user = User.objects.create_user("backupadmin", password="testpass123")
+        self.table = Table.objects.create(table_number="B1", seats=4)
+        Dish.objects.create(name="Пельмени", price=Decimal("320.00"), available_quantity=10)
+
+    def _archive_objects(self, archive):
+        with archive.file.open("rb") as raw_file, gzip.open(raw_file, "rt", encoding="utf-8") as text_file:
+            payload = text_file.read()
+        return payload, json.loads(payload)
+
+    def test_backup_is_streamed_in_dependency_order_without_indent(self):
+        progress = []
+        archive = create_backup_archive(user=self.admin_user, progress=lambda label, count: progress.append((label, count)))
+        payload, objects = self._archive_objects(archive)
+        self.assertNotIn("\n  ", payload)
+        labels = [item["model"] for item in objects]
+        self.assertIn("auth.user", labels)
+        self.assertEqual(labels[0], "auth.user")
+        self.assertEqual(labels.count("bookings.table"), 1)
+        self.assertIn(("bookings.Dish", 1), progress)
+        self.assertEqual(BackupArchive.objects.get().created_by, self.admin_user)
+
+    def test_backup_archive_restores_with_loaddata(self):
+        archive = create_backup_archive(user=self.admin_user)
+        with archive.file.open("rb") as raw_file, gzip.open(raw_file, "rb") as gz_file:
+            fixture_path = os.path.join(tempfile.mkdtemp(prefix="backup-fixture-"), "backup.json")
+            with open(fixture_path, "wb") as fixture:
+                fixture.write(gz_file.read())
+        Table.objects.filter(pk=self.table.pk).update(seats=2)
+        call_command("loaddata", fixture_path, verbosity=0)
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.seats, 4)
+
+    def test_streaming_restore_updates_and_recreates_rows(self):
+        news = News.objects.create(title="Открытие", body="Текст", published_at=timezone.now())
+        guest = User.objects.create_user("backupguest", password="testpass123")
+        UserProfile.objects.create(user=guest, role=UserProfile.ROLE_CLIENT, phone="+79990001122")
+        created_at = timezone.now().replace(microsecond=0) - timedelta(days=10)
+        News.objects.filter(pk=news.pk).update(created_at=created_at)
+        archive = create_backup_archive(user=self.admin_user)
+        Table.objects.filter(pk=self.table.pk).update(seats=2)
+        News.objects.filter(pk=news.pk).delete()
+        guest.delete()
+        versions = content_versions(*CONTENT_GROUPS)
+        progress = []
+        stats = restore_backup_archive(
+            archive=archive, user=self.admin_user, progress=lambda label, count: progress.append(label)
+        )
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.seats, 4)
+        self.assertEqual(News.objects.get(pk=news.pk).created_at, created_at)
+        self.assertIn("bookings.News", progress)
+        self.assertEqual(UserProfile.objects.get(user__username="backupguest").phone, "+79990001122")
+        self.assertEqual(stats["models"]["bookings.Table"], 1)
+        self.assertEqual(BackupArchive.objects.get(pk=archive.pk).restore_count, 1)
+        self.assertTrue(all(after != before for after, before in zip(content_versions(*CONTENT_GROUPS), versions)))
+        self.assertEqual(Table.objects.create(table_number="B2", seats=2).pk, self.table.pk + 1)
+
+    def test_failed_restore_is_recorded_and_blocks_incremental_base(self):
+        archive = create_backup_archive(user=self.admin_user)
+        self.assertEqual(latest_backup_base(), archive)
+        with patch("bookings.services.backup._load_archive", side_effect=ValueError("битый архив")):
+            with self.assertRaises(ValueError):
+                restore_backup_archive(archive=archive, user=self.admin_user)
+        archive.refresh_from_db()
+        self.assertTrue(archive.last_restore_failed)
+        self.assertEqual(archive.last_restore_error, "ValueError: битый архив")
+        self.assertEqual(archive.restore_count, 0)
+        self.assertIsNone(latest_backup_base())
+
+    def test_full_backup_prunes_change_log_but_keeps_recent_export_tombstones(self):
+        now = timezone.now()
+        entries = [("bookings.booking", timedelta(minutes=1)), ("bookings.booking", timedelta(days=30)), ("bookings.news", timedelta(minutes=1))]
+        for label, age in entries:
+            BackupChangeLog.objects.create(model_label=label, object_pk="1", action=BackupChangeLog.ACTION_DELETE, changed_at=now - age)
+        create_backup_archive(user=self.admin_user)
+        remaining = BackupChangeLog.objects.values_list("model_label", "changed_at")
+        self.assertEqual(list(remaining), [("bookings.booking", now - timedelta(minutes=1))])
+
+    def test_json_array_parser_handles_small_reads(self):
+        records = [{"model": "bookings.table", "pk": idx, "fields": {"note": "[{\"x\": ]}" * idx}} for idx in range(1, 30)]
+        stream = StringIO(json.dumps(records))
+        self.assertEqual(list(_iter_json_array(stream, read_size=7)), records)
+
+    @patch("bookings.services.backup.BACKUP_INCREMENTAL_OVERLAP_SECONDS", 0)
+    def test_incremental_backup_holds_changes_and_restores_with_its_chain(self):
+        dish = Dish.objects.get(name="Пельмени")
+        dish_pk = dish.pk
+        full = create_backup_archive(user=self.admin_user)
+        self.table.seats = 2
+        self.table.save()
+        news = News.objects.create(title="Новое меню", body="Текст", published_at=timezone.now())
+        dish.delete()
+        increment = create_backup_archive(user=self.admin_user, incremental=True)
+        self.assertEqual(increment.kind, BackupArchive.KIND_INCREMENTAL)
+        self.assertEqual(increment.base_archive, full)
+        _, objects = self._archive_objects(increment)
+        changed = {(item["model"], item.get("pk")) for item in objects if not item.get("deleted")}
+        self.assertIn(("bookings.table", self.table.pk), changed)
+        self.assertIn(("bookings.news", news.pk), changed)
+        self.assertNotIn("auth.user", {model for model, _ in changed})
+        self.assertIn({"model": "bookings.dish", "deleted": True, "pk": dish_pk}, objects)
+
+        Table.objects.filter(pk=self.table.pk).update(seats=4)
+        News.objects.filter(pk=news.pk).delete()
+        stats = restore_backup_archive(archive=increment, user=self.admin_user)
+        self.assertEqual(stats["archives"], 2)
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.seats, 2)
+        self.assertTrue(News.objects.filter(pk=news.pk).exists())
+        self.assertFalse(Dish.objects.filter(pk=dish_pk).exists())
+        self.assertEqual(create_backup_archive(user=self.admin_user, incremental=True).kind, BackupArchive.KIND_FULL)
+
+    def _parallel_backup_members(self, workers):
+        raw_file = BytesIO()
+        write_parallel_backup(raw_file, workers=workers)
+        raw_file.seek(0)
+        with tarfile.open(fileobj=raw_file, mode="r") as archive_tar:
+            return raw_file.getvalue(), {
+                name: archive_tar.extractfile(name).read()
+                if name == "manifest.json"
+                else gzip.decompress(archive_tar.extractfile(name).read())
+                for name in archive_tar.getnames()
+            }
+
+    def test_pooled_backup_and_restore_match_serial_runs(self):
+        booking_start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        Booking.objects.create(
+            user=self.admin_user,
+            table=self.table,
+            guests_count=2,
+            start_time=booking_start,
+            end_time=booking_start + timedelta(minutes=90),
+        )
+        _, serial_members = self._parallel_backup_members(workers=1)
+        with patch("bookings.services.backup.ProcessPoolExecutor", side_effect=InlineExecutor) as process_pool:
+            raw_archive, pooled_members = self._parallel_backup_members(workers=4)
+        process_pool.assert_called_once()
+        self.assertEqual(pooled_members, serial_members)
+
+        def open_file():
+            return BytesIO(raw_archive)
+
+        serial_counts = load_parallel_backup(open_file, workers=1)
+        Table.objects.filter(pk=self.table.pk).update(seats=2)
+        Booking.objects.update(guests_count=4)
+        with patch("bookings.services.backup.ThreadPoolExecutor", side_effect=InlineExecutor) as thread_pool:
+            pooled_counts = load_parallel_backup(open_file, workers=4)
+        self.assertTrue(thread_pool.called)
+        self.assertEqual(pooled_counts, serial_counts)
+        self.assertEqual(pooled_counts["bookings.Booking"], 1)
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.seats, 4)
+        self.assertEqual(Booking.objects.get().guests_count, 2)
+
+    def test_incremental_backup_overlaps_its_base_snapshot(self):
+        full = create_backup_archive(user=self.admin_user)
+        # Saved just before the base snapshot but committed after the base dump had read the table.
+        late_news = News.objects.create(title="Поздняя", body="Текст", published_at=timezone.now())
+        News.objects.filter(pk=late_news.pk).update(updated_at=full.snapshot_at - timedelta(seconds=5))
+        LoginAttempt.objects.create(username="backupadmin", failed_attempts=3)
+        clear_login_attempt("backupadmin")
+        increment = create_backup_archive(user=self.admin_user, incremental=True)
+        _, objects = self._archive_objects(increment)
+        labels = {(item["model"], item.get("pk")) for item in objects}
+        self.assertIn(("bookings.news", late_news.pk), labels)
+        self.assertNotIn("bookings.loginattempt", {model for model, _ in labels})
+
+    def test_change_log_skips_logins_and_bookkeeping_rows(self):
+        BackupChangeLog.objects.all().delete()
+        self.assertTrue(self.client.login(username="backupadmin", password="testpass123"))
+        LoginAttempt.objects.create(username="backupadmin", failed_attempts=1)
+        create_backup_archive(user=self.admin_user)
+        self.assertFalse(BackupChangeLog.objects.exists())
+        self.admin_user.first_name = "Админ"
+        self.admin_user.save()
+        self.assertEqual(list(BackupChangeLog.objects.values_list("model_label", flat=True)), ["auth.user"])
+
+    def test_per_model_tar_backup_restores_by_dependency_level(self):
+        archive = create_backup_archive(user=self.admin_user, workers=1)
+        self.assertTrue(archive.original_name.endswith(".tar"))
+        with archive.file.open("rb") as raw_file, tarfile.open(fileobj=raw_file, mode="r") as archive_tar:
+            manifest = json.load(archive_tar.extractfile("manifest.json"))
+            members = {member["model"]: member for member in manifest["members"]}
+            self.assertEqual(set(archive_tar.getnames()) - {"manifest.json"}, {member["name"] for member in manifest["members"]})
+        self.assertEqual(members["auth.user"]["level"], 0)
+        self.assertEqual(members["bookings.table"]["count"], 1)
+        self.assertGreater(members["bookings.booking"]["level"], members["bookings.table"]["level"])
+        self.assertGreater(members["bookings.customerorder"]["level"], members["bookings.booking"]["level"])
+
+        Table.objects.filter(pk=self.table.pk).update(seats=2)
+        stats = restore_backup_archive(archive=archive, user=self.admin_user, workers=4)
+        self.table.refresh_from_db()
+        self.assertEqual(self.table.seats, 4)
+        self.assertEqual(stats["models"]["bookings.Dish"], 1)
+
+
+class SingleFlightTests(TestCase):
+    def test_concurrent_identical_calls_share_one_execution(self):
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+        results = []
+
+        def compute():
+            calls.append(1)
+            release.wait(5)
+            return {"slots": ["12:00"]}
+
+        threads = [threading.Thread(target=lambda: results.append(flight.do(("2026-10-20", 2), compute))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        deadline = time.monotonic() + 5
+        while flight.stats()["shared"] < 4 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{"slots": ["12:00"]}] * 5)
+        self.assertEqual(flight.stats(), {"executed": 1, "shared": 4, "in_flight": 0})
+        self.assertEqual(flight.do(("2026-10-20", 2), lambda: "fresh"), "fresh")
+        with self.assertRaises(ValueError):
+            flight.do("broken", lambda: int("x"))
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_concurrent_calls_cannot_share_one_allowance(self):
+        barrier = threading.Barrier(12)
+        results = []
+
+        def call():
+            barrier.wait(5)
+            results.append(consume_token("concurrency-test", "ip:203.0.113.1", rate=0.01, burst=5)[0])
+
+        threads = [threading.Thread(target=call) for _ in range(12)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        self.assertEqual(results.count(True), 5)
+        allowed, retry_after = consume_token("concurrency-test", "ip:203.0.113.1", rate=0.01, burst=5)
+        self.assertFalse(allowed)
+        self.assertGreaterEqual(retry_after, 100)
+        self.assertTrue(consume_token("concurrency-test", "ip:203.0.113.2", rate=0.01, burst=5)[0])
+
+
+class IntegrationCheckTests(TestCase):
+    def setUp(self):
+        ports = self.client_ports = []
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                ports.append(self.client_address[1])
+                status = 500 if self.path.startswith("/broken") else 200
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                # Answer as keep-alive, then drop the connection like an idle timeout would.
+                self.close_connection = self.path.startswith("/drop")
+
+            do_POST = do_GET
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.addCleanup(close_clients)
+        base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.healthy = ExternalIntegration.objects.create(name="CRM", base_url=f"{base_url}/health")
+        self.broken = ExternalIntegration.objects.create(name="ERP", base_url=f"{base_url}/broken")
+        self.offline = ExternalIntegration.objects.create(name="POS", base_url="http://127.0.0.1:9/", timeout_seconds=2)
+
+    def test_checks_run_concurrently_and_are_saved_in_one_update(self):
+        integrations = list(ExternalIntegration.objects.all())
+        with self.assertNumQueries(1):
+            results = check_integrations(integrations, deadline_seconds=5)
+        self.assertEqual(results[self.healthy.pk], (True, "HTTP 200"))
+        self.assertEqual(results[self.broken.pk][0], False)
+        self.assertTrue(results[self.broken.pk][1].startswith("HTTP 500"))
+        self.assertTrue(results[self.offline.pk][1].startswith("Connection error"))
+        self.broken.refresh_from_db()
+        self.assertFalse(self.broken.last_check_success)
+        self.assertIsNotNone(self.broken.last_checked_at)
+
+    def test_pooled_connections_are_reused_between_checks(self):
+        for _ in range(3):
+            check_integrations([self.healthy, self.broken], deadline_seconds=5)
+        self.assertEqual(len(self.client_ports), 6)
+        self.assertEqual(len(set(self.client_ports)), 2)
+        metrics = integration_metrics()
+        self.assertEqual(metrics[self.healthy.pk]["requests"], 3)
+        self.assertEqual(metrics[self.healthy.pk]["connections_opened"], 1)
+        self.assertEqual(metrics[self.broken.pk]["errors"], 3)
+
+    def test_dropped_keep_alive_is_retried_only_for_idempotent_methods(self):
+        client = OutboundClient(f"http://127.0.0.1:{self.server.server_address[1]}")
+        self.addCleanup(client.close)
+        client.request("GET", "/drop", timeout=5)
+        self.assertEqual(client.request("GET", "/drop", timeout=5).status, 200)
+        self.assertEqual(client.stats()["connections_opened"], 2)
+        with self.assertRaises((http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)):
+            client.request("POST", "/drop", body=b"", timeout=5)
+        self.assertEqual(len(self.client_ports), 2)
+
+    def test_circuit_breaker_skips_failing_integration(self):
+        for _ in range(CIRCUIT_FAILURE_THRESHOLD):
+            success, note = check_integrations([self.offline], deadline_seconds=5)[self.offline.pk]
+            self.assertTrue(note.startswith("Connection error"))
+        success, note = check_integrations([self.offline], deadline_seconds=5)[self.offline.pk]
+        self.assertFalse(success)
+        self.assertTrue(note.startswith("Skipped: Circuit open"))
+        self.assertTrue(integration_metrics()[self.offline.pk]["circuit_open"])
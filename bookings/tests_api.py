@@ -1,18 +1,32 @@
+import asyncio
+import gzip
+import json
+import threading
 from datetime import datetime, timedelta
 from decimal import Decimal
 from unittest.mock import patch
 
 import pytz
 from django.contrib.auth.models import User
-from django.test import TestCase
+from django.core.cache import cache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.handlers.asgi import ASGIHandler
+from django.db import connection
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
+from rest_framework import generics
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
 
 from bookings.models import (
     Booking,
     CustomerOrder,
     Dish,
     LoginAttempt,
+    OrderAppliedPromotion,
     OrderItem,
     OrderItemReview,
     Promotion,
@@ -24,6 +38,14 @@ from bookings.models import (
     WeeklyMenuDaySettings,
     WeeklyMenuItem,
 )
+from bookings.api.authentication import token_for_user
+from bookings.api.lean import LeanListMixin
+from bookings.api.renderers import CompactJSONRenderer
+from bookings.api.serializers import DishSerializer, OrderListSerializer, ReservationListSerializer
+from bookings.api.throttling import SlotPollingThrottle
+from bookings.services.reservations import booking_detail_queryset, order_detail_queryset
+from bookings.services.security import get_cached_security_settings, get_client_ip, is_login_locked, record_failed_login
+from bookings.services.token_revocation import _LocalRevocations, is_token_revoked, prune_tokens
 
 
 MOSCOW_TZ = pytz.timezone("Europe/Moscow")
@@ -31,6 +53,7 @@ MOSCOW_TZ = pytz.timezone("Europe/Moscow")
 
 class ApiBaseTestCase(TestCase):
     def setUp(self):
+        cache.clear()
         self.client_api = APIClient()
         self.client_user = User.objects.create_user("client", email="client@example.com", password="pass12345")
         self.other_user = User.objects.create_user("other", password="pass12345")
@@ -207,6 +230,356 @@ class ReservationApiTests(ApiBaseTestCase):
         self.assertIn(40, response.data["available_slots"])
         self.assertIn(70, response.data["available_slots"])
 
+    def test_reservation_list_supports_keyset_pagination(self):
+        self.auth_as_client()
+        for offset in range(12):
+            booking = self.create_booking()[0]
+            shift = timedelta(days=offset // 2 + 1)
+            Booking.objects.filter(pk=booking.pk).update(start_time=booking.start_time - shift, end_time=booking.end_time - shift)
+        expected = list(Booking.objects.filter(user=self.client_user).order_by("-start_time", "-id").values_list("public_id", flat=True))
+
+        with CaptureQueriesContext(connection) as queries:
+            first = self.client_api.get("/api/v1/reservations/?pagination=cursor")
+        self.assertFalse([query for query in queries if "COUNT(" in query["sql"]])
+        self.assertNotIn("count", first.data)
+        self.assertIsNone(first.data["previous"])
+        second = self.client_api.get(first.data["next"])
+        self.assertIsNone(second.data["next"])
+        ids = [row["id"] for row in first.data["results"] + second.data["results"]]
+        self.assertEqual(ids, expected)
+        back = self.client_api.get(second.data["previous"])
+        self.assertEqual([row["id"] for row in back.data["results"]], expected[:10])
+
+        self.assertEqual(self.client_api.get("/api/v1/reservations/").data["count"], 12)
+        self.assertEqual(self.client_api.get("/api/v1/orders/?cursor=broken").status_code, 404)
+
+    def test_list_endpoints_match_model_serializers_with_constant_queries(self):
+        self.auth_as_client()
+        for hour in (12, 14):
+            self.create_booking(hour=hour)
+        start, end = self._booking_datetimes(hour=16)
+        Booking.objects.create(user=self.client_user, table=self.table4, guests_count=3, start_time=start, end_time=end)
+        CustomerOrder.objects.create(
+            user=self.client_user,
+            order_type=CustomerOrder.TYPE_TAKEOUT,
+            scheduled_for=start,
+            subtotal_amount=Decimal("0.00"),
+            total_amount=Decimal("0.00"),
+        )
+        Dish.objects.filter(pk=self.dish2.pk).update(image="dishes/cutlet.jpg", description=None)
+        request = RequestFactory().get("/api/v1/dishes/")
+        bookings = booking_detail_queryset().filter(user=self.client_user).order_by("-start_time")
+        orders = order_detail_queryset().filter(user=self.client_user).order_by("-scheduled_for")
+        expected = {
+            "/api/v1/reservations/": ReservationListSerializer(bookings, many=True).data,
+            "/api/v1/orders/": OrderListSerializer(orders, many=True).data,
+            "/api/v1/dishes/": DishSerializer(Dish.objects.order_by("name"), many=True, context={"request": request}).data,
+        }
+        query_counts = {}
+        for path, rows in expected.items():
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client_api.get(path)
+            self.assertEqual(response.json()["results"], [dict(row) for row in rows], path)
+            query_counts[path] = len(queries)
+
+        for hour in (9, 10, 11, 13, 15):
+            self.create_booking(hour=hour, table=self.table4)
+        for path in ("/api/v1/reservations/", "/api/v1/orders/"):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(len(self.client_api.get(path).data["results"]), 8)
+            self.assertEqual(len(queries), query_counts[path], path)
+
+    def test_reservation_and_order_endpoints_do_not_query_per_line(self):
+        self.auth_as_client()
+        booking, order, _ = self.create_booking()
+        paths = [
+            f"/api/v1/reservations/{booking.public_id}/",
+            f"/api/v1/orders/{order.public_id}/",
+            "/api/v1/reservations/",
+            "/api/v1/orders/",
+        ]
+
+        def query_counts():
+            counts = []
+            for path in paths:
+                with CaptureQueriesContext(connection) as queries:
+                    self.assertEqual(self.client_api.get(path).status_code, 200, path)
+                counts.append(len(queries))
+            return counts
+
+        promotions = [
+            Promotion.objects.create(
+                name=f"{dish.name} promo",
+                kind=Promotion.KIND_SINGLE,
+                discount_type=Promotion.DISCOUNT_PERCENT,
+                discount_value=Decimal("10.00"),
+                valid_from=timezone.now() - timedelta(days=1),
+                valid_to=timezone.now() + timedelta(days=1),
+                is_active=True,
+                target_dish=dish,
+            )
+            for dish in (self.dish1, self.dish2)
+        ]
+        OrderAppliedPromotion.objects.create(order=order, promotion=promotions[0], promotion_name_snapshot=promotions[0].name)
+        query_counts()
+        baseline = query_counts()
+        OrderItem.objects.create(
+            order=order,
+            dish=self.dish2,
+            dish_name_snapshot=self.dish2.name,
+            unit_price_snapshot=self.dish2.price,
+            quantity=2,
+            line_total_snapshot=self.dish2.price * 2,
+        )
+        OrderAppliedPromotion.objects.create(order=order, promotion=promotions[1], promotion_name_snapshot=promotions[1].name)
+        self.create_booking(hour=14)
+        self.assertEqual(query_counts(), baseline)
+        detail = self.client_api.get(paths[0]).data
+        self.assertEqual(len(detail["dishes"]), 2)
+        self.assertEqual([row["name"] for row in detail["applied_promotions"]], ["Cutlet promo", "Soup promo"])
+
+    @patch("bookings.services.content_versions.CONTENT_VERSIONS_ENABLED", True)
+    @patch("bookings.services.content_versions.CONTENT_ETAG_BUCKET_SECONDS", 10**9)
+    def test_catalog_endpoints_answer_conditional_get_with_304(self):
+        self.auth_as_client()
+        paths = [
+            f"/api/v1/menu/?date={self.booking_date.isoformat()}",
+            "/api/v1/dishes/",
+            "/api/v1/promotions/",
+            "/api/v1/news/",
+        ]
+        for path in paths:
+            response = self.client_api.get(path)
+            self.assertEqual(response.status_code, 200, path)
+            with CaptureQueriesContext(connection) as queries:
+                cached = self.client_api.get(path, HTTP_IF_NONE_MATCH=response["ETag"])
+            self.assertEqual(cached.status_code, 304, path)
+            self.assertLessEqual(len(queries), 1, path)
+
+        menu = self.client_api.get(paths[0])
+        self.dish1.price = Decimal("130.00")
+        self.dish1.save()
+        self.assertEqual(self.client_api.get(paths[0], HTTP_IF_NONE_MATCH=menu["ETag"]).status_code, 200)
+        news = self.client_api.get(paths[3])
+        self.create_booking()
+        self.assertEqual(self.client_api.get(paths[3], HTTP_IF_NONE_MATCH=news["ETag"]).status_code, 304)
+
+    def test_catalog_responses_are_not_cached_with_a_process_local_cache(self):
+        self.auth_as_client()
+        first = self.client_api.get("/api/v1/dishes/")
+        self.assertNotIn("ETag", first)
+        Dish.objects.filter(pk=self.dish1.pk).update(name="Renamed elsewhere")
+        self.assertIn("Renamed elsewhere", [dish["name"] for dish in self.client_api.get("/api/v1/dishes/").data["results"]])
+
+    @patch("bookings.services.content_versions.CONTENT_VERSIONS_ENABLED", True)
+    @patch("bookings.services.response_cache.CONTENT_ETAG_BUCKET_SECONDS", 10**9)
+    def test_menu_and_dish_responses_are_cached_with_live_stock(self):
+        self.auth_as_client()
+        menu_path = f"/api/v1/menu/?date={self.booking_date.isoformat()}"
+        first = self.client_api.get(menu_path)
+        self.assertEqual(first.data["dishes"][0]["available_quantity"], 20)
+        self.client_api.get("/api/v1/dishes/")
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client_api.get(menu_path).data, first.data)
+            self.client_api.get("/api/v1/dishes/")
+
+        self.create_booking()
+        menu = self.client_api.get(menu_path).data
+        self.assertEqual({dish["id"]: dish["available_quantity"] for dish in menu["dishes"]}, {self.dish1.pk: 19, self.dish2.pk: 20})
+        dishes = self.client_api.get("/api/v1/dishes/").data["results"]
+        self.assertEqual({dish["id"]: dish["available_quantity"] for dish in dishes}, {self.dish1.pk: 19, self.dish2.pk: 20})
+
+        self.dish2.name = "Steak"
+        self.dish2.save()
+        self.assertIn("Steak", [dish["name"] for dish in self.client_api.get(menu_path).data["dishes"]])
+
+        promotion = Promotion.objects.create(
+            name="Steak promo",
+            kind=Promotion.KIND_SINGLE,
+            discount_type=Promotion.DISCOUNT_PERCENT,
+            discount_value=Decimal("10.00"),
+            valid_from=timezone.now() - timedelta(days=1),
+            valid_to=timezone.now() + timedelta(days=1),
+            is_active=True,
+            target_dish=self.dish2,
+        )
+        self.assertEqual([row["id"] for row in self.client_api.get("/api/v1/promotions/").data["results"]], [promotion.pk])
+        Dish.objects.filter(pk=self.dish2.pk).update(available_quantity=1)
+        OrderItem.objects.create(
+            order=self.create_booking(hour=14, table=self.table4)[1],
+            dish=self.dish2,
+            dish_name_snapshot=self.dish2.name,
+            unit_price_snapshot=self.dish2.price,
+            quantity=1,
+            line_total_snapshot=self.dish2.price,
+        )
+        self.assertEqual(self.client_api.get("/api/v1/promotions/").data["results"], [])
+
+    def test_sparse_fieldsets_prune_fields_and_queries(self):
+        self.auth_as_client()
+        booking, order, _ = self.create_booking()
+        full = self.client_api.get("/api/v1/orders/").data["results"][0]
+        with CaptureQueriesContext(connection) as queries:
+            slim = self.client_api.get("/api/v1/orders/?fields=id,start_time,order_total").data["results"]
+        self.assertEqual(slim, [{key: full[key] for key in ("id", "start_time", "order_total")}])
+        self.assertFalse([query for query in queries if "bookings_orderitem" in query["sql"]])
+        with CaptureQueriesContext(connection) as queries:
+            slim = self.client_api.get("/api/v1/orders/?fields=id,order_total").data["results"]
+        self.assertEqual(list(slim[0]), ["id", "order_total"])
+        self.assertFalse([query for query in queries if "bookings_booking" in query["sql"]])
+        reservations = self.client_api.get("/api/v1/reservations/?include=").data["results"]
+        self.assertNotIn("dishes", reservations[0])
+        self.assertEqual(reservations[0]["order_total"], "120.00")
+
+        with CaptureQueriesContext(connection) as queries:
+            detail = self.client_api.get(f"/api/v1/reservations/{booking.public_id}/?include=dishes").data
+        self.assertNotIn("applied_promotions", detail)
+        self.assertEqual(len(detail["dishes"]), 1)
+        self.assertFalse([query for query in queries if "bookings_orderappliedpromotion" in query["sql"]])
+        with CaptureQueriesContext(connection) as queries:
+            detail = self.client_api.get(f"/api/v1/orders/{order.public_id}/?fields=id,order_total").data
+        self.assertEqual(detail, {"id": order.public_id, "order_total": "120.00"})
+        self.assertFalse([query for query in queries if "bookings_orderitem" in query["sql"]])
+
+        self.assertEqual(self.client_api.get("/api/v1/orders/?fields=id,secret").status_code, 400)
+        self.assertEqual(self.client_api.get("/api/v1/orders/?include=table_id").status_code, 400)
+
+    def test_lean_list_view_without_row_builder_is_rejected_at_definition(self):
+        with self.assertRaises(ImproperlyConfigured):
+            type("BrokenListView", (LeanListMixin, generics.ListAPIView), {})
+
+    @patch("bookings.services.export.EXPORT_SAFETY_LAG_SECONDS", 0)
+    def test_export_streams_changes_since_cursor_as_ndjson(self):
+        def export(path):
+            response = self.client_api.get(path)
+            self.assertEqual(response["Content-Type"], "application/x-ndjson")
+            return [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+        first, _, _ = self.create_booking()
+        second, _, _ = self.create_booking(hour=14)
+        self.auth_as_client()
+        self.assertEqual(self.client_api.get("/api/v1/export/bookings/").status_code, 403)
+        self.client_api.force_authenticate(user=self.operator_user)
+
+        rows = export("/api/v1/export/bookings/")
+        self.assertEqual([row["data"]["id"] for row in rows], [first.pk, second.pk])
+        self.assertEqual(rows[0]["type"], "bookings")
+        self.assertEqual(rows[0]["data"]["table_id"], self.table2.pk)
+        self.assertEqual(export(f"/api/v1/export/bookings/?since={rows[-1]['cursor']}"), [])
+
+        first.guests_count = 1
+        first.save()
+        changed = export(f"/api/v1/export/bookings/?since={rows[-1]['cursor']}")
+        self.assertEqual([(row["data"]["id"], row["data"]["guests_count"]) for row in changed], [(first.pk, 1)])
+        for kind in ("orders", "order-items", "reviews"):
+            self.assertEqual(len(export(f"/api/v1/export/{kind}/")), 0 if kind == "reviews" else 2, kind)
+        self.assertEqual(self.client_api.get("/api/v1/export/bookings/?since=broken").status_code, 400)
+        self.assertEqual(self.client_api.get("/api/v1/export/tables/").status_code, 404)
+
+    def test_export_holds_back_rows_saved_within_the_safety_lag(self):
+        settled, _, _ = self.create_booking()
+        recent, _, _ = self.create_booking(hour=14)
+        Booking.objects.filter(pk=settled.pk).update(updated_at=timezone.now() - timedelta(minutes=5))
+        self.client_api.force_authenticate(user=self.operator_user)
+        response = self.client_api.get("/api/v1/export/bookings/")
+        rows = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row["data"]["id"] for row in rows], [settled.pk])
+
+        Booking.objects.filter(pk=recent.pk).update(updated_at=timezone.now() - timedelta(minutes=4))
+        response = self.client_api.get(f"/api/v1/export/bookings/?since={rows[-1]['cursor']}")
+        later = [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+        self.assertEqual([row["data"]["id"] for row in later], [recent.pk])
+
+    @patch("bookings.services.export.EXPORT_SAFETY_LAG_SECONDS", 0)
+    def test_export_streams_deletions_as_tombstones_under_the_same_cursor(self):
+        def export(since=""):
+            response = self.client_api.get(f"/api/v1/export/bookings/?since={since}")
+            return [json.loads(line) for line in b"".join(response.streaming_content).decode().splitlines()]
+
+        kept, _, _ = self.create_booking()
+        removed, _, _ = self.create_booking(hour=14)
+        self.client_api.force_authenticate(user=self.operator_user)
+        cursor = export()[-1]["cursor"]
+        removed_pk = removed.pk
+        removed.delete()
+        kept.guests_count = 1
+        kept.save()
+
+        rows = export(cursor)
+        self.assertEqual([(row["data"]["id"], row.get("deleted", False)) for row in rows], [(removed_pk, True), (kept.pk, False)])
+        self.assertEqual(rows[0]["data"], {"id": removed_pk})
+        self.assertEqual(export(rows[0]["cursor"]), rows[1:])
+        self.assertEqual(export(rows[-1]["cursor"]), [])
+        self.assertEqual(len(export()), 2)
+
+    @patch("bookings.services.content_versions.CONTENT_VERSIONS_ENABLED", True)
+    @patch("bookings.services.content_versions.CONTENT_ETAG_BUCKET_SECONDS", 10**9)
+    def test_large_responses_are_gzipped_and_keep_etags(self):
+        self.auth_as_client()
+        for index in range(30):
+            Dish.objects.create(name=f"Dish {index:02d}", description="Slow-cooked " * 20, price=Decimal("99.90"), available_quantity=5)
+        plain = self.client_api.get("/api/v1/dishes/?page=2")
+        self.assertNotIn("Content-Encoding", plain)
+        compressed = self.client_api.get("/api/v1/dishes/?page=2", HTTP_ACCEPT_ENCODING="gzip, deflate")
+        self.assertEqual(compressed["Content-Encoding"], "gzip")
+        self.assertIn("Accept-Encoding", compressed["Vary"])
+        self.assertEqual(gzip.decompress(compressed.content), plain.content)
+        self.assertLess(len(compressed.content), len(plain.content) // 4)
+        self.assertTrue(compressed["ETag"].startswith("W/"))
+        cached = self.client_api.get("/api/v1/dishes/?page=2", HTTP_ACCEPT_ENCODING="gzip", HTTP_IF_NONE_MATCH=compressed["ETag"])
+        self.assertEqual(cached.status_code, 304)
+        small = self.client_api.get("/api/v1/auth/me/", HTTP_ACCEPT_ENCODING="gzip")
+        self.assertNotIn("Content-Encoding", small)
+
+    def test_compact_renderer_matches_json_renderer(self):
+        data = {
+            "id": 1,
+            "name": "Борщ\u2028",
+            "price": Decimal("12.50"),
+            "at": timezone.now(),
+            "day": timezone.localdate(),
+            "stock": {3: 1},
+            "items": [{"ok": True, "none": None, "ratio": 0.5}],
+        }
+        self.assertEqual(CompactJSONRenderer().render(data), JSONRenderer().render(data))
+        for value in (1e20, 2.5e-7, -1e16, 1e-5, 0.0001, [{"note": "1e5", "x": 1.5}]):
+            self.assertEqual(CompactJSONRenderer().render({"value": [value]}), JSONRenderer().render({"value": [value]}))
+        self.assertEqual(CompactJSONRenderer().render({"items": [{"ratio": float("nan")}]}), b'{"items":[{"ratio":null}]}')
+
+    @patch("bookings.services.rate_limit.SLOT_POLL_BURST", 2)
+    @patch("bookings.services.rate_limit.SLOT_POLL_RATE_PER_SECOND", 0.01)
+    def test_dashboard_slot_polling_is_limited_per_address_despite_forwarded_for(self):
+        path = f"/dashboard/api/available-slots/?date={self.booking_date.isoformat()}&guests_count=2"
+        statuses = [
+            self.client.get(path, REMOTE_ADDR="203.0.113.5", HTTP_X_FORWARDED_FOR=f"198.51.100.{index}").status_code
+            for index in range(3)
+        ]
+        self.assertEqual(statuses, [200, 200, 429])
+        limited = self.client.get(path, REMOTE_ADDR="203.0.113.5")
+        self.assertEqual(limited.status_code, 429)
+        self.assertGreater(int(limited["Retry-After"]), 0)
+        self.assertEqual(self.client.get(path, REMOTE_ADDR="203.0.113.6").status_code, 200)
+
+    @patch.object(SlotPollingThrottle, "burst", 2)
+    @patch.object(SlotPollingThrottle, "rate", 0.01)
+    def test_slot_polling_is_rate_limited_per_user_with_metrics(self):
+        self.auth_as_client()
+        path = f"/api/v1/availability/available-slots/?date={self.booking_date.isoformat()}&guests_count=2"
+        self.assertEqual([self.client_api.get(path).status_code for _ in range(2)], [200, 200])
+        limited = self.client_api.get(path)
+        self.assertEqual(limited.status_code, 429)
+        self.assertGreater(int(limited["Retry-After"]), 0)
+        self.client_api.force_authenticate(user=self.other_user)
+        self.assertEqual(self.client_api.get(path).status_code, 200)
+
+        admin = User.objects.create_superuser("metricsadmin", password="pass12345")
+        self.client.force_login(admin)
+        metrics = self.client.get("/dashboard/admin/metrics/").json()
+        self.assertGreaterEqual(metrics["rate_limits"]["slot-polling"]["limited"], 1)
+        self.assertGreaterEqual(metrics["coalescing"]["available-slots"]["executed"], 3)
+        self.client.force_login(self.client_user)
+        self.assertEqual(self.client.get("/dashboard/admin/metrics/").status_code, 302)
+
     def test_login_attempts_lock_api_auth(self):
         for _ in range(5):
             response = self.client_api.post("/api/v1/auth/login/", {"username": "client", "password": "wrong"}, format="json")
@@ -216,6 +589,99 @@ class ReservationApiTests(ApiBaseTestCase):
         locked = self.client_api.post("/api/v1/auth/login/", {"username": "client", "password": "wrong"}, format="json")
         self.assertEqual(locked.status_code, 400)
 
+    def test_access_token_claims_authenticate_without_queries(self):
+        login = self.client_api.post("/api/v1/auth/login/", {"username": "client", "password": "pass12345"}, format="json")
+        self.client_api.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+        self.assertEqual(self.client_api.get("/api/v1/auth/me/").status_code, 200)
+        with self.assertNumQueries(0):
+            response = self.client_api.get("/api/v1/auth/me/")
+        self.assertEqual(response.data, {"id": self.client_user.pk, "username": "client", "email": "client@example.com", "role": "client"})
+
+        self.client_user.profile.role = UserProfile.ROLE_OPERATOR
+        self.client_user.profile.save()
+        self.assertEqual(self.client_api.get("/api/v1/auth/me/").status_code, 401)
+
+    def test_rotated_refresh_tokens_are_revoked_and_pruned(self):
+        login = self.client_api.post("/api/v1/auth/login/", {"username": "client", "password": "pass12345"}, format="json")
+        rotated = self.client_api.post("/api/v1/auth/refresh/", {"refresh": login.data["refresh"]}, format="json")
+        self.assertEqual(rotated.status_code, 200)
+        reused = self.client_api.post("/api/v1/auth/refresh/", {"refresh": login.data["refresh"]}, format="json")
+        self.assertEqual(reused.status_code, 401)
+        self.assertTrue(is_token_revoked(OutstandingToken.objects.get().jti))
+        with patch("bookings.services.token_revocation.TOKEN_REVOCATION_FILTER_ENABLED", True):
+            self.assertTrue(is_token_revoked(OutstandingToken.objects.get().jti))
+            with self.assertNumQueries(0):
+                self.assertFalse(is_token_revoked("never-issued"))
+
+        OutstandingToken.objects.update(expires_at=timezone.now() - timedelta(minutes=1))
+        self.assertEqual(prune_tokens(batch_size=1), 1)
+        self.assertFalse(BlacklistedToken.objects.exists())
+        self.assertFalse(is_token_revoked("never-issued"))
+
+    def test_revocation_in_another_worker_is_seen_without_a_shared_cache(self):
+        login = self.client_api.post("/api/v1/auth/login/", {"username": "client", "password": "pass12345"}, format="json")
+        jti = OutstandingToken.objects.get().jti
+        # A second worker: its own filter and its own process-local cache, warmed before the logout.
+        other_worker = _LocalRevocations()
+        other_cache = LocMemCache("other-worker", {})
+        with patch("bookings.services.token_revocation._local", other_worker), patch(
+            "bookings.services.token_revocation.cache", other_cache
+        ):
+            self.assertFalse(is_token_revoked(jti))
+        self.client_api.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+        self.client_api.post("/api/v1/auth/logout/", {"refresh": login.data["refresh"]}, format="json")
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=jti).exists())
+        with patch("bookings.services.token_revocation._local", other_worker), patch(
+            "bookings.services.token_revocation.cache", other_cache
+        ):
+            self.assertTrue(is_token_revoked(jti))
+
+    @patch("bookings.services.security.LOGIN_STATE_CACHE_ENABLED", True)
+    def test_failed_login_burst_persists_only_lockout(self):
+        request = RequestFactory().post("/api/v1/auth/login/", REMOTE_ADDR="10.0.0.7")
+        get_cached_security_settings()
+        with self.assertNumQueries(0):
+            for _ in range(4):
+                self.assertIsNone(record_failed_login("client", request))
+        self.assertFalse(LoginAttempt.objects.filter(username="client").exists())
+        locked_until = record_failed_login("client", request)
+        self.assertIsNotNone(locked_until)
+        with self.assertNumQueries(0):
+            for _ in range(200):
+                record_failed_login("client", request)
+            self.assertEqual(is_login_locked("client"), (True, locked_until))
+        attempt = LoginAttempt.objects.get(username="client")
+        self.assertEqual(attempt.failed_attempts, 5)
+        self.assertEqual(attempt.last_ip, "10.0.0.7")
+
+        # Past the per-address threshold the address itself is throttled; the accounts it guessed at are not locked.
+        self.assertTrue(is_login_locked("other", request)[0])
+        self.assertEqual(is_login_locked("other"), (False, None))
+        credentials = {"username": "other", "password": "pass12345"}
+        login = self.client_api.post("/api/v1/auth/login/", credentials, format="json", REMOTE_ADDR="10.0.0.7")
+        self.assertEqual(login.status_code, 400)
+        login = self.client_api.post("/api/v1/auth/login/", credentials, format="json", REMOTE_ADDR="10.0.0.8")
+        self.assertEqual(login.status_code, 200)
+        self.assertIsNone(record_failed_login("operator", request))
+        self.assertFalse(is_login_locked("operator")[0])
+
+    def test_login_state_is_read_from_database_without_shared_cache(self):
+        for _ in range(get_cached_security_settings().max_failed_login_attempts):
+            record_failed_login("client")
+        self.assertTrue(is_login_locked("client")[0])
+        # An unlock done by another worker is only visible in the database.
+        LoginAttempt.objects.filter(username="client").update(failed_attempts=0, locked_until=None)
+        self.assertEqual(is_login_locked("client"), (False, None))
+
+    def test_forwarded_for_is_only_trusted_from_configured_proxies(self):
+        factory = RequestFactory()
+        spoofed = factory.get("/", REMOTE_ADDR="203.0.113.9", HTTP_X_FORWARDED_FOR="198.51.100.1")
+        self.assertEqual(get_client_ip(spoofed), "203.0.113.9")
+        proxied = factory.get("/", REMOTE_ADDR="10.0.0.1", HTTP_X_FORWARDED_FOR="198.51.100.1, 203.0.113.9, 10.0.0.2")
+        with patch("bookings.services.security.TRUSTED_PROXY_IPS", frozenset({"10.0.0.1", "10.0.0.2"})):
+            self.assertEqual(get_client_ip(proxied), "203.0.113.9")
+            self.assertEqual(get_client_ip(spoofed), "203.0.113.9")
+
 
 class ReviewApiTests(ApiBaseTestCase):
     def test_review_can_be_left_only_once_for_order_item(self):
@@ -243,3 +709,42 @@ class ReviewApiTests(ApiBaseTestCase):
         self.assertEqual(response.status_code, 201)
         self.assertEqual(duplicate.status_code, 400)
         self.assertTrue(OrderItemReview.objects.filter(order_item=line).exists())
+
+
+class AsgiReadEndpointTests(TransactionTestCase):
+    def test_middleware_chain_runs_natively_under_asgi(self):
+        # Any sync-only middleware would be adapted and hold a thread for the whole async view.
+        with self.assertNoLogs("django.request", "DEBUG"):
+            ASGIHandler()
+
+    def test_read_endpoints_serve_concurrent_asgi_requests_from_the_pool(self):
+        cache.clear()
+        user = User.objects.create_user("asyncclient", password="pass12345")
+        UserProfile.objects.create(user=user, role="client")
+        table = Table.objects.create(table_number="A1", seats=2)
+        dish = Dish.objects.create(name="Soup", price=Decimal("120.00"), available_quantity=20)
+        target_date = timezone.localdate() + timedelta(days=1)
+        while target_date.weekday() >= 5:
+            target_date += timedelta(days=1)
+        day_settings = WeeklyMenuDaySettings.objects.create(day_of_week=target_date.weekday(), is_active=True)
+        WeeklyMenuItem.objects.create(day_settings=day_settings, dish=dish, order=1)
+        token = str(token_for_user(user).access_token)
+        paths = [
+            f"/api/v1/menu/?date={target_date.isoformat()}",
+            "/api/v1/dishes/",
+            f"/api/v1/availability/occupied-slots/?table_id={table.pk}&date={target_date.isoformat()}",
+            f"/api/v1/availability/available-slots/?date={target_date.isoformat()}&guests_count=2",
+        ]
+
+        async def fetch_all():
+            client = AsyncClient()
+            return await asyncio.gather(*(client.get(path, AUTHORIZATION=f"Bearer {token}") for path in paths * 3))
+
+        responses = asyncio.run(fetch_all())
+        self.assertEqual([response.status_code for response in responses], [200] * len(paths) * 3)
+        self.assertTrue(any(thread.name.startswith("api-read") for thread in threading.enumerate()))
+
+        wsgi_client = APIClient()
+        wsgi_client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+        for path, response in zip(paths, responses):
+            self.assertEqual(json.loads(response.content), json.loads(wsgi_client.get(path).content), path)
@@ -9,6 +9,7 @@ urlpatterns = [
     path('admin/integrations/<int:pk>/delete/', views_booking.admin_integration_delete, name='admin_integration_delete'),
     path('admin/integrations/<int:pk>/test/', views_booking.admin_integration_test, name='admin_integration_test'),
     path('admin/security/', views_booking.admin_security, name='admin_security'),
+    path('admin/metrics/', views_booking.admin_metrics, name='admin_metrics'),
     path('admin/backups/', views_booking.admin_backups, name='admin_backups'),
     path('admin/backups/<int:pk>/download/', views_booking.admin_backup_download, name='admin_backup_download'),
     path('admin/backups/<int:pk>/restore/', views_booking.admin_backup_restore, name='admin_backup_restore'),
@@ -39,6 +39,8 @@ from .services.reservations import (
     is_order_completed_for_review,
     order_detail_queryset,
 )
+from .services.backup import record_backup_changes
+from .services.money import from_cents, to_cents
 from .services.promotions import (
     get_orderable_promotions,
     parse_dish_quantities_from_post,
@@ -70,7 +72,7 @@ def client_home_promotion_context():
         single_promos_by_dish.setdefault(d.pk, []).append(
             {
                 'promo': p,
-                'original_price': Decimal(d.price).quantize(Decimal('0.01')),
+                'original_price': from_cents(to_cents(d.price)),
                 'price_new': unit_price_after_single_promo(d, p),
             }
         )
@@ -1036,7 +1038,9 @@ def operator_complaint_list(request):
         cid = request.POST.get('complaint_id')
         new_status = request.POST.get('status')
         if cid and new_status in dict(VenueComplaint.STATUS_CHOICES):
-            VenueComplaint.objects.filter(pk=cid).update(status=new_status)
+            complaints = VenueComplaint.objects.filter(pk=cid)
+            record_backup_changes(complaints)
+            complaints.update(status=new_status)
             messages.success(request, 'Статус обновлён.')
         return redirect('operator_complaint_list')
     complaints = VenueComplaint.objects.select_related('user').order_by('-created_at')
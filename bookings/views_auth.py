@@ -13,10 +13,10 @@ class CustomLoginView(LoginView):
 
     def post(self, request, *args, **kwargs):
         username = request.POST.get("username", "").strip()
-        is_locked, attempt = is_login_locked(username)
-        if is_locked and attempt is not None:
+        is_locked, locked_until = is_login_locked(username, request)
+        if is_locked:
             form = self.get_form()
-            seconds_left = max(0, int((attempt.locked_until - timezone.now()).total_seconds()))
+            seconds_left = max(0, int((locked_until - timezone.now()).total_seconds()))
             minutes_left = max(1, seconds_left // 60 or 1)
             form.add_error(None, f"Вход временно заблокирован. Повторите попытку примерно через {minutes_left} мин.")
             self._skip_failed_login_record = True
@@ -1,13 +1,15 @@
-﻿from datetime import timedelta
+﻿from datetime import datetime, timedelta
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
 from django.core.paginator import Paginator
 from django.core.validators import validate_email
 from django.db import models
-from django.db.models import Avg, Count, Sum
+from django.db.models import Avg, Count
 from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
@@ -28,20 +30,24 @@ from .models import (
     VenueComplaint,
 )
 from .services.availability import (
-    available_slots_for_date,
     build_time_slots,
+    coalesced_available_slots,
+    coalesced_occupied_slots,
+    day_range_for_date,
     get_bookable_dates,
     get_date_label,
     get_duration_values,
     get_slot_settings,
-    occupied_slots_for_table_date,
     parse_booking_date,
 )
-from .services.backup import create_backup_archive, restore_backup_archive
-from .services.integrations import check_external_integration
+from .services.backup import create_backup_archive, record_backup_changes, restore_backup_archive
+from .services.integrations import check_external_integration, integration_metrics
 from .services.menu import get_menu_dishes_for_date
+from .services.pagination import keyset_page
 from .services.promotions import parse_dish_quantities_from_post, parse_promotion_ids_from_post, parse_promotion_quantities_from_post
-from .services.reports import admin_report_rows, csv_response, operator_report_rows, parse_report_period
+from .services.rate_limit import rate_limit, rate_limit_metrics
+from .services.reports import admin_report_rows, csv_response, operator_report_rows, parse_report_period, period_filter
+from .services.rollups import booking_totals, dish_sales_rows, ensure_rollups, feedback_totals
 from .services.reservations import (
     booking_detail_queryset,
     cancel_reservation_for_client,
@@ -54,8 +60,11 @@ from .services.reservations import (
     order_detail_queryset,
 )
 from .services.security import get_security_settings, unlock_login_attempt
+from .services.singleflight import flight_metrics
 from .views import LOW_STOCK_THRESHOLD, _ordered_dishes_for_ids, client_home_promotion_context, is_admin_app, is_client, is_operator_app
 
+OPERATOR_DASHBOARD_CACHE_SECONDS = getattr(settings, "OPERATOR_DASHBOARD_CACHE_SECONDS", 60)
+
 
 def _with_legacy_pk(objects):
     adapted = []
@@ -66,8 +75,9 @@ def _with_legacy_pk(objects):
 
 
 def _ensure_profiles():
-    for user in User.objects.all():
-        UserProfile.objects.get_or_create(user=user, defaults={"role": UserProfile.ROLE_CLIENT})
+    # One query when every user already has a profile; only users without one are touched.
+    for user_id in User.objects.filter(profile__isnull=True).values_list("pk", flat=True):
+        UserProfile.objects.get_or_create(user_id=user_id, defaults={"role": UserProfile.ROLE_CLIENT})
 
 
 def _available_dates(now):
@@ -111,8 +121,17 @@ def _reservation_payload_from_post(request, *, is_takeout):
     return payload
 
 
-def _role_summary():
-    return list(UserProfile.objects.values("role").annotate(n=Count("id")).order_by("role"))
+def _parse_filter_date(value):
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).date()
+    except ValueError:
+        return None
+
+
+def _role_summary(role_counts):
+    return [{"role": role, "n": count} for role, count in sorted(role_counts.items()) if count]
 
 
 def _active_admin_users():
@@ -152,38 +171,50 @@ def _client_form_context(*, now, reservations=None):
 
 
 def _operator_dashboard_context():
+    cache_key = f"operator-dashboard:{timezone.localdate().isoformat()}"
+    context = cache.get(cache_key)
+    if context is None:
+        context = _build_operator_dashboard_context()
+        cache.set(cache_key, context, OPERATOR_DASHBOARD_CACHE_SECONDS)
+    return context
+
+
+def _build_operator_dashboard_context():
     now = timezone.now()
-    date_from = timezone.localdate() - timedelta(days=30)
-    bookings_period = Booking.objects.filter(start_time__date__gte=date_from, start_time__date__lte=timezone.localdate())
-    complaints_period = VenueComplaint.objects.filter(created_at__date__gte=date_from, created_at__date__lte=timezone.localdate())
-    reviews_period = OrderItemReview.objects.filter(created_at__date__gte=date_from, created_at__date__lte=timezone.localdate())
-    sales_period = (
-        order_detail_queryset()
-        .filter(scheduled_for__date__gte=date_from, scheduled_for__date__lte=timezone.localdate())
-        .values("items__dish_name_snapshot")
-        .annotate(
-            total_quantity=Sum("items__quantity"),
-            total_revenue=Sum("items__line_total_snapshot"),
-        )
-        .exclude(items__dish_name_snapshot__isnull=True)
+    today = timezone.localdate()
+    date_from = today - timedelta(days=30)
+    today_start, today_end = day_range_for_date(today)
+    ensure_rollups(date_from, today)
+    sales_period = dish_sales_rows(date_from, today, ensure=False)
+    bookings_totals = booking_totals(date_from, today, ensure=False)
+    feedback = feedback_totals(date_from, today, ensure=False)
+    bookings = Booking.objects.aggregate(
+        today=Count("id", filter=models.Q(start_time__gte=today_start, start_time__lt=today_end)),
+        active=Count(
+            "id",
+            filter=models.Q(start_time__lte=now, end_time__gte=now) & ~models.Q(status=Booking.STATUS_CANCELLED),
+        ),
+    )
+    complaints = VenueComplaint.objects.filter(**period_filter("created_at", date_from, today)).aggregate(
+        new=Count("id", filter=models.Q(status="new")),
+        seen=Count("id", filter=models.Q(status="seen")),
+        closed=Count("id", filter=models.Q(status="closed")),
     )
-    top_dishes = list(sales_period.order_by("-total_quantity", "items__dish_name_snapshot")[:5])
-    low_dishes = list(sales_period.order_by("total_quantity", "items__dish_name_snapshot")[:5])
     return {
-        "reservations_today": Booking.objects.filter(start_time__date=timezone.localdate()).count(),
-        "reservations_active": Booking.objects.exclude(status=Booking.STATUS_CANCELLED).filter(start_time__lte=now, end_time__gte=now).count(),
-        "reservations_completed_period": bookings_period.filter(status=Booking.STATUS_COMPLETED).count(),
-        "reservations_cancelled_period": bookings_period.filter(status=Booking.STATUS_CANCELLED).count(),
-        "complaints_new": complaints_period.filter(status="new").count(),
-        "complaints_seen": complaints_period.filter(status="seen").count(),
-        "complaints_closed": complaints_period.filter(status="closed").count(),
-        "reviews_total": reviews_period.count(),
-        "reviews_avg": reviews_period.aggregate(avg=Avg("rating"))["avg"],
-        "reviews_new_period": reviews_period.count(),
-        "sales_total_revenue": sum((row["total_revenue"] or 0) for row in sales_period),
-        "top_dishes": top_dishes,
-        "low_dishes": low_dishes,
-        "low_stock_dishes": Dish.objects.filter(available_quantity__lt=LOW_STOCK_THRESHOLD).order_by("available_quantity", "name")[:8],
+        "reservations_today": bookings["today"],
+        "reservations_active": bookings["active"],
+        "reservations_completed_period": bookings_totals["completed_count"],
+        "reservations_cancelled_period": bookings_totals["cancelled_count"],
+        "complaints_new": complaints["new"],
+        "complaints_seen": complaints["seen"],
+        "complaints_closed": complaints["closed"],
+        "reviews_total": feedback["reviews_count"],
+        "reviews_avg": feedback["rating_avg"],
+        "reviews_new_period": feedback["reviews_count"],
+        "sales_total_revenue": sum(row["total_revenue"] for row in sales_period),
+        "top_dishes": sales_period[:5],
+        "low_dishes": sorted(sales_period, key=lambda row: (row["total_quantity"], row["dish_name_snapshot"]))[:5],
+        "low_stock_dishes": list(Dish.objects.filter(available_quantity__lt=LOW_STOCK_THRESHOLD).order_by("available_quantity", "name")[:8]),
     }
 
 
@@ -442,25 +473,36 @@ def admin_cabinet(request):
         return redirect("admin_cabinet")
 
     now = timezone.now()
-    today_date = timezone.localtime(now).date()
+    today_start, today_end = day_range_for_date(timezone.localtime(now).date())
     week_ago = now - timedelta(days=7)
     users = User.objects.select_related("profile").order_by("username")
-    integrations_total = ExternalIntegration.objects.count()
-    backups_total = BackupArchive.objects.count()
+    bookings = Booking.objects.aggregate(
+        today=Count("id", filter=models.Q(start_time__gte=today_start, start_time__lt=today_end)),
+        active=Count(
+            "id",
+            filter=models.Q(start_time__lte=now, end_time__gte=now) & ~models.Q(status=Booking.STATUS_CANCELLED),
+        ),
+        completed_week=Count("id", filter=models.Q(end_time__lt=now, end_time__gte=week_ago)),
+    )
+    user_counts = User.objects.aggregate(
+        total=Count("id"),
+        **{role: Count("id", filter=models.Q(profile__role=role)) for role, _ in UserProfile.ROLE_CHOICES},
+    )
+    role_counts = {role: user_counts[role] for role, _ in UserProfile.ROLE_CHOICES}
     return render(
         request,
         "bookings/admin_cabinet.html",
         {
-            "reservations_today": Booking.objects.filter(start_time__date=today_date).count(),
-            "reservations_active": Booking.objects.exclude(status=Booking.STATUS_CANCELLED).filter(start_time__lte=now, end_time__gte=now).count(),
-            "reservations_completed_week": Booking.objects.filter(end_time__lt=now, end_time__gte=week_ago).count(),
-            "total_users": users.count(),
-            "clients_total": UserProfile.objects.filter(role=UserProfile.ROLE_CLIENT).count(),
-            "operators_total": UserProfile.objects.filter(role=UserProfile.ROLE_OPERATOR).count(),
-            "admins_total": UserProfile.objects.filter(role=UserProfile.ROLE_ADMIN).count(),
-            "integrations_total": integrations_total,
-            "backups_total": backups_total,
-            "users_by_role": _role_summary(),
+            "reservations_today": bookings["today"],
+            "reservations_active": bookings["active"],
+            "reservations_completed_week": bookings["completed_week"],
+            "total_users": user_counts["total"],
+            "clients_total": role_counts[UserProfile.ROLE_CLIENT],
+            "operators_total": role_counts[UserProfile.ROLE_OPERATOR],
+            "admins_total": role_counts[UserProfile.ROLE_ADMIN],
+            "integrations_total": ExternalIntegration.objects.count(),
+            "backups_total": BackupArchive.objects.count(),
+            "users_by_role": _role_summary(role_counts),
             "recent_reservations": booking_detail_queryset().order_by("-created_at")[:10],
             "managed_users": users,
             "role_choices": UserProfile.ROLE_CHOICES,
@@ -523,6 +565,19 @@ def admin_integration_test(request, pk):
     return redirect("admin_integrations")
 
 
+@login_required
+@user_passes_test(is_admin_app, login_url="/")
+def admin_metrics(request):
+    # Counters are kept per process since its start.
+    return JsonResponse(
+        {
+            "coalescing": flight_metrics(),
+            "rate_limits": rate_limit_metrics(),
+            "integrations": integration_metrics(),
+        }
+    )
+
+
 @login_required
 @user_passes_test(is_admin_app, login_url="/")
 def admin_security(request):
@@ -552,9 +607,9 @@ def admin_security(request):
 def admin_backups(request):
     if request.method == "POST":
         action = request.POST.get("action")
-        if action == "create_backup":
-            archive = create_backup_archive(user=request.user)
-            messages.success(request, f"Резервная копия {archive.original_name} создана.")
+        if action in ("create_backup", "create_incremental_backup"):
+            archive = create_backup_archive(user=request.user, incremental=action == "create_incremental_backup")
+            messages.success(request, f"Резервная копия {archive.original_name} ({archive.get_kind_display().lower()}) создана.")
             return redirect("admin_backups")
         if action == "upload_backup" and request.FILES.get("backup_file"):
             uploaded = request.FILES["backup_file"]
@@ -565,7 +620,11 @@ def admin_backups(request):
             )
             messages.success(request, f"Архив {archive.original_name} загружен.")
             return redirect("admin_backups")
-    return render(request, "bookings/admin_backups.html", {"archives": BackupArchive.objects.select_related("created_by", "restored_by").order_by("-created_at")})
+    return render(
+        request,
+        "bookings/admin_backups.html",
+        {"archives": BackupArchive.objects.select_related("created_by", "restored_by", "base_archive").order_by("-created_at")},
+    )
 
 
 @login_required
@@ -588,9 +647,17 @@ def admin_backup_restore(request, pk):
         if request.POST.get("confirm_username", "").strip() != request.user.username:
             messages.error(request, "Для восстановления нужно подтвердить текущий логин администратора.")
             return redirect("admin_backup_restore", pk=pk)
-        restore_backup_archive(archive=archive, user=request.user)
         request.session.pop(token_key, None)
-        messages.success(request, f"Восстановление из архива {archive.original_name} выполнено.")
+        try:
+            stats = restore_backup_archive(archive=archive, user=request.user)
+        except Exception as exc:
+            messages.error(request, f"Восстановление из архива {archive.original_name} не завершено: {exc}")
+            return redirect("admin_backups")
+        messages.success(
+            request,
+            f"Восстановление из архива {archive.original_name} выполнено: "
+            f"{stats['objects']} записей за {stats['seconds']:.1f} с.",
+        )
         return redirect("admin_backups")
     token = f"{pk}-{timezone.now().timestamp():.0f}"
     request.session[token_key] = token
@@ -605,6 +672,7 @@ def admin_reports(request):
     headers, rows = admin_report_rows(report_type, date_from, date_to)
     if request.GET.get("export") == "csv":
         return csv_response(f"admin_{report_type}_{date_from}_{date_to}.csv", headers, rows)
+    rows = list(rows)
     return render(
         request,
         "bookings/admin_reports.html",
@@ -643,12 +711,24 @@ def operator_reservations(request):
         reservations = reservations.filter(table_id=request.GET["table"])
     if request.GET.get("client"):
         reservations = reservations.filter(user_id=request.GET["client"])
-    if request.GET.get("date_from"):
-        reservations = reservations.filter(start_time__date__gte=request.GET["date_from"])
-    if request.GET.get("date_to"):
-        reservations = reservations.filter(start_time__date__lte=request.GET["date_to"])
-    paginator = Paginator(reservations, 10)
-    page_obj = paginator.get_page(request.GET.get("page", 1))
+    date_from = _parse_filter_date(request.GET.get("date_from"))
+    if date_from:
+        reservations = reservations.filter(start_time__gte=day_range_for_date(date_from)[0])
+    date_to = _parse_filter_date(request.GET.get("date_to"))
+    if date_to:
+        reservations = reservations.filter(start_time__lt=day_range_for_date(date_to)[1])
+    keyset = request.GET.get("mode") == "keyset" or bool(request.GET.get("cursor"))
+    if keyset:
+        try:
+            page_obj = keyset_page(reservations, "start_time", request.GET.get("cursor"), 10)
+        except ValueError:
+            page_obj = keyset_page(reservations, "start_time", None, 10)
+    else:
+        paginator = Paginator(reservations, 10)
+        page_obj = paginator.get_page(request.GET.get("page", 1))
+    filter_query = request.GET.copy()
+    for param in ("page", "cursor", "mode"):
+        filter_query.pop(param, None)
     return render(
         request,
         "bookings/operator_reservations.html",
@@ -657,6 +737,8 @@ def operator_reservations(request):
             "tables": Table.objects.all().order_by("table_number"),
             "clients": User.objects.filter(profile__role=UserProfile.ROLE_CLIENT).order_by("first_name", "last_name", "username"),
             "page_obj": page_obj,
+            "keyset": keyset,
+            "filter_query": filter_query.urlencode(),
         },
     )
 
@@ -725,7 +807,9 @@ def operator_service_slots(request):
                 option.is_active = True
                 option.sort_order = duration
                 option.save(update_fields=["is_active", "sort_order"])
-        ServiceDurationOption.objects.exclude(duration_minutes__in=parsed_values).update(is_active=False)
+        retired_options = ServiceDurationOption.objects.exclude(duration_minutes__in=parsed_values)
+        record_backup_changes(retired_options)
+        retired_options.update(is_active=False)
         messages.success(request, "Настройки временных слотов обновлены.")
         return redirect("operator_service_slots")
 
@@ -750,6 +834,7 @@ def operator_reports(request):
     headers, rows = operator_report_rows(report_type, date_from, date_to)
     if request.GET.get("export") == "csv":
         return csv_response(f"operator_{report_type}_{date_from}_{date_to}.csv", headers, rows)
+    rows = list(rows)
     return render(
         request,
         "bookings/operator_reports.html",
@@ -778,7 +863,7 @@ def client_order_detail(request, pk):
         raise Http404
     completed = is_order_completed_for_review(order)
     reviewed_line_ids = set(order.items.filter(review__isnull=False).values_list("pk", flat=True))
-    line_info = [{"line": line, "can_review": completed and line.pk not in reviewed_line_ids} for line in order.items.select_related("dish")]
+    line_info = [{"line": line, "can_review": completed and line.pk not in reviewed_line_ids} for line in order.dishes]
     return render(request, "bookings/client_order_detail.html", {"reservation": order, "line_info": line_info, "completed": completed})
 
 
@@ -843,6 +928,7 @@ def client_dish_review_create(request, rid, line_id):
 
 
 @require_http_methods(["GET"])
+@rate_limit()
 def get_occupied_time_slots(request):
     table_id = request.GET.get("table_id")
     date_raw = request.GET.get("date")
@@ -853,11 +939,12 @@ def get_occupied_time_slots(request):
         target_date = parse_booking_date(date_raw)
     except ValueError:
         return JsonResponse({"error": "invalid date"}, status=400)
-    occupied = occupied_slots_for_table_date(table, target_date, booking_id=request.GET.get("reservation_id"))
+    occupied = coalesced_occupied_slots(table, target_date, booking_id=request.GET.get("reservation_id"))
     return JsonResponse({"occupied_slots": occupied})
 
 
 @require_http_methods(["GET"])
+@rate_limit()
 def check_available_time_slots(request):
     date_raw = request.GET.get("date")
     guests_count = request.GET.get("guests_count")
@@ -867,5 +954,5 @@ def check_available_time_slots(request):
         target_date = parse_booking_date(date_raw)
     except ValueError:
         return JsonResponse({"error": "invalid date"}, status=400)
-    return JsonResponse({"available_slots": available_slots_for_date(target_date, int(guests_count))})
+    return JsonResponse({"available_slots": coalesced_available_slots(target_date, int(guests_count))})
 